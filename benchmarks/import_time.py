@@ -0,0 +1,80 @@
+"""Import-time benchmark for the entry points.
+
+Imports each entry point in a fresh interpreter, reports how long it took and
+fails if a path pulls in a heavy module it should not need. Run from the
+repository root:
+
+    python benchmarks/import_time.py [--json]
+"""
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["PySide6", "qasync", "matplotlib", "networkx", "numpy", "PIL"]
+
+# Module, heavy modules it must not import, time budget in seconds
+ENTRY_POINTS = [
+    ("main", HEAVY_MODULES, 0.5),
+    ("network.headless", HEAVY_MODULES, 0.5),
+    ("gui.app", ["matplotlib", "networkx", "PIL"], 2.0),
+]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeat: int = 5) -> dict:
+    """Import a module in fresh interpreters and return the best time and loaded heavy modules.
+
+    Args:
+        module (str): The module to import.
+        repeat (int): Number of fresh interpreters to try.
+
+    Returns:
+        dict: ``seconds`` (best of the runs) and ``loaded`` (heavy modules imported).
+    """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def main(as_json: bool = False) -> int:
+    """Run the benchmark.
+
+    Args:
+        as_json (bool): Print one JSON object per entry point instead of a table.
+
+    Returns:
+        int: The process exit code, 1 if any entry point is too slow or too heavy.
+    """
+    failed = False
+    for module, forbidden, budget in ENTRY_POINTS:
+        result = measure(module)
+        violations = [m for m in result["loaded"] if m in forbidden]
+        ok = not violations and result["seconds"] <= budget
+        failed |= not ok
+        if as_json:
+            print(json.dumps({"module": module, "budget": budget, "ok": ok, **result}))
+        else:
+            status = "ok" if ok else "FAIL"
+            extra = f"  imports {', '.join(violations)}" if violations else ""
+            print(f"{module:<20} {result['seconds'] * 1000:8.1f} ms  (budget {budget * 1000:.0f} ms)  {status}{extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main("--json" in sys.argv[1:]))
@@ -0,0 +1,125 @@
+"""Node representation benchmark: NodeData dataclasses against the NodeStore.
+
+Builds the same tree topology (one router per /24, every host connected to
+its router, routers chained) both ways and reports the memory it takes and
+how long it takes to visit every node's neighbours. Run from the repository root:
+
+    python benchmarks/node_store.py [nodes] [--json]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.node import NodeData
+from network.nodestore import NodeStore
+
+
+def addresses(count: int) -> list[tuple[str, str, int]]:
+    """Return ``(ip, device type, parent index)`` for a synthetic tree of nodes."""
+    nodes = []
+    router = 0
+    for index in range(count):
+        subnet, host = divmod(index, 254)
+        ip = f"10.{subnet >> 8 & 255}.{subnet & 255}.{host + 1}"
+        if host == 0:
+            nodes.append((ip, "router", router))  # Routers hang off the previous router
+            router = index
+        else:
+            nodes.append((ip, "PC", router))
+    return nodes
+
+
+def build_dataclasses(spec: list[tuple[str, str, int]]) -> list[NodeData]:
+    """Build the topology as NodeData objects."""
+    nodes = [NodeData(ip, device_type) for ip, device_type, _ in spec]
+    for index, (_, _, parent) in enumerate(spec):
+        if parent != index:
+            nodes[index].connect(nodes[parent])
+    return nodes
+
+
+def build_store(spec: list[tuple[str, str, int]]) -> NodeStore:
+    """Build the topology in a NodeStore."""
+    store = NodeStore()
+    for ip, device_type, _ in spec:
+        store.add(ip, device_type)
+    for index, (_, _, parent) in enumerate(spec):
+        store.connect(index, parent)
+    store.degree(0)  # Build the CSR arrays
+    return store
+
+
+def measure_memory(build, spec) -> tuple[object, int]:
+    """Return the built structure and the bytes it allocated."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(spec)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, used
+
+
+def best_time(function, repeat: int = 3) -> float:
+    """Return the best wall time of a function over a few runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def walk_nodes(nodes) -> int:
+    """Visit every neighbour of every node through the NodeData interface."""
+    return sum(1 for node in nodes for _ in node.connections)
+
+
+def walk_ids(store: NodeStore) -> int:
+    """Visit every neighbour of every node through the CSR arrays."""
+    offsets, neighbours = store.offsets, store.neighbours
+    return sum(1 for node_id in store.ids() for _ in neighbours[offsets[node_id]:offsets[node_id + 1]])
+
+
+def scan_ids(store: NodeStore) -> int:
+    """Visit every neighbour entry in one sequential pass over the flat CSR array."""
+    return sum(1 for _ in store.neighbours)
+
+
+def main(count: int = 50_000, as_json: bool = False):
+    """Run the benchmark.
+
+    Args:
+        count (int): Number of nodes.
+        as_json (bool): Print one JSON object per result instead of a table.
+    """
+    spec = addresses(count)
+    dataclasses, dataclass_bytes = measure_memory(build_dataclasses, spec)
+    store, store_bytes = measure_memory(build_store, spec)
+    views = store.nodes()
+
+    results = [
+        ("dataclass memory", dataclass_bytes / 2**20, "MiB"),
+        ("store memory", store_bytes / 2**20, "MiB"),
+        ("store arrays", store.nbytes / 2**20, "MiB"),
+        ("dataclass walk", best_time(lambda: walk_nodes(dataclasses)) * 1000, "ms"),
+        ("view walk", best_time(lambda: walk_nodes(views)) * 1000, "ms"),
+        ("CSR walk", best_time(lambda: walk_ids(store)) * 1000, "ms"),
+        ("CSR scan", best_time(lambda: scan_ids(store)) * 1000, "ms"),
+    ]
+    for name, value, unit in results:
+        if as_json:
+            print(json.dumps({"benchmark": name, "nodes": count, "value": round(value, 3), "unit": unit}))
+        else:
+            print(f"{name:<18} {value:10.1f} {unit}")
+
+
+if __name__ == "__main__":
+    arguments = [a for a in sys.argv[1:] if a != "--json"]
+    main(int(arguments[0]) if arguments else 50_000, "--json" in sys.argv[1:])
@@ -0,0 +1,54 @@
+"""Node file parsing benchmark.
+
+Generates a node file with the requested number of host lines (plus one
+router per /24 and a connection line per host) and times loading it into a
+NodeRegistry. Run from the repository root:
+
+    python benchmarks/parse_node_file.py [lines]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.registry import load_registry
+
+
+def write_node_file(path: str, hosts: int):
+    """Write a synthetic node file.
+
+    Args:
+        path (str): Where to write the file.
+        hosts (int): Number of host lines.
+    """
+    with open(path, 'w') as file:
+        for index in range(0, hosts, 253):
+            file.write(f"10.{index // 253 >> 8 & 255}.{index // 253 & 255}.254,router\n")
+        for index in range(hosts):
+            file.write(f"10.{index // 253 >> 8 & 255}.{index // 253 & 255}.{index % 253 + 1},PC\n")
+        for index in range(hosts):
+            subnet = f"10.{index // 253 >> 8 & 255}.{index // 253 & 255}"
+            file.write(f"{subnet}.254,{subnet}.{index % 253 + 1}\n")
+
+
+def main(hosts: int = 100_000):
+    """Run the benchmark.
+
+    Args:
+        hosts (int): Number of host lines.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "nodes.txt")
+        write_node_file(path, hosts)
+        with open(path) as file:
+            lines = sum(1 for _ in file)
+        started = time.perf_counter()
+        registry = load_registry(path)
+        elapsed = time.perf_counter() - started
+    print(f"{lines} lines, {len(registry)} nodes, {len(registry.errors)} errors in {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,126 @@
+"""Passive liveness benchmark: active probe volume with and without the neighbour table.
+
+Builds an rtnetlink neighbour dump in which a share of the nodes are
+REACHABLE, checks that it parses back, times the parse, then runs the
+monitor against a fake probe for a while with and without the passive
+source and reports the active probes sent. A dump captured on a real host
+can be replayed instead of the synthetic one. Run from the repository root:
+
+    python benchmarks/passive_liveness.py [nodes] [seconds] [--reachable F] [--fixture FILE] [--json]
+    python benchmarks/passive_liveness.py --capture FILE
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.monitor import Monitor
+from network.neighbours import (
+    NDA_DST, NDMSG, NLMSG_DONE, NLMSGHDR, NUD_REACHABLE, NUD_STALE, RTATTR, RTM_NEWNEIGH, dump_neighbours,
+    parse_neighbours,
+)
+from network.node import NodeData
+
+INTERVAL = 0.2  # Probe interval, short so a few seconds cover many cycles
+TABLE_INTERVAL = 0.5  # Seconds between neighbour table replays
+
+
+def build_dump(states: dict[str, int]) -> bytes:
+    """Encode neighbour states the way the kernel answers RTM_GETNEIGH."""
+    messages = []
+    for address, state in states.items():
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        dst = socket.inet_pton(family, address)
+        attribute = RTATTR.pack(RTATTR.size + len(dst), NDA_DST) + dst
+        attribute += bytes(-len(attribute) % 4)
+        payload = NDMSG.pack(family, 0, 0, 2, state, 0, 1) + attribute
+        messages.append(NLMSGHDR.pack(NLMSGHDR.size + len(payload), RTM_NEWNEIGH, 2, 1, 0) + payload)
+    messages.append(NLMSGHDR.pack(NLMSGHDR.size + 4, NLMSG_DONE, 2, 1, 0) + bytes(4))
+    return b"".join(messages)
+
+
+def subnet_nodes(count: int) -> list[NodeData]:
+    """Return nodes on distinct 10/8 addresses."""
+    return [NodeData(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", "PC") for i in range(count)]
+
+
+async def run(nodes: list[NodeData], table: dict[str, int] | None, seconds: float) -> int:
+    """Monitor the nodes for a while and return the number of active probes."""
+    sent = 0
+
+    async def probe(host: str) -> float | None:
+        nonlocal sent
+        sent += 1
+        return 0.001
+
+    monitor = Monitor([NodeData(node.ip, node.device_type) for node in nodes], probe=probe,
+                      scheduler_options={"interval": INTERVAL})
+    monitor.start()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if table is not None:
+            monitor.record_neighbours(table)
+        await asyncio.sleep(TABLE_INTERVAL)
+    monitor.stop()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("nodes", nargs="?", type=int, default=2000)
+    parser.add_argument("seconds", nargs="?", type=float, default=5.0)
+    parser.add_argument("--reachable", type=float, default=0.8, help="share of nodes in REACHABLE state")
+    parser.add_argument("--fixture", help="replay a captured dump instead of a synthetic one")
+    parser.add_argument("--capture", metavar="FILE", help="write this host's neighbour dump to FILE and exit")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, "wb") as f:
+            f.write(dump_neighbours())
+        return
+
+    logging.disable(logging.CRITICAL)
+    if args.fixture:
+        with open(args.fixture, "rb") as f:
+            dump = f.read()
+        table = parse_neighbours(dump)
+        nodes = [NodeData(address, "PC") for address in table]
+    else:
+        nodes = subnet_nodes(args.nodes)
+        cutoff = int(len(nodes) * args.reachable)
+        states = {node.ip: NUD_REACHABLE if i < cutoff else NUD_STALE for i, node in enumerate(nodes)}
+        dump = build_dump(states)
+        table = parse_neighbours(dump)
+        assert table == states, "dump does not parse back"
+
+    started = time.perf_counter()
+    for _ in range(10):
+        parse_neighbours(dump)
+    parse_ms = (time.perf_counter() - started) * 100
+
+    active = asyncio.run(run(nodes, None, args.seconds))
+    passive = asyncio.run(run(nodes, table, args.seconds))
+    results = {
+        "nodes": len(nodes),
+        "reachable": sum(state == NUD_REACHABLE for state in table.values()),
+        "parse_ms": round(parse_ms, 2),
+        "active_probes": active,
+        "passive_probes": passive,
+        "reduction": round(1 - passive / active, 3) if active else 0.0,
+    }
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"{results['nodes']} nodes, {results['reachable']} reachable neighbours, dump parsed in {parse_ms:.2f} ms")
+    print(f"active probes: {active} without the neighbour table, {passive} with it ({results['reduction']:.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Status feed benchmark: fan-out of one monitor's node states to many viewers.
+
+Fills a status store with synthetic nodes, publishes it on a local status
+feed and connects a number of viewers that read every event, plus one that
+never reads. Each tick a share of the nodes gets a new probe result. Reports
+the time spent publishing a tick, the bytes each viewer received, the
+snapshot and delta sizes, and how far the stalled viewer's buffer grew. Run
+from the repository root:
+
+    python benchmarks/status_feed.py [nodes] [viewers] [seconds] [--change F] [--max-buffer BYTES] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network.feed import FEED_PATH, MAX_BUFFER, StatusFeed
+from network.status import StatusStore
+
+PORT = 17879
+TICK = 1.0
+
+
+async def viewer(port: int, received: list[int], index: int):
+    """Read the feed and count the bytes received."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2**24)
+    writer.write(f"GET {FEED_PATH} HTTP/1.1\r\n\r\n".encode())
+    try:
+        while True:
+            chunk = await reader.read(2**16)
+            if not chunk:
+                return
+            received[index] += len(chunk)
+    finally:
+        writer.close()
+
+
+async def stalled(port: int, connections: list):
+    """Connect and never read, leaving the feed's writes to pile up."""
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)  # Fill up quickly
+    sock.connect(("127.0.0.1", port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    writer.write(f"GET {FEED_PATH} HTTP/1.1\r\n\r\n".encode())
+    connections.append(writer)
+
+
+async def run(nodes: int, viewers: int, seconds: float, change: float, max_buffer: int) -> dict:
+    """Publish a changing store for a while and return the measurements."""
+    store = StatusStore([f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(nodes)])
+    for ip in store.ips:
+        for _ in range(20):
+            store.update(ip, True, rtt=random.uniform(0.001, 0.05))
+    feed = StatusFeed(store, "127.0.0.1", PORT, tick=3600, max_buffer=max_buffer)  # Ticks are driven below
+    feed.start()
+    await asyncio.sleep(0.2)
+
+    received = [0] * viewers
+    tasks = [asyncio.create_task(viewer(PORT, received, index)) for index in range(viewers)]
+    connections = []
+    await stalled(PORT, connections)
+    await asyncio.sleep(0.5)
+
+    started = time.perf_counter()
+    ticks, publish_times, stalled_buffer = 0, [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ip in random.sample(store.ips, int(nodes * change)):
+            up = random.random() > 0.02
+            store.update(ip, up, rtt=random.uniform(0.001, 0.05) if up else None)
+        began = time.perf_counter()
+        feed.publish()
+        publish_times.append(time.perf_counter() - began)
+        ticks += 1
+        for viewer_state in feed.viewers:
+            stalled_buffer = max(stalled_buffer, viewer_state.writer.transport.get_write_buffer_size())
+        await asyncio.sleep(TICK)
+    elapsed = time.perf_counter() - started
+    snapshot = len(feed.snapshot())
+    resyncs = sum(viewer_state.dropped for viewer_state in feed.viewers)
+
+    for task in tasks:
+        task.cancel()
+    for writer in connections:
+        writer.close()
+    feed.stop()
+    publish_times.sort()
+    return {
+        "nodes": nodes,
+        "viewers": viewers,
+        "ticks": ticks,
+        "publish_ms_p50": round(publish_times[len(publish_times) // 2] * 1000, 2),
+        "publish_ms_max": round(publish_times[-1] * 1000, 2),
+        "snapshot_bytes": snapshot,
+        "viewer_bytes_per_s": round(sum(received) / viewers / elapsed) if viewers else 0,
+        "stalled_buffer_bytes": stalled_buffer,
+        "stalled_skipped_ticks": resyncs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("nodes", nargs="?", type=int, default=10000)
+    parser.add_argument("viewers", nargs="?", type=int, default=40)
+    parser.add_argument("seconds", nargs="?", type=float, default=10.0)
+    parser.add_argument("--change", type=float, default=0.2, help="share of nodes with a new result per tick")
+    parser.add_argument("--max-buffer", type=int, default=MAX_BUFFER, help="unread bytes before a viewer is resynced")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    results = asyncio.run(run(args.nodes, args.viewers, args.seconds, args.change, args.max_buffer))
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(
+        f"{results['nodes']} nodes, {results['viewers']} viewers, {results['ticks']} ticks: "
+        f"publish p50 {results['publish_ms_p50']} ms, max {results['publish_ms_max']} ms"
+    )
+    print(
+        f"snapshot {results['snapshot_bytes'] / 1024:.0f} KiB, {results['viewer_bytes_per_s'] / 1024:.0f} KiB/s per viewer, "
+        f"stalled viewer buffer peaked at {results['stalled_buffer_bytes'] / 1024:.0f} KiB "
+        f"({results['stalled_skipped_ticks']} ticks skipped)"
+    )
+
+
+if __name__ == "__main__":
+    main()
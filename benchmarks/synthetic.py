@@ -0,0 +1,289 @@
+"""Synthetic network benchmark: probing, scheduling and rendering at scale.
+
+Generates star, tree or mesh topologies, monitors them with a simulated
+prober (latency, loss, hosts down and flapping) and reports:
+
+- probe throughput against the demand the intervals imply
+- scheduling lag, how late probes are dispatched
+- event loop lag, how late a 10 ms ticker wakes up
+- table update time, flushing a round of status changes into the node table
+- map first frame, layout and render time, showing the first layout
+  snapshot, finishing the layout and recolouring the map
+- peak RSS of the whole configuration
+
+Every configuration runs in its own interpreter so peak RSS is its own. Qt
+runs offscreen and nothing touches the network. Run from the repository root:
+
+    python benchmarks/synthetic.py [--sizes 1000,10000,100000] [--shapes star,tree,mesh] [--json]
+
+With ``--json`` every result is one JSON object per line, tagged with the
+commit, so runs of different versions can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SHAPES = ("star", "tree", "mesh")
+FANOUT = 8  # Children per node in tree topologies
+MESH_DEGREE = 4  # Average connections per node in mesh topologies
+TICK = 0.01  # Event loop lag probe period in seconds
+
+
+def address(index: int) -> str:
+    """Return a distinct address for a node index."""
+    index += 1
+    return f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+
+def build_topology(shape: str, count: int, seed: int = 0):
+    """Return the views of a synthetic topology, node 0 being its root.
+
+    Args:
+        shape (str): "star", "tree" or "mesh".
+        count (int): Number of nodes.
+        seed (int): Seed for the mesh's random links.
+    """
+    from network.nodestore import NodeStore
+
+    store = NodeStore()
+    rng = random.Random(seed)
+    for index in range(count):
+        if shape == "star":
+            device_type = "router" if index == 0 else "PC"
+        elif shape == "tree":
+            device_type = "router" if index * FANOUT + 1 < count else "PC"
+        else:
+            device_type = "router"
+        store.add(address(index), device_type)
+    for index in range(1, count):
+        if shape == "star":
+            store.connect(0, index)
+        elif shape == "tree":
+            store.connect((index - 1) // FANOUT, index)
+        else:
+            store.connect(rng.randrange(index), index)  # Spanning links keep the mesh connected
+    if shape == "mesh":
+        for _ in range(count * (MESH_DEGREE - 2) // 2):
+            store.connect(rng.randrange(count), rng.randrange(count))
+    if count:
+        store.roots.add(0)
+    return store.nodes()
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Return the median, 99th percentile and maximum of some samples."""
+    if not samples:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "p50": ordered[len(ordered) // 2],
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "max": ordered[-1],
+    }
+
+
+def best_time(function, repeat: int = 5) -> float:
+    """Return the best wall time of a function over a few runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def run_probes(monitor, prober, seconds: float) -> dict[str, float]:
+    """Run a monitor for a while and measure probing and lag."""
+    loop = asyncio.get_running_loop()
+    loop_lag, scheduling_lag = [], []
+    monitor.start()
+    started = loop.time()
+    probes = prober.probes
+    deadline = started + seconds
+    while loop.time() < deadline:
+        before = loop.time()
+        await asyncio.sleep(TICK)
+        loop_lag.append(loop.time() - before - TICK)
+        scheduling_lag.append(monitor.scheduler.lag)
+    elapsed = loop.time() - started
+    completed = prober.probes - probes
+    monitor.stop()
+    results = {"probe throughput": completed / elapsed}
+    for name, samples in (("loop lag", loop_lag), ("scheduling lag", scheduling_lag)):
+        for stat, value in percentiles(samples).items():
+            results[f"{name} {stat}"] = value * 1000
+    return results
+
+
+def measure_views(monitor, map_limit: int) -> dict[str, float]:
+    """Measure the node table and the map in an offscreen Qt application."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QTableView
+    from gui.node_model import NodeTableModel, StatusFilterProxyModel
+
+    app = QApplication.instance() or QApplication([])
+    store = monitor.status_store
+    model = NodeTableModel(store)
+    proxy = StatusFilterProxyModel()
+    proxy.setSourceModel(model)
+    view = QTableView()
+    view.setModel(proxy)
+    view.setSortingEnabled(True)
+    view.resize(1024, 768)
+    view.show()
+    app.processEvents()
+
+    rng = random.Random(1)
+    ips = list(store.ips)
+    changed = ips if len(ips) <= 1000 else rng.sample(ips, len(ips) // 10)
+
+    def flip_statuses():
+        now = time.time()
+        for ip in changed:
+            node = monitor.node_map[ip]
+            node.is_online = not node.is_online
+            store.update(ip, node.is_online, now, 0.001 if node.is_online else None)
+
+    def update_table():
+        flip_statuses()
+        model.flush()
+        app.processEvents()
+
+    results = {"table update": best_time(update_table) * 1000}
+
+    if len(monitor.nodes) <= map_limit:
+        from gui.matplotlib_widget import DynamicNetworkMap
+
+        started = time.perf_counter()
+        network_map = DynamicNetworkMap(monitor.nodes, "synthetic", health=monitor.node_health)
+        network_map.resize(1024, 768)
+        network_map.show()
+        network_map.canvas.draw()
+        # The layout runs on a thread and delivers snapshots as it refines
+        while network_map.node_xy is None:
+            time.sleep(0.01)
+            app.processEvents()
+        results["map first frame"] = (time.perf_counter() - started) * 1000
+        while network_map.layout_pending:
+            time.sleep(0.01)
+            app.processEvents()
+        results["map layout"] = (time.perf_counter() - started) * 1000
+
+        def render_map():
+            flip_statuses()
+            network_map.draw_dynamic_map()
+            app.processEvents()
+
+        results["map render"] = best_time(render_map) * 1000
+        network_map.close()
+    view.close()
+    return results
+
+
+def run_configuration(args: argparse.Namespace) -> dict[str, float]:
+    """Benchmark one topology in this interpreter and return its results."""
+    from network.history import HistoryStore
+    from network.logger import get_log_writer
+    from network.monitor import Monitor
+    from network.simulate import SimulatedProber
+
+    # Node logging stays on, it is part of the probe path, but writes one shared file in a scratch directory
+    get_log_writer(log_dir=tempfile.mkdtemp(prefix="synthetic-logs-"), shared=True)
+
+    started = time.perf_counter()
+    nodes = build_topology(args.shape, args.size, args.seed)
+    prober = SimulatedProber(args.latency, loss=args.loss, down=args.down, flap=args.flap, seed=args.seed)
+    monitor = Monitor(
+        nodes, history=HistoryStore(len(nodes)), probe=prober, scheduler_options={"interval": args.interval}
+    )
+    results = {"setup": (time.perf_counter() - started) * 1000}
+
+    results["probe demand"] = args.size / args.interval
+    results.update(asyncio.run(run_probes(monitor, prober, args.duration)))
+    results["probe peak RSS"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    if not args.no_gui:
+        results.update(measure_views(monitor, args.map_limit))
+    results["peak RSS"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+UNITS = {
+    "setup": "ms", "probe demand": "probes/s", "probe throughput": "probes/s", "table update": "ms",
+    "map first frame": "ms", "map layout": "ms", "map render": "ms", "probe peak RSS": "MiB", "peak RSS": "MiB",
+}
+
+
+def commit() -> str | None:
+    """Return the short hash of the checked out commit, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the monitor on synthetic networks.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated node counts")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="comma separated topologies: star, tree, mesh")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of probing per configuration")
+    parser.add_argument("--interval", type=float, default=5.0, help="probe interval in seconds")
+    parser.add_argument("--latency", type=float, default=0.02, help="mean simulated RTT in seconds")
+    parser.add_argument("--loss", type=float, default=0.01, help="probability a probe of an up host fails")
+    parser.add_argument("--down", type=float, default=0.02, help="fraction of hosts starting out down")
+    parser.add_argument("--flap", type=float, default=0.001, help="probability per probe a host flips state")
+    parser.add_argument("--map-limit", type=int, default=20000, help="largest topology the map is measured for")
+    parser.add_argument("--no-gui", action="store_true", help="skip the table and map measurements")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print one JSON object per result")
+    # Internal: run a single configuration and print its results as JSON
+    parser.add_argument("--shape", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]):
+    """Run every configuration in a fresh interpreter and report the results."""
+    args = parse_args(argv)
+    if args.shape:
+        print(json.dumps(run_configuration(args)))
+        return
+
+    revision = commit()
+    forwarded = [a for a in argv if a != "--json"]
+    for size in (int(s) for s in args.sizes.split(",")):
+        for shape in args.shapes.split(","):
+            process = subprocess.run(
+                [sys.executable, __file__, *forwarded, "--shape", shape, "--size", str(size)],
+                capture_output=True, text=True,
+            )
+            sys.stderr.write(process.stderr)
+            if process.returncode != 0:
+                print(f"{shape} {size}: failed", file=sys.stderr)
+                continue
+            results = json.loads(process.stdout.strip().splitlines()[-1])
+            for name, value in results.items():
+                if args.json:
+                    print(json.dumps({
+                        "benchmark": name, "topology": shape, "nodes": size, "value": round(value, 3),
+                        "unit": UNITS.get(name, "ms"), "commit": revision,
+                    }), flush=True)
+                else:
+                    print(f"{shape:<5} {size:>7} {name:<20} {value:12.2f} {UNITS.get(name, 'ms')}", flush=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,30 +1,82 @@
+import logging
+import os
+import tempfile
 import time
-import asyncio
-from PySide6.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QStackedWidget, QListWidget, QFileDialog
+from PySide6.QtWidgets import QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, QTableView, QComboBox, QStackedWidget, QListView, QLineEdit, QFileDialog
 from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QColor
-from network.checker import ping, read_node_file
-from network.logger import setup_node_logging
+from network.checker import read_node_file
+from network.events import EventLog, EVENT_DIR, WENT_OFFLINE, CAME_ONLINE, CUT_OFF, RECONNECTED
+from network.logger import LOG_DIR
 from network.node import NodeData
-from network.mapper import draw_network_topology
-from gui.matplotlib_widget import DynamicNetworkMap
+from network.metrics import PROFILER, MetricsServer
+from network.monitor import Monitor
+from network.snapshot import SNAPSHOT_INTERVAL, STATE_PATH, load_snapshot
+from network.watcher import FileWatcher
+from network.history import HistoryStore
+from network.status import CHECKING, ONLINE, OFFLINE, UNREACHABLE, UNRESOLVED, STATUS_TEXT
+from gui.event_model import EventListModel
+from gui.node_model import NodeTableModel, StatusFilterProxyModel
+
+HISTORY_WINDOWS = (("All time", None), ("Last hour", 1), ("Last 2 hours", 2), ("Last 24 hours", 24), ("Last 7 days", 168))
+OUTAGE_FILTERS = (("All events", None), ("Outages over 1 min", 60), ("Outages over 5 min", 300), ("Outages over 1 hour", 3600))
+LOSSY_SHOWN = 5  # Lossy nodes named in the history summary, the rest are counted
+SUMMARY_INTERVAL = 10  # Seconds between history summary refreshes while it is shown, each scans every node's hour
 
 
 class NetworkMonitorApp(QMainWindow):
-    def __init__(self, nodes: list[NodeData], file_path: str):
+    def __init__(
+        self,
+        nodes: list[NodeData],
+        file_path: str,
+        workers: int = 0,
+        listen: tuple[str, int] | None = None,
+        metrics: tuple[str, int] | None = None,
+        passive: bool = False,
+        feed: tuple[str, int] | None = None,
+        view: tuple[str, int] | None = None,
+    ):
         """Initialize the NetworkMonitorApp.
 
         Args:
             nodes (list[NodeData]): List of nodes to monitor.
             file_path (str): Path to the node file.
+            workers (int): Number of probe worker processes, 0 probes on the GUI's loop.
+            listen (tuple[str, int] | None): Collect results from remote agents on this host and port instead of probing.
+            metrics (tuple[str, int] | None): Host and port to serve Prometheus metrics on, if any.
+            passive (bool): Confirm directly attached nodes from the kernel neighbour table.
+            feed (tuple[str, int] | None): Host and port to publish the status feed on, if any.
+            view (tuple[str, int] | None): Show another monitor's status feed from this host and port instead of probing.
         """
         super().__init__()
-        self.setWindowTitle("Network Monitor")
-        self.nodes = sorted(nodes, key=lambda node: node.ip)
-        self.node_status = {node.ip: ("Checking...", "-") for node in nodes}
-        self.previous_status = {node.ip: None for node in nodes}
-        self.node_loggers = {node.ip: setup_node_logging(node.ip) for node in nodes}
+        self.view = view
+        self.setWindowTitle("Network Monitor" if view is None else f"Network Monitor - viewing {view[0]}:{view[1]}")
+        self.history = HistoryStore(len(nodes))
+        # A viewer may share the log directory with the monitor it views, so it keeps its history to itself
+        self.view_dir = tempfile.TemporaryDirectory(prefix="netmon-view-") if view is not None else None
+        self.events = EventLog(self.view_dir.name if view is not None else os.path.join(LOG_DIR, EVENT_DIR))
+        self.monitor = Monitor(
+            nodes, on_transition=self.add_history_item, history=self.history, on_reachability=self.add_reachability_item,
+            workers=workers,
+            listen=listen,
+            passive=passive,
+            view=view,
+        )
         self.file_path = file_path
+        self.watcher = None
+        self.metrics = metrics
+        self.metrics_server = None
+        self.feed = feed
+        self.feed_server = None
+
+        # Show the last-known state right away, probes confirm it as they come in
+        self.layout_positions = {}
+        self.restored_at = None
+        snapshot = load_snapshot(STATE_PATH) if view is None else None
+        if snapshot is not None:
+            self.monitor.restore(snapshot)
+            self.layout_positions = snapshot.positions()
+            self.restored_at = snapshot.saved
+            snapshot.close()
 
         # Main layout
         main_layout = QVBoxLayout()
@@ -54,38 +106,68 @@ class NetworkMonitorApp(QMainWindow):
         self.stacked_widget = QStackedWidget()
 
         # Create the node status table
-        self.table_widget = QTableWidget(len(nodes), 3)
-        self.table_widget.setHorizontalHeaderLabels(["Node", "Status", "Last Checked"])
-        self.table_widget.setSortingEnabled(False)
-
-        # Hide row and column headers
-        self.table_widget.verticalHeader().setVisible(False)
-        self.table_widget.horizontalHeader().setVisible(False)
-
-        # Initialize the table
-        for row, node in enumerate(self.nodes):
-            node_item = QTableWidgetItem(node.ip)
-            node_item.setFlags(node_item.flags() & ~Qt.ItemIsEditable)
-            self.table_widget.setItem(row, 0, node_item)
-
-            status_item = QTableWidgetItem("Checking...")
-            status_item.setForeground(QColor("yellow"))
-            status_item.setFlags(status_item.flags() & ~Qt.ItemIsEditable)
-            self.table_widget.setItem(row, 1, status_item)
-
-            timestamp_item = QTableWidgetItem("-")
-            timestamp_item.setFlags(timestamp_item.flags() & ~Qt.ItemIsEditable)
-            self.table_widget.setItem(row, 2, timestamp_item)
-
-        self.stacked_widget.addWidget(self.table_widget)
-
-        # Create a placeholder for the history view
-        self.history_list = QListWidget()
-        self.stacked_widget.addWidget(self.history_list)
-
-        # Add the DynamicNetworkMap widget for the network map
-        self.map_widget = DynamicNetworkMap(self.nodes, self.file_path)
-        self.stacked_widget.addWidget(self.map_widget)
+        nodes_page = QWidget()
+        nodes_layout = QVBoxLayout()
+        nodes_layout.setContentsMargins(0, 0, 0, 0)
+        self.status_filter = QComboBox()
+        self.status_filter.addItem("All", None)
+        for status in (ONLINE, OFFLINE, UNREACHABLE, UNRESOLVED, CHECKING):
+            self.status_filter.addItem(STATUS_TEXT[status], status)
+        self.status_filter.currentIndexChanged.connect(self.filter_nodes)
+        nodes_layout.addWidget(self.status_filter)
+
+        self.table_model = NodeTableModel(self.monitor.status_store, self)
+        self.table_proxy = StatusFilterProxyModel(self)
+        self.table_proxy.setSourceModel(self.table_model)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_proxy)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.sortByColumn(0, Qt.AscendingOrder)
+
+        # Hide row headers, fixed row heights avoid measuring every row
+        self.table_view.verticalHeader().setVisible(False)
+        self.table_view.verticalHeader().setSectionResizeMode(self.table_view.verticalHeader().ResizeMode.Fixed)
+        nodes_layout.addWidget(self.table_view)
+        nodes_page.setLayout(nodes_layout)
+        self.nodes_page = nodes_page
+
+        self.stacked_widget.addWidget(self.nodes_page)
+
+        # Create the history view, a virtual list over the on-disk event log
+        history_page = QWidget()
+        history_layout = QVBoxLayout()
+        history_layout.setContentsMargins(0, 0, 0, 0)
+        filters_layout = QHBoxLayout()
+        self.node_filter = QLineEdit()
+        self.node_filter.setPlaceholderText("Filter by node")
+        self.node_filter.textChanged.connect(self.filter_history)
+        self.window_filter = QComboBox()
+        for text, hours in HISTORY_WINDOWS:
+            self.window_filter.addItem(text, hours)
+        self.window_filter.currentIndexChanged.connect(self.filter_history)
+        self.outage_filter = QComboBox()
+        for text, seconds in OUTAGE_FILTERS:
+            self.outage_filter.addItem(text, seconds)
+        self.outage_filter.currentIndexChanged.connect(self.filter_history)
+        filters_layout.addWidget(self.node_filter)
+        filters_layout.addWidget(self.window_filter)
+        filters_layout.addWidget(self.outage_filter)
+        history_layout.addLayout(filters_layout)
+        # Loss and availability from the in-memory time series, above the event log
+        self.history_summary = QLabel()
+        history_layout.addWidget(self.history_summary)
+
+        self.history_model = EventListModel(self.events, self)
+        self.history_list = QListView()
+        self.history_list.setModel(self.history_model)
+        self.history_list.setUniformItemSizes(True)  # Only visible rows are ever asked for
+        history_layout.addWidget(self.history_list)
+        history_page.setLayout(history_layout)
+        self.history_page = history_page
+        self.stacked_widget.addWidget(self.history_page)
+
+        # The network map pulls in matplotlib, it is created the first time it is shown
+        self.map_widget = None
 
         main_layout.addWidget(self.stacked_widget)
 
@@ -96,8 +178,12 @@ class NetworkMonitorApp(QMainWindow):
         self.file_label = QLabel(f"Monitoring file: {self.file_path}")
         change_file_button = QPushButton("Change File")
         change_file_button.clicked.connect(self.change_file)
+        self.profile_button = QPushButton("Start Profiling")
+        self.profile_button.setCheckable(True)
+        self.profile_button.clicked.connect(self.toggle_profiler)
         footer_layout.addWidget(self.file_label)
         footer_layout.addWidget(change_file_button)
+        footer_layout.addWidget(self.profile_button)
         footer.setLayout(footer_layout)
         main_layout.addWidget(footer)
 
@@ -109,9 +195,21 @@ class NetworkMonitorApp(QMainWindow):
         self.timer.timeout.connect(self.update_dashboard)
         self.timer.start(1000)
 
+        self.summary_timer = QTimer()
+        self.summary_timer.timeout.connect(self.refresh_history_summary)
+        self.summary_timer.start(SUMMARY_INTERVAL * 1000)
+
+        self.save_timer = QTimer()
+        self.save_timer.timeout.connect(self.save_state)
+        if view is None:
+            self.save_timer.start(int(SNAPSHOT_INTERVAL * 1000))
+        if self.restored_at is not None:
+            saved = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.restored_at))
+            self.statusBar().showMessage(f"Showing the last-known state from {saved} until nodes are checked", 30000)
+
     def show_nodes(self):
         """Display the nodes view."""
-        self.stacked_widget.setCurrentWidget(self.table_widget)
+        self.stacked_widget.setCurrentWidget(self.nodes_page)
         self.nodes_button.setChecked(True)
         self.history_button.setChecked(False)
         self.map_button.setChecked(False)
@@ -119,14 +217,21 @@ class NetworkMonitorApp(QMainWindow):
 
     def show_history(self):
         """Display the history view."""
-        self.stacked_widget.setCurrentWidget(self.history_list)
+        self.stacked_widget.setCurrentWidget(self.history_page)
         self.nodes_button.setChecked(False)
         self.history_button.setChecked(True)
         self.map_button.setChecked(False)
         self.update_button_styles()
+        self.update_history_summary()
 
     def show_map(self):
-        """Display the map view."""
+        """Display the map view, creating it on first use."""
+        if self.map_widget is None:
+            from gui.matplotlib_widget import DynamicNetworkMap
+            self.map_widget = DynamicNetworkMap(
+                self.monitor.nodes, self.file_path, health=self.monitor.node_health, positions=self.layout_positions
+            )
+            self.stacked_widget.addWidget(self.map_widget)
         self.stacked_widget.setCurrentWidget(self.map_widget)
         self.nodes_button.setChecked(False)
         self.history_button.setChecked(False)
@@ -142,57 +247,122 @@ class NetworkMonitorApp(QMainWindow):
         self.map_button.setStyleSheet(active_style if self.map_button.isChecked() else inactive_style)
 
     def start_node_tasks(self):
-        """Start asynchronous tasks for each node."""
-        self.node_tasks = [asyncio.create_task(self.check_node(node, row)) for row, node in enumerate(self.nodes)]
+        """Start the probe scheduler for every node and watch the node file."""
+        self.monitor.start()
+        self.watch_file()
+        if self.metrics is not None:
+            self.metrics_server = MetricsServer(*self.metrics)
+            self.metrics_server.start()
+        if self.feed is not None:
+            from network.feed import StatusFeed
+            self.feed_server = StatusFeed(self.monitor.status_store, *self.feed)
+            self.feed_server.start()
+
+    def save_state(self):
+        """Save the state snapshot the next start restores, with the map layout if there is one."""
+        if self.map_widget is not None and self.map_widget.pos:
+            self.layout_positions = self.map_widget.pos
+        try:
+            self.monitor.save_state(STATE_PATH, self.layout_positions)
+        except OSError as e:
+            logging.error(f"Could not save state to {STATE_PATH}: {e}")
+
+    def closeEvent(self, event):
+        """Save the state snapshot before the window closes, a viewer drops its private history instead."""
+        self.save_timer.stop()
+        if self.view_dir is None:
+            self.save_state()
+        else:
+            self.events.close()
+            self.view_dir.cleanup()
+        super().closeEvent(event)
+
+    def watch_file(self):
+        """Reload the node file whenever it changes on disk."""
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.watcher = FileWatcher(self.file_path, self.reload_file)
+        self.watcher.start()
+
+    def reload_file(self):
+        """Apply the changes in the node file to the running monitor and views."""
+        nodes = read_node_file(self.file_path)
+        if not nodes:
+            logging.warning(f"No nodes in {self.file_path}, keeping the current nodes")
+            return
+        diff = self.monitor.reload(nodes)
+        if not diff:
+            return
+        logging.info(f"Reloaded {self.file_path}: {diff.summary()}")
+        self.table_model.sync()
+        if self.map_widget is not None:
+            self.map_widget.apply_diff(self.monitor.nodes, diff)
+
+    def add_history_item(self, node: NodeData, status: bool):
+        """Record a status transition in the event log behind the history view.
 
-    async def check_node(self, node: NodeData, row: int):
-        """Check the status of a node and update the table.
+        Args:
+            node (NodeData): The node that changed status.
+            status (bool): True if the node came online, False if it went offline.
+        """
+        self.events.append(CAME_ONLINE if status else WENT_OFFLINE, node.ip)
+
+    def add_reachability_item(self, cause: NodeData | None, nodes: list[NodeData], reachable: bool):
+        """Record one event for a group of nodes cut off or reconnected together.
 
         Args:
-            node (NodeData): The node to check.
-            row (int): The row index in the table.
+            cause (NodeData | None): The node whose status change caused it, None after a reload.
+            nodes (list[NodeData]): The affected nodes.
+            reachable (bool): True if they became reachable again.
         """
-        while True:
-            status = await ping(node.ip)
-            status_text = "Online" if status else "Offline"
-            timestamp = time.strftime("%H:%M:%S")
-            self.node_status[node.ip] = (status_text, timestamp)
-
-            # Log status to node-specific log
-            node_logger = self.node_loggers[node.ip]
-            node_logger.info(f"Node {node.ip} is {status_text}")
-
-            # Update the table widget with color coding
-            status_item = self.table_widget.item(row, 1)
-            status_item.setText(status_text)
-            if status_text == "Online":
-                status_item.setForeground(QColor("green"))
-            elif status_text == "Offline":
-                status_item.setForeground(QColor("red"))
-            else:
-                status_item.setForeground(QColor("yellow"))
-
-            timestamp_item = self.table_widget.item(row, 2)
-            timestamp_item.setText(timestamp)
-
-            # Update history list only if status changes
-            if self.previous_status[node.ip] != status_text:
-                self.history_list.addItem(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - Node {node.ip} has {'come online' if status_text == 'Online' else 'gone offline'} at {timestamp}")
-                self.previous_status[node.ip] = status_text
-
-            await asyncio.sleep(5)  # Check every 5 seconds
+        self.events.append(RECONNECTED if reachable else CUT_OFF, cause.ip if cause is not None else None, count=len(nodes))
 
     def update_dashboard(self):
         """Update the dashboard with the latest node statuses."""
-        for row, node in enumerate(self.nodes):
-            status_text, timestamp = self.node_status[node.ip]
-
-            # Update the node's online status using a boolean
-            node.is_online = (status_text == "Online")
-            node_logger = self.node_loggers[node.ip]
-            node_logger.debug(f"Updated node {node.ip} to {'online' if node.is_online else 'offline'}")  # Debug statement
-
-        self.map_widget.update_map_signal.emit()
+        self.history.flush()
+        self.events.flush()
+        if self.map_widget is not None:
+            self.map_widget.update_map_signal.emit()
+
+    def toggle_profiler(self):
+        """Start or stop the sampling profiler and report where the profile went."""
+        path = PROFILER.toggle()
+        # The profiler may also have been toggled by SIGUSR1 in the meantime
+        self.profile_button.setChecked(PROFILER.running)
+        self.profile_button.setText("Stop Profiling" if PROFILER.running else "Start Profiling")
+        if path is not None:
+            self.statusBar().showMessage(f"Profile written to {path}", 10000)
+
+    def filter_nodes(self):
+        """Filter the node table by the selected status."""
+        self.table_proxy.set_status_filter(self.status_filter.currentData())
+
+    def filter_history(self):
+        """Filter the history by node, time window and outage length."""
+        self.history_model.set_filters(
+            self.node_filter.text().strip(), self.window_filter.currentData(), self.outage_filter.currentData()
+        )
+        self.update_history_summary()
+
+    def refresh_history_summary(self):
+        """Refresh the history summary if the history view is shown."""
+        if self.stacked_widget.currentWidget() is self.history_page:
+            self.update_history_summary()
+
+    def update_history_summary(self):
+        """Show the nodes that lost probes this hour, and the 24-hour availability of the filtered node."""
+        ips = self.monitor.status_store.ips
+        lossy = [ips[row] for row in self.history.lossy_nodes() if row < len(ips)]
+        if lossy:
+            named = ", ".join(lossy[:LOSSY_SHOWN]) + (f" and {len(lossy) - LOSSY_SHOWN} more" if len(lossy) > LOSSY_SHOWN else "")
+            text = f"Lossy this hour: {named}"
+        else:
+            text = "No lossy nodes this hour"
+        row = self.monitor.status_store.rows.get(self.node_filter.text().strip())
+        if row is not None:
+            availability = self.history.node_availability(row)
+            text += f"  |  {ips[row]} over 24 hours: " + ("no samples" if availability is None else f"{availability:.2%} available")
+        self.history_summary.setText(text)
 
     def change_file(self):
         """Open a file dialog to change the monitored file."""
@@ -200,27 +370,6 @@ class NetworkMonitorApp(QMainWindow):
         if new_file_path:
             self.file_path = new_file_path
             self.file_label.setText(f"Monitoring file: {self.file_path}")
-            # Reload nodes from the new file
-            self.nodes = sorted(read_node_file(self.file_path), key=lambda node: node.ip)
-            self.node_status = {node.ip: ("Checking...", "-") for node in self.nodes}
-            self.previous_status = {node.ip: None for node in self.nodes}
-            self.node_loggers = {node.ip: setup_node_logging(node.ip) for node in self.nodes}
-            self.table_widget.setRowCount(len(self.nodes))
-            for row, node in enumerate(self.nodes):
-                node_item = QTableWidgetItem(node.ip)
-                node_item.setFlags(node_item.flags() & ~Qt.ItemIsEditable)
-                self.table_widget.setItem(row, 0, node_item)
-
-                status_item = QTableWidgetItem("Checking...")
-                status_item.setForeground(QColor("yellow"))
-                status_item.setFlags(status_item.flags() & ~Qt.ItemIsEditable)
-                self.table_widget.setItem(row, 1, status_item)
-
-                timestamp_item = QTableWidgetItem("-")
-                timestamp_item.setFlags(timestamp_item.flags() & ~Qt.ItemIsEditable)
-                self.table_widget.setItem(row, 2, timestamp_item)
-
-            # Restart node tasks
-            for task in self.node_tasks:
-                task.cancel()
-            self.start_node_tasks()
\ No newline at end of file
+            # Nodes present in both files keep their state
+            self.reload_file()
+            self.watch_file()
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+import numpy as np
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from network.events import EventLog
+
+PAGE = 256  # Rows read and formatted together
+MAX_PAGES = 32  # Formatted pages kept in memory
+POLL_MS = 250  # How often new events are picked up
+
+
+class EventListModel(QAbstractListModel):
+    """Virtual list model over an EventLog, newest event first.
+
+    The model holds only the sequence numbers of the events matching its
+    filters. Rows are read and formatted a page at a time when a view asks
+    for them, and a bounded cache keeps the most recently shown pages, so
+    memory stays flat however long the log grows. New events are picked up
+    by a timer and inserted at the top; events deleted with their segment
+    are removed from the bottom.
+    """
+
+    def __init__(self, log: EventLog, parent=None):
+        """Initialize the model.
+
+        Args:
+            log (EventLog): The event log backing the model.
+            parent (QObject, optional): Parent object. Defaults to None.
+        """
+        super().__init__(parent)
+        self.log = log
+        self.filters = {}
+        self.matches = log.query()  # Oldest first, row 0 shows the last one
+        self.seen = log.count
+        self.pages: OrderedDict[int, list[str]] = OrderedDict()
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.flush)
+        self.poll_timer.start(POLL_MS)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        """Return the number of matching events."""
+        return 0 if parent.isValid() else len(self.matches)
+
+    def _page(self, page: int) -> list[str]:
+        """Return the formatted lines of a page, reading it on a cache miss.
+
+        Pages count from the oldest match, so inserting newer events at the
+        top only changes the newest page.
+        """
+        lines = self.pages.get(page)
+        if lines is not None:
+            self.pages.move_to_end(page)
+            return lines
+        records = self.log.read(self.matches[page * PAGE:(page + 1) * PAGE])
+        lines = [self.log.describe(record) for record in records]
+        if len(self.pages) >= MAX_PAGES:
+            self.pages.popitem(last=False)
+        self.pages[page] = lines
+        return lines
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        """Return the history line of a row."""
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        position = len(self.matches) - 1 - index.row()
+        return self._page(position // PAGE)[position % PAGE]
+
+    def set_filters(self, node: str = "", hours: float | None = None, min_outage: float | None = None):
+        """Show only the matching events.
+
+        Args:
+            node (str): Only events of nodes whose address contains this text, every node if empty.
+            hours (float | None): Only events of the last hours.
+            min_outage (float | None): Only nodes coming online after at least this many seconds offline.
+        """
+        self.filters = {"node": node, "hours": hours, "min_outage": min_outage}
+        self.beginResetModel()
+        self.seen = self.log.count
+        self.matches = self._query()
+        self.pages.clear()
+        self.endResetModel()
+
+    def _query(self, start: int = 0) -> np.ndarray:
+        """Query the log with the current filters."""
+        node, hours = self.filters.get("node"), self.filters.get("hours")
+        return self.log.query(
+            nodes=self.log.nodes_matching(node) if node else None,
+            since=time.time() - hours * 3600 if hours else None,
+            min_outage=self.filters.get("min_outage"),
+            start=start,
+        )
+
+    def flush(self):
+        """Insert events appended since the last flush and drop expired ones."""
+        expired = int(np.searchsorted(self.matches, self.log.first))
+        if expired:
+            self.beginRemoveRows(QModelIndex(), len(self.matches) - expired, len(self.matches) - 1)
+            self.matches = self.matches[expired:]
+            self.pages.clear()
+            self.endRemoveRows()
+
+        if self.log.count == self.seen:
+            return
+        added = self._query(self.seen)
+        self.seen = self.log.count
+        if not len(added):
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(added) - 1)
+        self.pages.pop(len(self.matches) // PAGE, None)  # The newest page grows
+        self.matches = np.concatenate([self.matches, added])
+        self.endInsertRows()
@@ -0,0 +1,435 @@
+import ipaddress
+import logging
+import math
+import threading
+import time
+from typing import Callable, Iterator
+import numpy as np
+from network.nodestore import IPV6_FLAG, pack_address
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+NODE_RADIUS = 1.0  # Radius of a single node in layout units
+GAP = 1.0  # Room left between neighbouring items
+PACKING = 1.25  # Slack of a cluster's disc over the summed area of its items
+CLUSTER_MIN = 200  # Networks up to this size are shown without clustering
+TOP_LIMIT = 150  # Most items on one level before they are grouped by subnet
+MIN_GROUP = 3  # Fewest leaves of one parent collapsed into a cluster
+SUBNET_PREFIXES = ((24, 64), (16, 48), (8, 32))  # IPv4 and IPv6 prefix per grouping level
+FORCE_LIMIT = 800  # Largest group laid out by force simulation, larger ones are packed
+ITERATIONS = 80  # Force iterations of the top level
+INNER_ITERATIONS = 30  # Force iterations inside a cluster, which starts out packed
+CHUNK = 10  # Iterations between progress snapshots of the top level
+SNAPSHOT_INTERVAL = 0.25  # Seconds between snapshots while refining clusters
+SEED = 1734289230
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+
+class Cluster:
+    """A group of nodes the map can collapse into one glyph.
+
+    A cluster is either the leaves hanging off one parent node or the items
+    of a subnet, which may themselves be clusters.
+    """
+
+    __slots__ = ("key", "label", "items", "members", "address", "radius")
+
+    def __init__(self, key: str, label: str, items: list, address: str):
+        """Initialize the cluster.
+
+        Args:
+            key (str): Stable identifier, kept across reloads.
+            label (str): Text shown on the glyph.
+            items (list[int | Cluster]): Node indexes and nested clusters directly inside.
+            address (str): Address the cluster is grouped by at the next level up.
+        """
+        self.key = key
+        self.label = label
+        self.items = items
+        self.address = address
+        members = [item for item in items if isinstance(item, int)]
+        nested = [item.members for item in items if isinstance(item, Cluster)]
+        self.members = np.sort(np.concatenate([np.asarray(members, dtype=np.intp), *nested]))
+        self.radius = PACKING * math.sqrt(sum((item_radius(item) + GAP / 2) ** 2 for item in items))
+
+    def __len__(self) -> int:
+        """Return the number of nodes in the cluster."""
+        return len(self.members)
+
+
+def item_radius(item) -> float:
+    """Return the radius of a node index or cluster."""
+    return item.radius if isinstance(item, Cluster) else NODE_RADIUS
+
+
+def item_key(item, ips: list[str]) -> str:
+    """Return the position key of a node index or cluster."""
+    return item.key if isinstance(item, Cluster) else ips[item]
+
+
+def walk(items: list) -> Iterator[Cluster]:
+    """Iterate over the clusters in a tree, parents first."""
+    for item in items:
+        if isinstance(item, Cluster):
+            yield item
+            yield from walk(item.items)
+
+
+def _subnet(address: str, level: int) -> tuple[int, int] | None:
+    """Return the version and network bits of an address's subnet at a grouping level, None for hostnames."""
+    key = pack_address(address)
+    if key is None:
+        return None
+    v4, v6 = SUBNET_PREFIXES[level]
+    if key & IPV6_FLAG:
+        return 6, (key & ~IPV6_FLAG) >> (128 - v6)
+    return 4, key >> (32 - v4)
+
+
+def _subnet_name(subnet: tuple[int, int] | None, level: int) -> str:
+    """Return a subnet from ``_subnet`` in CIDR notation."""
+    if subnet is None:
+        return "hostnames"
+    version, bits = subnet
+    v4, v6 = SUBNET_PREFIXES[level]
+    if version == 6:
+        return str(ipaddress.IPv6Network((bits << (128 - v6), v6)))
+    return str(ipaddress.IPv4Network((bits << (32 - v4), v4)))
+
+
+def build_clusters(ips: list[str], edges: np.ndarray) -> list:
+    """Group a network into a cluster tree for level-of-detail rendering.
+
+    Small networks are not grouped. Otherwise leaves hanging off the same
+    parent become one cluster, and while a level holds more than
+    ``TOP_LIMIT`` items they are grouped by ever wider subnets.
+
+    Args:
+        ips (list[str]): Addresses of the nodes, their position is the node index.
+        edges (np.ndarray): Connections as an ``(m, 2)`` array of node indexes.
+
+    Returns:
+        list[int | Cluster]: The top-level items.
+    """
+    count = len(ips)
+    if count <= CLUSTER_MIN:
+        return list(range(count))
+
+    degree = np.bincount(edges.ravel(), minlength=count)
+    children: dict[int, list[int]] = {}
+    for leaf_side, parent_side in ((0, 1), (1, 0)):
+        leaves, parents = edges[:, leaf_side], edges[:, parent_side]
+        mask = (degree[leaves] == 1) & (degree[parents] > 1)
+        for leaf, parent in zip(leaves[mask].tolist(), parents[mask].tolist()):
+            children.setdefault(parent, []).append(leaf)
+
+    grouped = set()
+    below: dict[int, Cluster] = {}
+    for parent, leaves in children.items():
+        if len(leaves) >= MIN_GROUP:
+            below[parent] = Cluster(f"children:{ips[parent]}", f"under {ips[parent]}", sorted(leaves), ips[parent])
+            grouped.update(leaves)
+    top = []
+    for index in range(count):
+        if index not in grouped:
+            top.append(index)
+            if index in below:
+                top.append(below[index])
+
+    for level in range(len(SUBNET_PREFIXES)):
+        if len(top) <= TOP_LIMIT:
+            break
+        subnets: dict[tuple[int, int] | None, list] = {}
+        for item in top:
+            address = item.address if isinstance(item, Cluster) else ips[item]
+            subnets.setdefault(_subnet(address, level), []).append(item)
+        if len(subnets) == len(top):
+            continue  # Every item is alone in its subnet, try a wider prefix
+        if len(subnets) == 1:
+            break  # One subnet holds everything, wider ones would too
+        top = [items[0] if len(items) == 1 else _subnet_cluster(_subnet_name(subnet, level), items, ips) for subnet, items in subnets.items()]
+    return top
+
+
+def _subnet_cluster(name: str, items: list, ips: list[str]) -> Cluster:
+    """Return the cluster of the items in a subnet."""
+    first = items[0]
+    return Cluster(f"subnet:{name}", name, items, first.address if isinstance(first, Cluster) else ips[first])
+
+
+def pack(radii: np.ndarray) -> np.ndarray:
+    """Place items of the given radii on a sunflower spiral, largest first, around the origin."""
+    order = np.argsort(-radii, kind="stable")
+    area = (radii[order] + GAP / 2) ** 2
+    distance = PACKING * np.sqrt(np.cumsum(area) - area / 2)
+    angle = np.arange(len(radii)) * GOLDEN_ANGLE
+    positions = np.empty((len(radii), 2))
+    positions[order, 0] = distance * np.cos(angle)
+    positions[order, 1] = distance * np.sin(angle)
+    return positions
+
+
+def relax(positions: np.ndarray, radii: np.ndarray, edges: np.ndarray, fixed: np.ndarray, iterations: int, step: float, cooling: float) -> float:
+    """Run force-directed iterations in place and return the cooled step.
+
+    Fruchterman-Reingold with an ideal distance per pair that grows with
+    the radii of both items, so large clusters keep their distance, springs
+    that weaken with the degree of their ends, a collision push between overlapping items and a weak pull to the origin
+    holding disconnected parts together. Fixed items do not move.
+
+    Args:
+        positions (np.ndarray): ``(n, 2)`` item centres, updated in place.
+        radii (np.ndarray): Item radii.
+        edges (np.ndarray): ``(m, 2)`` array of connected item indexes.
+        fixed (np.ndarray): Boolean mask of items that keep their position.
+        iterations (int): Number of iterations to run.
+        step (float): Largest move in the first iteration.
+        cooling (float): Amount the largest move shrinks by per iteration.
+    """
+    count = len(positions)
+    if count < 2 or fixed.all():
+        return step
+    k = 2 * NODE_RADIUS + GAP
+    gravity = 0.02 / max(1.0, math.sqrt(count))
+    x, y = positions[:, 0].astype(np.float32), positions[:, 1].astype(np.float32)
+    rims = (radii[:, None] + radii[None, :]).astype(np.float32)
+    ideal = np.square(rims + (k - 2 * NODE_RADIUS))
+    diagonal = np.eye(count, dtype=bool)
+    moving = ~fixed
+    a, b = edges[:, 0], edges[:, 1]
+    edge_ideal = radii[a] + radii[b] + (k - 2 * NODE_RADIUS)
+    # Weaker springs between well connected items, or a dense graph pulls everything into a heap
+    degree = np.bincount(edges.ravel(), minlength=count)
+    edge_ideal *= np.sqrt(degree[a] * degree[b])
+    for _ in range(iterations):
+        dx = x[:, None] - x[None, :]
+        dy = y[:, None] - y[None, :]
+        distance = np.hypot(dx, dy)
+        distance[diagonal] = 1.0
+        np.maximum(distance, 0.01, out=distance)
+        overlap = np.maximum(rims - distance, 0.0)
+        weight = (ideal / distance + 10 * overlap) / distance
+        weight[diagonal] = 0.0
+        mx = (dx * weight).sum(1) - gravity * x
+        my = (dy * weight).sum(1) - gravity * y
+        if len(edges):
+            ex, ey = x[a] - x[b], y[a] - y[b]
+            pull = np.hypot(ex, ey) / edge_ideal
+            mx -= np.bincount(a, ex * pull, count) - np.bincount(b, ex * pull, count)
+            my -= np.bincount(a, ey * pull, count) - np.bincount(b, ey * pull, count)
+        length = np.maximum(np.hypot(mx, my), 1e-6)
+        scale = np.minimum(length, step) / length * moving
+        x += mx * scale
+        y += my * scale
+        step = max(step - cooling, 0.1 * k / ITERATIONS)
+    positions[:, 0] = x
+    positions[:, 1] = y
+    return step
+
+
+def separate(positions: np.ndarray, radii: np.ndarray, fixed: np.ndarray, iterations: int = 50):
+    """Push overlapping items apart in place, leaving fixed items where they are.
+
+    Dense graphs can pull items into each other faster than the simulation
+    pushes them apart, so the top level finishes with this pass.
+    """
+    count = len(positions)
+    if count < 2 or fixed.all():
+        return
+    rims = radii[:, None] + radii[None, :] + GAP / 2
+    diagonal = np.eye(count, dtype=bool)
+    share = np.where(fixed[None, :], 1.0, np.where(fixed[:, None], 0.0, 0.5))  # Who moves for a pair
+    for _ in range(iterations):
+        delta = positions[:, None, :] - positions[None, :, :]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(-1)), 1e-6)
+        overlap = np.maximum(rims - distance, 0.0)
+        overlap[diagonal] = 0.0
+        if not overlap.any():
+            return
+        push = (delta * (overlap * share / distance)[..., None]).sum(1)
+        push[fixed] = 0.0
+        positions += push
+
+
+class LayoutJob:
+    """Clusters a network and lays it out level by level, yielding progressively better snapshots.
+
+    Every item is placed relative to the centre of the cluster holding it,
+    so moving a cluster moves everything inside. Items with a previous
+    position keep it and new items start next to their laid out neighbours,
+    so a reload that adds nodes does not reshuffle the map. Force simulation
+    runs on at most ``FORCE_LIMIT`` items at a time, larger groups and groups
+    without internal connections are packed on a spiral.
+    """
+
+    def __init__(self, ips: list[str], edges: np.ndarray, previous: dict[str, tuple[float, float]] | None = None):
+        """Initialize the job.
+
+        Args:
+            ips (list[str]): Addresses of the nodes, their position is the node index.
+            edges (np.ndarray): Connections as an ``(m, 2)`` array of node indexes.
+            previous (dict[str, tuple[float, float]] | None): Earlier absolute positions by node address or cluster key.
+        """
+        self.ips = ips
+        self.edges = edges
+        self.tree: list = []  # Top-level items, built by run()
+        self.previous = previous or {}
+        self.rng = np.random.default_rng(SEED)
+        self.cancelled = False
+        self.local: dict[str | None, np.ndarray] = {}  # Item positions relative to their cluster's centre, by cluster key
+        # Neighbours of every node in CSR form, to find the connections inside a group
+        both = np.concatenate([edges, edges[:, ::-1]]) if len(edges) else np.empty((0, 2), dtype=np.intp)
+        order = np.argsort(both[:, 0], kind="stable")
+        self.targets = both[order, 1]
+        self.offsets = np.searchsorted(both[order, 0], np.arange(len(ips) + 1))
+        self.owner = np.full(len(ips), -1, dtype=np.intp)
+
+    def _group_edges(self, items: list) -> np.ndarray:
+        """Return the connections between the items of a group as item index pairs."""
+        members = [item.members if isinstance(item, Cluster) else np.array([item], dtype=np.intp) for item in items]
+        sources = np.concatenate(members) if members else np.empty(0, dtype=np.intp)
+        owners = np.repeat(np.arange(len(items)), [len(m) for m in members])
+        starts = self.offsets[sources]
+        counts = self.offsets[sources + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.empty((0, 2), dtype=np.intp)
+        self.owner[sources] = owners
+        neighbours = self.targets[np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)]
+        pairs = np.stack([np.repeat(owners, counts), self.owner[neighbours]], axis=1)
+        self.owner[sources] = -1
+        pairs = pairs[(pairs[:, 1] >= 0) & (pairs[:, 0] < pairs[:, 1])]
+        return np.unique(pairs, axis=0)
+
+    def _start(self, items: list, centre: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return the initial relative positions of a group, its radii, edges and fixed mask."""
+        radii = np.array([item_radius(item) for item in items])
+        edges = self._group_edges(items)
+        positions = pack(radii)
+        fixed = np.zeros(len(items), dtype=bool)
+        for position, item in enumerate(items):
+            previous = self.previous.get(item_key(item, self.ips))
+            if previous is not None:
+                positions[position] = np.asarray(previous) - centre
+                fixed[position] = True
+        if fixed.any() and not fixed.all():
+            # New items start next to their placed neighbours, or outside the placed ones
+            extent = np.sqrt((positions[fixed] ** 2).sum(1)).max() + radii[fixed].max()
+            placed = fixed.copy()
+            for _ in range(3):
+                for a, b in edges.tolist():
+                    for new, old in ((a, b), (b, a)):
+                        if not placed[new] and placed[old]:
+                            positions[new] = positions[old] + self.rng.normal(0, radii[old] + radii[new] + GAP, 2)
+                            placed[new] = True
+            for position in np.flatnonzero(~placed):
+                angle = self.rng.uniform(0, 2 * math.pi)
+                positions[position] = (extent + radii[position] + GAP) * np.array([math.cos(angle), math.sin(angle)])
+        return positions, radii, edges, fixed
+
+    def snapshot(self) -> tuple[np.ndarray, dict[str, tuple[float, float]]]:
+        """Return the absolute node positions and cluster centres laid out so far."""
+        nodes = np.zeros((len(self.ips), 2))
+        centres: dict[str, tuple[float, float]] = {}
+
+        def place(items: list, positions: np.ndarray, origin: np.ndarray):
+            for item, position in zip(items, positions):
+                absolute = origin + position
+                if isinstance(item, Cluster):
+                    centres[item.key] = (float(absolute[0]), float(absolute[1]))
+                    inner = self.local.get(item.key)
+                    if inner is not None:
+                        place(item.items, inner, absolute)
+                    else:
+                        nodes[item.members] = absolute
+                else:
+                    nodes[item] = absolute
+
+        place(self.tree, self.local[None], np.zeros(2))
+        return nodes, centres
+
+    def run(self) -> Iterator[tuple[np.ndarray, dict[str, tuple[float, float]], bool]]:
+        """Cluster the nodes and lay them out, yielding ``(node positions, cluster centres, done)`` snapshots."""
+        self.tree = build_clusters(self.ips, self.edges)
+        self.local = {}
+        radius = {cluster.key: cluster.radius for cluster in walk(self.tree)}
+        # Initial placement of every level, cheap enough to show right away
+        pending = []
+        queue = [(None, self.tree, np.zeros(2))]
+        while queue:
+            key, items, centre = queue.pop()
+            positions, radii, edges, fixed = self._start(items, centre)
+            self.local[key] = positions
+            if len(items) <= FORCE_LIMIT and len(edges) and not fixed.all():
+                pending.append((key, positions, radii, edges, fixed))
+            for item, position in zip(items, positions):
+                if isinstance(item, Cluster):
+                    queue.append((item.key, item.items, centre + position))
+        nodes, centres = self.snapshot()
+        yield nodes, centres, not pending
+
+        # Refine the top level first, in chunks, then each cluster
+        last = time.monotonic()
+        for index, (key, positions, radii, edges, fixed) in enumerate(pending):
+            iterations = ITERATIONS if key is None else INNER_ITERATIONS
+            step = max(1.0, float(np.ptp(positions, axis=0).max()) / 10)
+            cooling = step / (iterations + 1)
+            for _ in range(0, iterations, CHUNK):
+                if self.cancelled:
+                    return
+                step = relax(positions, radii, edges, fixed, CHUNK, step, cooling)
+                if key is None and not fixed.all():
+                    nodes, centres = self.snapshot()
+                    yield nodes, centres, False
+            if key is None:
+                separate(positions, radii, fixed)
+            elif not fixed.any():
+                # Shrink the group into its cluster's disc if the simulation spread it wider
+                extent = float((np.sqrt((positions ** 2).sum(1)) + radii).max())
+                if extent > radius[key]:
+                    positions *= radius[key] / extent
+            if time.monotonic() - last > SNAPSHOT_INTERVAL and index < len(pending) - 1:
+                last = time.monotonic()
+                nodes, centres = self.snapshot()
+                yield nodes, centres, False
+        if pending:
+            nodes, centres = self.snapshot()
+            yield nodes, centres, True
+
+
+class LayoutThread:
+    """Runs a LayoutJob on a daemon thread and hands each snapshot to a callback.
+
+    The callback runs on the layout thread, GUI code passes a Qt signal's
+    ``emit`` so the snapshot is delivered on the GUI thread.
+    """
+
+    def __init__(self, job: LayoutJob, deliver: Callable[[LayoutJob, np.ndarray, dict, bool], None]):
+        """Start laying out.
+
+        Args:
+            job (LayoutJob): The job to run.
+            deliver (Callable[[LayoutJob, np.ndarray, dict, bool], None]): Called with the job and
+                every snapshot.
+        """
+        self.job = job
+        self.thread = threading.Thread(target=self._run, args=(deliver,), name="map-layout", daemon=True)
+        self.thread.start()
+
+    def _run(self, deliver: Callable[[LayoutJob, np.ndarray, dict, bool], None]):
+        """Run the job until it finishes or is cancelled."""
+        started = time.perf_counter()
+        try:
+            for nodes, centres, done in self.job.run():
+                if self.job.cancelled:
+                    return
+                deliver(self.job, nodes, centres, done)
+        except Exception as e:
+            logger.error(f"Map layout failed: {e}")
+            return
+        logger.debug(f"Laid out {len(self.job.ips)} nodes in {time.perf_counter() - started:.2f} s")
+
+    def cancel(self):
+        """Stop the job at its next snapshot."""
+        self.job.cancelled = True
@@ -1,128 +1,627 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout
-from PySide6.QtCore import Signal, QEvent
+from PySide6.QtCore import Signal, QEvent, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_agg import RendererAgg
 from matplotlib.figure import Figure
-import networkx as nx
-import PIL
-from network.checker import read_node_file
-import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.colors import to_rgba
+from matplotlib.patches import Circle, Rectangle
+import numpy as np
+from gui.map_layout import NODE_RADIUS, Cluster, LayoutJob, LayoutThread
+from network.metrics import MAP_REDRAW
 from network.node import NodeData
+from network.nodestore import iter_edges
+from network.registry import NodeDiff
+from typing import Callable
 import logging
+import math
+import time
 
 # Initialize a logger for this module
 logger = logging.getLogger(__name__)
 
+ONLINE = "online"
+DEGRADED = "degraded"
+OFFLINE = "offline"
+UNREACHABLE = "unreachable"
+HEALTH = (ONLINE, DEGRADED, OFFLINE, UNREACHABLE)  # Health codes index this tuple
+HEALTH_CODES = {health: code for code, health in enumerate(HEALTH)}
+BOX_COLORS = {
+    ONLINE: to_rgba("lightgreen"), DEGRADED: to_rgba("gold"), OFFLINE: to_rgba("lightcoral"), UNREACHABLE: to_rgba("silver"),
+}
+GLOW_COLORS = {
+    ONLINE: to_rgba("green", 0.3), DEGRADED: to_rgba("orange", 0.3), OFFLINE: to_rgba("red", 0.3), UNREACHABLE: to_rgba("gray", 0.3),
+}
+BOX_TABLE = np.array([BOX_COLORS[health] for health in HEALTH])
+GLOW_TABLE = np.array([GLOW_COLORS[health] for health in HEALTH])
+PADDING = 3  # Box padding around the label, in pixels
+GLOW = 1.5  # Extra glow margin around the box, in pixels
+LABEL_LIMIT = 300  # Most single nodes drawn as labelled boxes, more are drawn as dots
+EXPAND_PIXELS = 60  # On-screen radius from which a cluster opens by itself
+ITEM_PIXELS = 14  # Room on screen each item of a cluster needs before it opens by itself
+TEXT_PIXELS = 18  # On-screen radius from which a cluster shows its counts
+CLICK_PIXELS = 4  # A press and release closer than this is a click, not a drag
+ZOOM_STEP = 1.25
+REFRESH_DELAY = 40  # Milliseconds a view refresh waits for further zoom or resize steps
+
+
 class DynamicNetworkMap(QWidget):
+    """Network map with background layout and level-of-detail rendering.
+
+    The layout runs on a worker thread and refines progressively, see
+    ``gui.map_layout``. Large networks are collapsed into cluster glyphs, a
+    router's leaves or a subnet, showing how many of their nodes are up and
+    down. Zooming in opens clusters that have room on screen, clicking a
+    glyph opens it and right-clicking inside an open cluster closes it.
+    Single nodes are labelled boxes while few are visible, dots otherwise.
+    """
+
     update_map_signal = Signal()
+    layout_ready = Signal(object, object, object, bool)
 
-    def __init__(self, nodes: list[NodeData], file_path: str, parent=None):
+    def __init__(
+        self,
+        nodes: list[NodeData],
+        file_path: str,
+        health: Callable[[NodeData], str] | None = None,
+        positions: dict[str, tuple[float, float]] | None = None,
+        parent=None,
+    ):
         """Initialize the DynamicNetworkMap widget.
 
         Args:
             nodes (list[NodeData]): List of nodes to display on the map.
             file_path (str): Path to the node file.
+            health (Callable[[NodeData], str] | None): Returns "online", "degraded", "offline" or
+                "unreachable" for a node. Defaults to using ``node.is_online``.
+            positions (dict[str, tuple[float, float]] | None): Positions by node address and cluster key from an
+                earlier layout, e.g. a state snapshot. Nodes keep them and only new ones are laid out.
             parent (QWidget, optional): Parent widget. Defaults to None.
         """
         super().__init__(parent)
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
-        
+
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
         self.setLayout(layout)
+        self.setToolTip(
+            "Scroll to zoom, drag to pan, click a group to open it, right-click to close it, double-click to reset"
+        )
         self.file_path = file_path
         self.nodes = nodes  # Store the nodes list as an instance attribute
+        self.health = health or (lambda node: ONLINE if node.is_online else OFFLINE)
+
+        # The axes are created once, every later phase only touches their artists
+        self.figure.patch.set_facecolor('black')
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_axis_off()
+        self.ax.set_facecolor('black')
+        self.figure.subplots_adjust(left=0, right=1, top=1, bottom=0)
+
+        # Layout: positions by node address and cluster key, kept across reloads
+        self.pos: dict[str, tuple[float, float]] = dict(positions or {})
+        self.layout = None  # LayoutThread while a layout is running
+        self.layout_nodes = []  # The nodes being laid out
+        self.job = None  # Layout job the displayed positions come from
+        self.shown = []  # The nodes the displayed positions belong to
+        self.node_xy = None
+        self.centres: dict[str, tuple[float, float]] = {}
+        self.moved = False  # Whether the user zoomed or panned, otherwise the view follows the layout
+        self.overrides: dict[str, bool] = {}  # Cluster key -> opened or closed by click
+
+        # View: what the current zoom level shows
+        self.single = np.empty(0, dtype=np.intp)  # Node indexes drawn on their own
+        self.clusters: list[Cluster] = []  # Collapsed clusters
+        self.opened: list[Cluster] = []  # Open clusters inside the view
+        self.labelled = np.empty(0, dtype=np.intp)  # Node indexes drawn as labelled boxes
+        self.dotted = np.empty(0, dtype=np.intp)  # Node indexes drawn as dots
+        self.texts: list[tuple[Cluster, object]] = []  # Cluster glyphs showing their counts
+        self.codes = None  # Health code of every node at the last recolour
 
-        # Connect the signal to the draw method
+        self.static_artists = []
+        self.labels = []
+        self.label_size = None
+        self.label_pixels = None
+        self.label_alpha = None
+        self.label_rgb = None
+        self.count_layers: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}  # Cluster key -> rendered count text
+        self.count_pixels = None
+        self.boxes = None
+        self.glows = None
+        self.dots = None
+        self.glyphs = None
+        self.background = None
+        self.placeholder = None
+        self.drag = None
+        self.dragging = False
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DELAY)
+        self.refresh_timer.timeout.connect(self.refresh_view)
+
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        self.canvas.mpl_connect('button_press_event', self.on_press)
+        self.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.canvas.mpl_connect('button_release_event', self.on_release)
+
+        # Connect the signals to the draw methods, layout snapshots arrive from the layout thread
         self.update_map_signal.connect(self.draw_dynamic_map)
+        self.layout_ready.connect(self.on_layout)
+
+        self.draw_topology(keep_positions=bool(self.pos))
+
+    @property
+    def layout_pending(self) -> bool:
+        """Return whether a layout is still being computed."""
+        return self.layout is not None
+
+    def set_nodes(self, nodes: list[NodeData]):
+        """Replace the displayed nodes and rebuild the topology.
+
+        Args:
+            nodes (list[NodeData]): List of nodes to display on the map.
+        """
+        self.nodes = nodes
+        self.draw_topology()
 
-        self.draw_dynamic_map()
+    def apply_diff(self, nodes: list[NodeData], diff: NodeDiff):
+        """Update the map after a node file reload.
+
+        Surviving nodes keep their positions, only added nodes are laid out.
+        Retyping alone does not change the picture. When nodes were removed
+        the shown layout is dropped with them, so the map never asks for the
+        health of a node that is gone; the next snapshot replaces it.
+
+        Args:
+            nodes (list[NodeData]): The nodes now displayed on the map.
+            diff (NodeDiff): The diff that was applied to the nodes.
+        """
+        self.nodes = nodes
+        if diff.removed:
+            self.shown = []
+            self.node_xy = None
+            self.codes = None
+        if diff.topology_changed:
+            self.draw_topology(keep_positions=True)
 
     def resizeEvent(self, event: QEvent):
-        """Handle the resize event to clear and redraw the map."""
-        self.figure.clear()  # Clear the figure to remove artifacts
-        self.draw_dynamic_map()  # Redraw the map
+        """Handle the resize event by refreshing the view once resizing settles."""
         super().resizeEvent(event)  # Call the base class implementation
+        self.background = None
+        self.refresh_timer.start()
 
-    def draw_dynamic_map(self):
-        """Draw the dynamic network map."""
-        G = nx.Graph()
+    def draw_topology(self, keep_positions: bool = False):
+        """Topology phase: start laying out the current nodes on the layout thread.
 
-        for node in self.nodes:
-            device_type = node.device_type.lower()
-            G.add_node(node.ip, device_type=device_type, is_online=node.is_online)
-            logger.debug(f"Node {node.ip} is {'online' if node.is_online else 'offline'} in draw")
+        Only runs when the node set or the connections change. The map keeps
+        showing the previous layout until the first snapshot arrives.
 
-        for node in self.nodes:
-            for connected_node in node.connections:
-                G.add_edge(node.ip, connected_node.ip)
+        Args:
+            keep_positions (bool): Keep nodes and clusters that already have a
+                position where they are and only lay out the new ones.
+        """
+        started = time.perf_counter()
+        nodes = list(self.nodes)
+        ips = [node.ip for node in nodes]
+        index = {ip: position for position, ip in enumerate(ips)}
+        edges = np.array(
+            [(index[a], index[b]) for a, b in iter_edges(nodes) if a in index and b in index], dtype=np.intp
+        ).reshape(-1, 2)
 
-        # Adjust the spring layout to ensure spacing
-        pos = nx.spring_layout(G, seed=1734289230, k=0.3, iterations=50)
-        ax = self.figure.add_subplot(111)
-        ax.set_axis_off()
+        if self.layout is not None:
+            self.layout.cancel()
+        if not keep_positions:
+            self.pos = {}
+            self.overrides.clear()
+            self.moved = False
+        self.layout_nodes = nodes
+        self.layout = LayoutThread(LayoutJob(ips, edges, dict(self.pos)), self.layout_ready.emit)
+        if self.node_xy is None and nodes:
+            self.placeholder = self.ax.text(
+                0.5, 0.5, f"Laying out {len(nodes)} nodes...", color='white', ha='center', va='center',
+                transform=self.ax.transAxes,
+            )
+            self.canvas.draw_idle()
+        MAP_REDRAW.observe(time.perf_counter() - started)
 
-        # Set the background color of the figure and axes to black
-        self.figure.patch.set_facecolor('black')
-        ax.set_facecolor('black')
-
-        # Draw edges with white color
-        nx.draw_networkx_edges(
-            G,
-            pos=pos,
-            ax=ax,
-            edge_color='white',
-            arrows=True,
-            arrowstyle="-",
-            min_source_margin=15,
-            min_target_margin=15,
-        )
+    def on_layout(self, job: LayoutJob, node_xy: np.ndarray, centres: dict[str, tuple[float, float]], done: bool):
+        """Take a layout snapshot from the layout thread.
 
-        for n in G.nodes:
-            x, y = pos[n]
-            device_type = G.nodes[n]["device_type"]
-            is_online = G.nodes[n]["is_online"]
+        Args:
+            job (LayoutJob): The job the snapshot comes from, stale jobs are ignored.
+            node_xy (np.ndarray): Position of every node of the job.
+            centres (dict[str, tuple[float, float]]): Centre of every cluster of the job.
+            done (bool): Whether this is the final layout.
+        """
+        if self.layout is None or job is not self.layout.job:
+            return
+        first = job is not self.job
+        self.job = job
+        self.shown = self.layout_nodes
+        self.node_xy = node_xy
+        self.centres = centres
+        if first:
+            self.codes = None
+        if done:
+            self.layout = None
+            self.pos = dict(zip(job.ips, map(tuple, node_xy.tolist())))
+            self.pos.update(centres)
+            logger.info(f"Laid out {len(job.ips)} nodes in {len(centres)} clusters")
+        if self.placeholder is not None:
+            self.placeholder.remove()
+            self.placeholder = None
+        if first or done:
+            self.refresh_view()
+        elif not self.refresh_timer.isActive():
+            self.refresh_timer.start()
 
-            # Determine box color based on online status
-            box_color = "lightgreen" if is_online else "lightcoral"
-            logger.debug(f"Drawing node {n} with color {box_color}")
+    def fit_view(self):
+        """Zoom out to show the whole map."""
+        if self.node_xy is None or not len(self.node_xy):
+            return
+        low = self.node_xy.min(axis=0) - 4 * NODE_RADIUS
+        high = self.node_xy.max(axis=0) + 4 * NODE_RADIUS
+        width, height = self.ax.bbox.width, self.ax.bbox.height
+        scale = min(width / (high[0] - low[0]), height / (high[1] - low[1]))
+        self.set_view((low + high) / 2, scale)
 
-            # Add the IP address inside the box with increased font size and bold weight
-            text = ax.text(
-                x, y, n, fontsize=6, fontweight='bold', ha='center', va='center', color='black', transform=ax.transData
-            )
+    def set_view(self, centre: tuple[float, float], scale: float):
+        """Show the map around a centre at a zoom level, with equal scales on both axes.
 
-            # Get the bounding box of the text
-            renderer = self.figure.canvas.get_renderer()
-            bbox = text.get_window_extent(renderer=renderer)
+        Args:
+            centre (tuple[float, float]): The layout position in the middle of the view.
+            scale (float): Pixels per layout unit.
+        """
+        half_width = self.ax.bbox.width / scale / 2
+        half_height = self.ax.bbox.height / scale / 2
+        self.ax.set_xlim(centre[0] - half_width, centre[0] + half_width)
+        self.ax.set_ylim(centre[1] - half_height, centre[1] + half_height)
+
+    def scale(self) -> float:
+        """Return the current zoom in pixels per layout unit."""
+        x0, x1 = self.ax.get_xlim()
+        return self.ax.bbox.width / max(x1 - x0, 1e-9)
+
+    def is_open(self, cluster: Cluster, scale: float) -> bool:
+        """Return whether a cluster is shown open at a zoom level."""
+        opened = self.overrides.get(cluster.key)
+        if opened is not None:
+            return opened
+        radius = cluster.radius * scale
+        return radius >= EXPAND_PIXELS and radius >= ITEM_PIXELS * math.sqrt(len(cluster.items))
+
+    def refresh_view(self):
+        """View phase: decide what the current zoom level shows and rebuild the artists.
 
-            # Convert bbox to data coordinates
-            bbox_data = bbox.transformed(ax.transData.inverted())
-
-            # Calculate the rectangle with padding
-            padding = 0.05  # Adjust padding as needed
-            rect = plt.Rectangle(
-                (bbox_data.x0 - padding, bbox_data.y0 - padding),
-                bbox_data.width + 2 * padding,
-                bbox_data.height + 2 * padding,
-                edgecolor='black',  # Set border color to white
-                facecolor=box_color,
-                transform=ax.transData,
-                zorder=text.get_zorder() - 1  # Ensure the rectangle is below the text
+        Runs after layout snapshots, zooming, panning, clicks and resizes.
+        Clusters are opened when they have room on screen, or were opened by
+        a click, and lie inside the view. Connections are drawn between the
+        items shown, a connection into a collapsed cluster ends at its glyph.
+        """
+        if self.node_xy is None:
+            return
+        started = time.perf_counter()
+        if self.moved:
+            # Keep the scales equal after a resize
+            (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+            self.set_view(((x0 + x1) / 2, (y0 + y1) / 2), self.scale())
+        else:
+            self.fit_view()
+        scale = self.scale()
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+
+        single, clusters, opened = [], [], []
+
+        def visit(items: list):
+            for item in items:
+                if not isinstance(item, Cluster):
+                    single.append(item)
+                    continue
+                cx, cy = self.centres[item.key]
+                r = item.radius
+                visible = cx + r >= x0 and cx - r <= x1 and cy + r >= y0 and cy - r <= y1
+                if visible and self.is_open(item, scale):
+                    opened.append(item)
+                    visit(item.items)
+                else:
+                    clusters.append(item)
+
+        visit(self.job.tree)
+        self.single = np.array(single, dtype=np.intp)
+        self.clusters = clusters
+        self.opened = opened
+
+        # Every node is represented by itself or the collapsed cluster holding it
+        count = len(self.single)
+        item_xy = np.concatenate([self.node_xy[self.single], np.array([self.centres[c.key] for c in clusters]).reshape(-1, 2)])
+        owner = np.empty(len(self.node_xy), dtype=np.intp)
+        owner[self.single] = np.arange(count)
+        for slot, cluster in enumerate(clusters, count):
+            owner[cluster.members] = slot
+        pairs = owner[self.job.edges] if len(self.job.edges) else np.empty((0, 2), dtype=np.intp)
+        pairs = np.unique(np.sort(pairs[pairs[:, 0] != pairs[:, 1]], axis=1), axis=0)
+        segments = item_xy[pairs]
+        if len(segments):
+            # Skip connections entirely outside the view
+            low, high = segments.min(axis=1), segments.max(axis=1)
+            segments = segments[(high[:, 0] >= x0) & (low[:, 0] <= x1) & (high[:, 1] >= y0) & (low[:, 1] <= y1)]
+
+        texts = [text for _, text in self.texts]
+        for artist in self.static_artists + self.labels + texts + [self.boxes, self.glows, self.dots, self.glyphs]:
+            if artist is not None:
+                artist.remove()
+        self.static_artists, self.labels, self.texts = [], [], []
+        self.boxes = self.glows = self.dots = self.glyphs = None
+        self.label_pixels = None
+        self.count_layers.clear()
+        self.count_pixels = None
+
+        ax = self.ax
+        edges = LineCollection(segments, colors='white', linewidths=1 if len(segments) < 2000 else 0.5, zorder=0)
+        ax.add_collection(edges, autolim=False)
+        self.static_artists.append(edges)
+
+        # Collapsed clusters are discs scaled to their size, open ones a faint outline
+        outlines = [Circle(self.centres[c.key], c.radius) for c in opened]
+        if outlines:
+            outline = PatchCollection(outlines, facecolors='none', edgecolors=(1, 1, 1, 0.25), linewidths=0.8, zorder=0)
+            ax.add_collection(outline, autolim=False)
+            self.static_artists.append(outline)
+        if clusters:
+            self.glyphs = PatchCollection(
+                [Circle(self.centres[c.key], c.radius) for c in clusters], edgecolors='white', linewidths=1,
+                zorder=1, animated=True,
             )
-            ax.add_patch(rect)
-
-            # Add a glow effect
-            glow_color = "green" if is_online else "red"
-            glow_rect = plt.Rectangle(
-                (bbox_data.x0 - padding - 0.005, bbox_data.y0 - padding - 0.005),
-                bbox_data.width + 2 * (padding + 0.005),
-                bbox_data.height + 2 * (padding + 0.005),
-                color=glow_color,
-                alpha=0.3,
-                transform=ax.transData,
-                zorder=rect.get_zorder() - 1  # Ensure the glow is below the rectangle
+            ax.add_collection(self.glyphs, autolim=False)
+            for cluster in clusters:
+                cx, cy = self.centres[cluster.key]
+                if cluster.radius * scale >= TEXT_PIXELS and x0 <= cx <= x1 and y0 <= cy <= y1:
+                    text = ax.text(cx, cy, "", fontsize=7, ha='center', va='center', color='black', zorder=4, animated=True)
+                    self.texts.append((cluster, text))
+
+        # Single nodes inside the view, labelled while few enough are visible
+        xy = self.node_xy[self.single]
+        inside = (xy[:, 0] >= x0) & (xy[:, 0] <= x1) & (xy[:, 1] >= y0) & (xy[:, 1] <= y1)
+        visible = self.single[inside]
+        if len(visible) <= LABEL_LIMIT:
+            self.labelled, self.dotted = visible, np.empty(0, dtype=np.intp)
+            self.labels = [
+                ax.text(*self.node_xy[index], self.shown[index].ip, fontsize=6, fontweight='bold', ha='center',
+                        va='center', color='black', zorder=3, animated=True)
+                for index in visible
+            ]
+        else:
+            self.labelled, self.dotted = np.empty(0, dtype=np.intp), visible
+            size = min(max((2 * NODE_RADIUS * scale * 0.72) ** 2, 4.0), 64.0)  # Marker area in points squared
+            self.dots = ax.scatter(
+                *self.node_xy[visible].T, s=size, marker='s', linewidths=0, zorder=2, animated=True
             )
-            ax.add_patch(glow_rect)
 
-        self.canvas.draw()
\ No newline at end of file
+        self.background = None
+        self.codes = None
+        self.draw_boxes()
+        self.recolour()
+        self.canvas.draw_idle()
+        MAP_REDRAW.observe(time.perf_counter() - started)
+
+    def draw_boxes(self):
+        """Geometry phase: size the node boxes around their labels.
+
+        Text extents depend on the canvas size, so this runs whenever the
+        view changes, but never on a status-only update. The labels are
+        rendered once into a transparent layer so that blitting them is one
+        vectorized blend instead of one text layout per node.
+        """
+        if self.boxes is not None:
+            self.boxes.remove()
+            self.glows.remove()
+            self.boxes = self.glows = None
+        renderer = self.canvas.get_renderer()
+        self.label_size = (renderer.width, renderer.height)
+        if not self.labels:
+            self.label_pixels = None
+            return
+
+        self.label_pixels, self.label_alpha, self.label_rgb = self.render_layer(self.labels)
+        to_data = self.ax.transData.inverted()
+        boxes, glows = [], []
+        for text in self.labels:
+            # Pad the bounding box of the text in pixels and convert it to data coordinates
+            bbox = text.get_window_extent(renderer=renderer)
+            for padding, patches in ((PADDING, boxes), (PADDING + GLOW, glows)):
+                (x0, y0), (x1, y1) = to_data.transform([(bbox.x0 - padding, bbox.y0 - padding), (bbox.x1 + padding, bbox.y1 + padding)])
+                patches.append(Rectangle((x0, y0), x1 - x0, y1 - y0))
+
+        self.glows = PatchCollection(glows, edgecolors='none', zorder=1, animated=True)
+        self.boxes = PatchCollection(boxes, edgecolors='black', linewidths=0.5, zorder=2, animated=True)
+        self.ax.add_collection(self.glows, autolim=False)
+        self.ax.add_collection(self.boxes, autolim=False)
+
+    def render_layer(self, texts: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Render texts into a transparent layer the size of the canvas.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The flat indexes of the
+            covered pixels, their alpha and their alpha-weighted colour.
+        """
+        renderer = self.canvas.get_renderer()
+        layer = RendererAgg(renderer.width, renderer.height, self.figure.dpi)
+        for text in texts:
+            text.draw(layer)
+        pixels = np.asarray(layer.buffer_rgba()).reshape(-1, 4)
+        covered = np.flatnonzero(pixels[:, 3])
+        alpha = pixels[covered, 3:4] / 255.0
+        return covered, alpha, pixels[covered, :3] * alpha
+
+    def render_counts(self, changed: list):
+        """Re-render the count texts whose wording changed and merge all of them into one layer.
+
+        Rendering text is the expensive part of a recolour, so every text's
+        pixels are cached and only changed ones are rendered again.
+        """
+        if changed:
+            covered, alpha, rgb = self.render_layer([text for _, text in changed])
+            renderer = self.canvas.get_renderer()
+            width, height = renderer.width, renderer.height
+            rows, columns = np.divmod(covered, width)
+            for cluster, text in changed:
+                bbox = text.get_window_extent(renderer=renderer)
+                inside = (
+                    (columns >= bbox.x0 - 1) & (columns <= bbox.x1 + 1)
+                    & (rows >= height - bbox.y1 - 1) & (rows <= height - bbox.y0 + 1)
+                )
+                self.count_layers[cluster.key] = (covered[inside], alpha[inside], rgb[inside])
+        layers = [self.count_layers[cluster.key] for cluster, _ in self.texts]
+        if layers:
+            self.count_pixels = tuple(np.concatenate(part) for part in zip(*layers))
+        else:
+            self.count_pixels = None
+
+    def on_draw(self, event):
+        """Cache the static background after a full draw and paint the node artists on it."""
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_nodes()
+
+    def draw_nodes(self):
+        """Draw the animated cluster and node artists onto the canvas buffer."""
+        for artist in (self.glyphs, self.dots, self.glows, self.boxes):
+            if artist is not None:
+                self.ax.draw_artist(artist)
+
+        # Blend the pre-rendered text layers over the boxes and glyphs, unless a drag moved them out of place
+        renderer = self.canvas.get_renderer()
+        if self.dragging or (renderer.width, renderer.height) != self.label_size:
+            return
+        buffer = np.asarray(renderer.buffer_rgba()).reshape(-1, 4)
+        for layer in ((self.label_pixels, self.label_alpha, self.label_rgb), self.count_pixels):
+            if layer is not None and layer[0] is not None:
+                covered, alpha, rgb = layer
+                buffer[covered, :3] = buffer[covered, :3] * (1 - alpha) + rgb
+
+    def blit_nodes(self):
+        """Repaint the node artists over the cached background."""
+        if self.background is None:
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_nodes()
+        self.canvas.blit(self.figure.bbox)
+
+    def recolour(self) -> bool:
+        """Colour the shown nodes and clusters by health.
+
+        Returns:
+            bool: Whether any health changed since the last recolour.
+        """
+        codes = np.fromiter((HEALTH_CODES[self.health(node)] for node in self.shown), dtype=np.int8, count=len(self.shown))
+        if self.codes is not None and np.array_equal(codes, self.codes):
+            return False
+        self.codes = codes
+        if self.boxes is not None:
+            self.boxes.set_facecolors(BOX_TABLE[codes[self.labelled]])
+            self.glows.set_facecolors(GLOW_TABLE[codes[self.labelled]])
+        if self.dots is not None:
+            self.dots.set_facecolors(BOX_TABLE[codes[self.dotted]])
+        if self.glyphs is not None:
+            counts = {cluster.key: np.bincount(codes[cluster.members], minlength=len(HEALTH)) for cluster in self.clusters}
+            self.glyphs.set_facecolors([BOX_TABLE[self.cluster_health(counts[cluster.key])] for cluster in self.clusters])
+            changed = []
+            for cluster, text in self.texts:
+                up, down = int(counts[cluster.key][:2].sum()), int(counts[cluster.key][2:].sum())
+                wording = f"{cluster.label}\n{up} up" + (f", {down} down" if down else "")
+                if wording != text.get_text() or cluster.key not in self.count_layers:
+                    text.set_text(wording)
+                    changed.append((cluster, text))
+            self.render_counts(changed)
+        return True
+
+    @staticmethod
+    def cluster_health(counts: np.ndarray) -> int:
+        """Return the health code a cluster glyph is coloured with, from its nodes' health counts.
+
+        Green while every node is up, grey or red while every node is down,
+        and gold for anything in between.
+        """
+        online, degraded, offline, unreachable = counts.tolist()
+        if not offline and not unreachable:
+            return HEALTH_CODES[DEGRADED if degraded else ONLINE]
+        if not online and not degraded:
+            return HEALTH_CODES[OFFLINE if offline else UNREACHABLE]
+        return HEALTH_CODES[DEGRADED]
+
+    def draw_dynamic_map(self):
+        """Status phase: recolour the nodes and clusters whose health changed."""
+        if self.node_xy is None:
+            return
+        started = time.perf_counter()
+        if not self.recolour():
+            return
+        logger.debug(f"Recoloured map, {int((self.codes == HEALTH_CODES[ONLINE]).sum())} of {len(self.codes)} nodes online")
+        self.blit_nodes()
+        MAP_REDRAW.observe(time.perf_counter() - started)
+
+    def on_scroll(self, event):
+        """Zoom around the cursor."""
+        if event.inaxes is not self.ax or event.xdata is None:
+            return
+        factor = ZOOM_STEP ** -event.step
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        self.ax.set_xlim(event.xdata + (x0 - event.xdata) * factor, event.xdata + (x1 - event.xdata) * factor)
+        self.ax.set_ylim(event.ydata + (y0 - event.ydata) * factor, event.ydata + (y1 - event.ydata) * factor)
+        self.moved = True
+        self.refresh_timer.start()
+
+    def on_press(self, event):
+        """Start a drag or click, or reset the view on a double-click."""
+        if event.inaxes is not self.ax:
+            return
+        if event.dblclick:
+            self.overrides.clear()
+            self.moved = False
+            self.fit_view()
+            self.refresh_view()
+            return
+        self.drag = (event.x, event.y, self.ax.get_xlim(), self.ax.get_ylim(), event.button)
+
+    def on_motion(self, event):
+        """Pan while dragging with the left button."""
+        if self.drag is None or self.drag[4] != 1 or event.x is None:
+            return
+        x, y, (x0, x1), (y0, y1), _ = self.drag
+        if not self.dragging and math.hypot(event.x - x, event.y - y) < CLICK_PIXELS:
+            return
+        self.dragging = True
+        self.moved = True
+        scale = self.ax.bbox.width / (x1 - x0)
+        dx, dy = (event.x - x) / scale, (event.y - y) / scale
+        self.ax.set_xlim(x0 - dx, x1 - dx)
+        self.ax.set_ylim(y0 - dy, y1 - dy)
+        self.canvas.draw_idle()
+
+    def on_release(self, event):
+        """Finish a drag, or open or close a cluster on a click."""
+        if self.drag is None:
+            return
+        button = self.drag[4]
+        self.drag = None
+        if self.dragging:
+            self.dragging = False
+            self.refresh_view()
+        elif event.xdata is not None:
+            self.click(event.xdata, event.ydata, button)
+
+    def click(self, x: float, y: float, button: int):
+        """Open the collapsed cluster under a left click, close the innermost open cluster under a right click."""
+        def hit(cluster: Cluster) -> bool:
+            cx, cy = self.centres[cluster.key]
+            return math.hypot(x - cx, y - cy) <= cluster.radius
+
+        candidates = [c for c in (self.clusters if button == 1 else self.opened) if hit(c)]
+        if not candidates:
+            return
+        cluster = min(candidates, key=lambda c: c.radius)
+        self.overrides[cluster.key] = button == 1
+        self.refresh_view()
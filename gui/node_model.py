@@ -0,0 +1,260 @@
+import ipaddress
+import time
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QTimer
+from PySide6.QtGui import QColor
+from network.status import StatusStore, CHECKING, ONLINE, OFFLINE, UNREACHABLE, UNRESOLVED, dirty_ranges
+
+FRAME_MS = 33  # Coalesce repaints to roughly 30 frames per second
+RESORT_INTERVAL = 1.0  # Minimum seconds between re-sorts, so rows do not jump around at frame rate
+
+STATUS_COLORS = {
+    CHECKING: QColor("yellow"),
+    ONLINE: QColor("green"),
+    OFFLINE: QColor("red"),
+    UNREACHABLE: QColor("gray"),
+    UNRESOLVED: QColor("darkMagenta"),
+}
+
+DEGRADED_COLOR = QColor("orange")
+
+STATUS_ROLE = Qt.UserRole + 1
+
+STAT_QUANTILES = {6: 0.5, 7: 0.95, 8: 0.99}  # Column -> RTT quantile
+
+
+def ip_sort_key(ip: str) -> tuple[int, int, str]:
+    """Return a key sorting IP addresses numerically and hostnames after them."""
+    try:
+        address = ipaddress.ip_address(ip)
+        return (address.version, int(address), "")
+    except ValueError:
+        return (99, 0, ip)
+
+
+class NodeTableModel(QAbstractTableModel):
+    """Table model reading node rows straight out of a StatusStore.
+
+    Probe results only mark rows dirty in the store. A frame timer collects
+    the dirty rows and emits one ``dataChanged`` per contiguous range. When a
+    dirty row's value in the sort column changed, the rows are sorted again,
+    at most once per ``RESORT_INTERVAL``.
+    """
+
+    COLUMNS = ["Node", "Status", "Last Checked", "Loss", "Mean", "Jitter", "p50", "p95", "p99"]
+
+    def __init__(self, store: StatusStore, parent=None):
+        """Initialize the model.
+
+        Args:
+            store (StatusStore): The status store backing the model.
+            parent (QObject, optional): Parent object. Defaults to None.
+        """
+        super().__init__(parent)
+        self.store = store
+        self._order = list(range(len(store)))  # Model row -> store row
+        self._position = list(range(len(store)))  # Store row -> model row
+        self._ips = list(store.ips)  # Store rows as of the last reset or sync
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        self._keys = None  # Sort key of every store row as of the last sort
+        self._sorted_at = 0.0
+        self._unsorted = False  # A sort key changed since the last sort
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self.flush)
+        self.frame_timer.start(FRAME_MS)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        """Return the number of rows."""
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        """Return the number of columns."""
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def store_row(self, row: int) -> int:
+        """Map a model row to its store row."""
+        return self._order[row]
+
+    def stat(self, row: int, column: int) -> float | None:
+        """Return the raw value of a statistics column for a store row."""
+        stats = self.store.stats[row]
+        if column == 3:
+            return stats.loss
+        if column == 4:
+            return stats.mean
+        if column == 5:
+            return stats.jitter if stats.total > 1 else None
+        return stats.quantile(STAT_QUANTILES[column])
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        """Return the data of a cell."""
+        if not index.isValid():
+            return None
+        row = self._order[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self.store.ips[row]
+            if column == 1:
+                return self.store.status_text(row)
+            if column == 2:
+                return self.store.checked_text(row)
+            value = self.stat(row, column)
+            if value is None:
+                return "-"
+            return f"{value:.1f}%" if column == 3 else f"{value * 1000:.1f} ms"
+        if role == Qt.ForegroundRole and column == 1:
+            status = self.store.status[row]
+            if status == ONLINE and self.store.stats[row].is_degraded():
+                return DEGRADED_COLOR
+            return STATUS_COLORS[status]
+        if role == Qt.TextAlignmentRole and column >= 3:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == STATUS_ROLE:
+            return self.store.status[row]
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        """Return the column titles."""
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        """Make every cell read-only."""
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def _sort_key(self, column: int):
+        """Return a key function over store rows for a column."""
+        store = self.store
+        if column == 0:
+            keys = [ip_sort_key(ip) for ip in store.ips]
+            return keys.__getitem__
+        if column == 1:
+            return store.status.__getitem__
+        if column == 2:
+            return store.checked.__getitem__
+
+        def stat_key(row: int) -> float:
+            value = self.stat(row, column)
+            return -1.0 if value is None else value
+        return stat_key
+
+    def _update_positions(self):
+        """Rebuild the store row -> model row map from the current order."""
+        self._position = [0] * len(self._order)
+        for model_row, store_row in enumerate(self._order):
+            self._position[store_row] = model_row
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder):
+        """Sort the rows by reordering the store row permutation.
+
+        Args:
+            column (int): The column to sort by.
+            order (Qt.SortOrder): Ascending or descending.
+        """
+        self._sort_column, self._sort_order = column, order
+        if column < 0:
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        store_rows = [self._order[index.row()] for index in persistent]
+
+        key = self._sort_key(column)
+        self._keys = [key(row) for row in range(len(self.store))]
+        self._order.sort(key=self._keys.__getitem__, reverse=order == Qt.DescendingOrder)
+        self._update_positions()
+        self._sorted_at = time.monotonic()
+        self._unsorted = False
+
+        self.changePersistentIndexList(
+            persistent,
+            [self.index(self._position[row], index.column()) for row, index in zip(store_rows, persistent)]
+        )
+        self.layoutChanged.emit()
+
+    def reset(self):
+        """Reload the model after the store's node set changed."""
+        self.beginResetModel()
+        self._order = list(range(len(self.store)))
+        self._position = list(range(len(self.store)))
+        self._ips = list(self.store.ips)
+        self.store.dirty.clear()
+        self.endResetModel()
+        self.sort(self._sort_column, self._sort_order)
+
+    def sync(self):
+        """Catch up with nodes added to or removed from the store.
+
+        Removed nodes become row removals and added nodes row insertions, so
+        views keep their scroll position, selection and every other row.
+        """
+        rows = self.store.rows
+        old_ips = self._ips
+        removed = sorted(self._position[row] for row, ip in enumerate(old_ips) if ip not in rows)
+        for first, last in reversed(dirty_ranges(removed)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._order[first:last + 1]
+            self.endRemoveRows()
+
+        # Survivors were compacted in the store, added nodes follow them
+        self._order = [rows[old_ips[row]] for row in self._order]
+        first = len(self._order)
+        added = first < len(self.store)
+        if added:
+            self.beginInsertRows(QModelIndex(), first, len(self.store) - 1)
+        self._order.extend(range(first, len(self.store)))
+        self._update_positions()
+        self._ips = list(self.store.ips)
+        if added:
+            self.endInsertRows()
+        self.sort(self._sort_column, self._sort_order)
+
+    def flush(self):
+        """Emit one coalesced ``dataChanged`` per contiguous range of dirty rows, or sort again."""
+        if self._unsorted and time.monotonic() - self._sorted_at >= RESORT_INTERVAL:
+            self.store.dirty.clear()
+            self.sort(self._sort_column, self._sort_order)  # Repaints every row
+            return
+        if not self.store.dirty:
+            return
+        dirty = self.store.take_dirty()
+        if self._sort_column > 0 and self._keys is not None and not self._unsorted:
+            # Addresses never change, every other column may have moved a row
+            key, keys = self._sort_key(self._sort_column), self._keys
+            self._unsorted = any(key(row) != keys[row] for row in dirty)
+        rows = sorted(self._position[row] for row in dirty)
+        last_column = len(self.COLUMNS) - 1
+        for first, last in dirty_ranges(rows):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+
+
+class StatusFilterProxyModel(QSortFilterProxyModel):
+    """Proxy filtering nodes by status and forwarding sorts to the source model."""
+
+    def __init__(self, parent=None):
+        """Initialize the proxy.
+
+        Args:
+            parent (QObject, optional): Parent object. Defaults to None.
+        """
+        super().__init__(parent)
+        self.status_filter = None
+        self.setDynamicSortFilter(True)
+
+    def set_status_filter(self, status: int | None):
+        """Only show nodes with the given status code, or every node for None."""
+        self.status_filter = status
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        """Accept rows matching the status filter."""
+        if self.status_filter is None:
+            return True
+        source = self.sourceModel()
+        return source.store.status[source.store_row(source_row)] == self.status_filter
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder):
+        """Sort in the source model, which can sort a whole column in one pass."""
+        self.sourceModel().sort(column, order)
@@ -1,28 +1,72 @@
 import sys
-import asyncio
+import argparse
 import logging
-from PySide6.QtWidgets import QApplication
-from qasync import QEventLoop
-from gui.app import NetworkMonitorApp
 from network.logger import setup_logging
 from network.checker import read_node_file
+from network.metrics import METRICS_PORT, install_profiler_signal
+from network.feed import FEED_PORT
+from network.protocol import DEFAULT_PORT, parse_endpoint
 
-def main(file_path: str = "nodes.txt"):
+def main(
+    file_path: str = "nodes.txt",
+    headless: bool = False,
+    workers: int = 0,
+    listen: tuple[str, int] | None = None,
+    agent: tuple[str, int] | None = None,
+    name: str | None = None,
+    simulate: bool = False,
+    metrics: tuple[str, int] | None = None,
+    passive: bool = False,
+    feed: tuple[str, int] | None = None,
+    view: tuple[str, int] | None = None,
+):
     """Main function to set up and run the network monitor.
 
     Args:
         file_path (str): The path to the node file.
+        headless (bool): Run without a GUI, reporting to stdout and the log files.
+        workers (int): Number of probe worker processes, 0 probes in the main process.
+        listen (tuple[str, int] | None): Collect results from remote agents on this host and port instead of probing.
+        agent (tuple[str, int] | None): Run as a probe agent reporting to the collector at this host and port.
+        name (str | None): Name of the agent, defaults to the hostname.
+        simulate (bool): Let the agent simulate probes instead of sending them.
+        metrics (tuple[str, int] | None): Serve Prometheus metrics on this host and port.
+        passive (bool): Confirm directly attached nodes from the kernel neighbour table, probing them less.
+        feed (tuple[str, int] | None): Publish the status feed for viewers on this host and port.
+        view (tuple[str, int] | None): Show the status feed of the monitor at this host and port instead of probing.
     """
+    install_profiler_signal()  # SIGUSR1 starts and stops the sampling profiler
     nodes = read_node_file(file_path)
     if not nodes:
         logging.error("No nodes to monitor. Please check your node file.")
         return
 
+    if agent is not None:
+        from network.agent import run_agent
+        run_agent(nodes, *agent, name=name, simulate=simulate)
+        return
+
+    if headless:
+        from network.headless import run_headless
+        run_headless(
+            nodes, file_path=file_path, workers=workers, listen=listen, metrics=metrics, passive=passive,
+            feed=feed, view=view,
+        )
+        return
+
+    # Qt and the GUI are only imported when a window is actually shown
+    import asyncio
+    from PySide6.QtWidgets import QApplication
+    from qasync import QEventLoop
+    from gui.app import NetworkMonitorApp
+
     app = QApplication(sys.argv)
     loop = QEventLoop(app)
     asyncio.set_event_loop(loop)
 
-    window = NetworkMonitorApp(nodes, file_path)
+    window = NetworkMonitorApp(
+        nodes, file_path, workers=workers, listen=listen, metrics=metrics, passive=passive, feed=feed, view=view
+    )
     window.show()
 
     # Start node tasks after the event loop is running
@@ -31,12 +75,60 @@ def main(file_path: str = "nodes.txt"):
     with loop:
         loop.run_forever()
 
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (list[str]): The arguments, without the program name.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Monitor the reachability of network nodes.")
+    # Use default file path if no argument is provided
+    parser.add_argument("file_path", nargs="?", default="nodes.txt", help="node file to monitor")
+    parser.add_argument("--headless", action="store_true", help="run without a GUI and report to stdout")
+    parser.add_argument(
+        "--workers", type=int, default=0, metavar="N", help="probe from N worker processes (default: in the main process)"
+    )
+    parser.add_argument(
+        "--listen", type=parse_endpoint, nargs="?", const=("0.0.0.0", DEFAULT_PORT), metavar="HOST:PORT",
+        help=f"collect results from remote agents instead of probing (default: 0.0.0.0:{DEFAULT_PORT})"
+    )
+    parser.add_argument(
+        "--agent", type=parse_endpoint, metavar="HOST:PORT", help="probe the node file and report to a collector"
+    )
+    parser.add_argument("--name", help="agent name reported to the collector (default: hostname)")
+    parser.add_argument(
+        "--metrics", type=lambda text: parse_endpoint(text, "127.0.0.1", METRICS_PORT), nargs="?",
+        const=("127.0.0.1", METRICS_PORT), metavar="HOST:PORT",
+        help=f"serve Prometheus metrics over HTTP (default: 127.0.0.1:{METRICS_PORT})"
+    )
+    parser.add_argument(
+        "--passive", action="store_true",
+        help="treat hosts the kernel neighbour table shows as reachable as online and probe them less (Linux)"
+    )
+    parser.add_argument(
+        "--feed", type=lambda text: parse_endpoint(text, "127.0.0.1", FEED_PORT), nargs="?",
+        const=("127.0.0.1", FEED_PORT), metavar="HOST:PORT",
+        help=f"publish node states for viewers as Server-Sent Events (default: 127.0.0.1:{FEED_PORT})"
+    )
+    parser.add_argument(
+        "--view", type=lambda text: parse_endpoint(text, "127.0.0.1", FEED_PORT), metavar="HOST:PORT",
+        help="show the states published by another monitor's --feed instead of probing"
+    )
+    parser.add_argument("--simulate", action="store_true", help="agent simulates probes instead of sending them")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
     setup_logging()  # Initialize logging
     try:
         logging.info("Starting network monitor...")
-        # Use default file path if no argument is provided
-        node_file_path = sys.argv[1] if len(sys.argv) > 1 else "nodes.txt"
-        main(node_file_path)
+        main(
+            args.file_path, headless=args.headless, workers=args.workers, listen=args.listen,
+            agent=args.agent, name=args.name, simulate=args.simulate, metrics=args.metrics,
+            passive=args.passive, feed=args.feed, view=args.view,
+        )
     except KeyboardInterrupt:
         logging.info("Network Monitor Stopped.")
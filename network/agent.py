@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import signal
+import socket
+import time
+from typing import Awaitable, Callable
+from network.checker import probe as icmp_probe, probe_node
+from network.resolver import ResolutionError
+from network.node import NodeData
+from network.protocol import encode_hello, encode_nodes, encode_update
+from network.scheduler import ProbeScheduler
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+BATCH_INTERVAL = 0.5  # Seconds between update batches
+HEARTBEAT_INTERVAL = 5.0  # Seconds after which an empty batch is sent to show the agent is alive
+RECONNECT_DELAY = 1.0  # First reconnect delay in seconds, doubled up to RECONNECT_MAX
+RECONNECT_MAX = 30.0
+
+
+class ProbeAgent:
+    """Probes a set of nodes and streams the results to a central collector.
+
+    Results are buffered per node until the next batch, so if the collector
+    is slow or unreachable a node's newer result replaces its older one and
+    the buffer never grows beyond one entry per node. Batches are only
+    written once the previous one has drained into the socket, which is how
+    TCP flow control from a busy collector holds the agent back. A dropped
+    connection is retried with exponential backoff while probing carries on.
+    """
+
+    def __init__(
+        self,
+        nodes: list[NodeData],
+        host: str,
+        port: int,
+        name: str | None = None,
+        probe: Callable[[str], Awaitable[float | None]] = icmp_probe,
+        batch_interval: float = BATCH_INTERVAL,
+        **options,
+    ):
+        """Initialize the agent.
+
+        Args:
+            nodes (list[NodeData]): The nodes this agent probes.
+            host (str): The collector's host.
+            port (int): The collector's port.
+            name (str | None): Name reported to the collector, defaults to the hostname.
+            probe (Callable[[str], Awaitable[float | None]]): Probe returning the RTT in seconds or None.
+            batch_interval (float): Seconds between update batches.
+            **options: Keyword arguments for the ProbeScheduler.
+        """
+        self.nodes = nodes
+        self.host = host
+        self.port = port
+        self.name = name or socket.gethostname()
+        self.probe = probe
+        self.batch_interval = batch_interval
+        self.index = {node.ip: index for index, node in enumerate(nodes)}
+        self.pending: dict[int, tuple[float | None, float]] = {}
+        self.connected = False
+        self.sent = 0  # Results sent since the agent started
+        self.scheduler = ProbeScheduler(self.check_node, **options)
+
+    async def check_node(self, node: NodeData) -> bool:
+        """Probe a node and buffer the result for the next batch.
+
+        The wire format has no unresolved state, a name that does not
+        resolve is reported as a failed probe.
+        """
+        try:
+            rtt = await probe_node(node, self.probe)
+        except ResolutionError:
+            rtt = None
+        self.pending[self.index[node.ip]] = (rtt, time.time())
+        return rtt is not None
+
+    def take_batch(self) -> list[tuple[int, float | None, float]]:
+        """Return and clear the buffered results."""
+        pending, self.pending = self.pending, {}
+        return [(index, rtt, checked) for index, (rtt, checked) in pending.items()]
+
+    def restore_batch(self, batch: list[tuple[int, float | None, float]]):
+        """Put back a batch that could not be sent, keeping newer results."""
+        for index, rtt, checked in batch:
+            self.pending.setdefault(index, (rtt, checked))
+
+    async def stream(self, writer: asyncio.StreamWriter):
+        """Send the node table, then batches, until the connection fails."""
+        writer.write(encode_hello(self.name))
+        writer.write(encode_nodes([node.ip for node in self.nodes]))
+        await writer.drain()
+        last_sent = time.monotonic()
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            if not self.pending and time.monotonic() - last_sent < HEARTBEAT_INTERVAL:
+                continue
+            batch = self.take_batch()
+            try:
+                writer.write(encode_update(batch))
+                await writer.drain()  # Waits while the collector is not keeping up
+            except BaseException:
+                self.restore_batch(batch)
+                raise
+            self.sent += len(batch)
+            last_sent = time.monotonic()
+
+    async def run(self):
+        """Probe the nodes and keep a connection to the collector until cancelled."""
+        for node in self.nodes:
+            self.scheduler.add(node)
+        self.scheduler.start()
+        delay = RECONNECT_DELAY
+        try:
+            while True:
+                writer = None
+                try:
+                    _, writer = await asyncio.open_connection(self.host, self.port)
+                    self.connected = True
+                    delay = RECONNECT_DELAY
+                    logger.info(f"Connected to collector {self.host}:{self.port} as {self.name}")
+                    await self.stream(writer)
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    if self.connected:
+                        logger.warning(f"Lost collector {self.host}:{self.port}: {e}")
+                    else:
+                        logger.warning(f"Cannot reach collector {self.host}:{self.port}: {e}, retrying in {delay:g}s")
+                finally:
+                    self.connected = False
+                    if writer is not None:
+                        writer.close()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+        finally:
+            self.scheduler.stop()
+
+
+async def run_until_stopped(agent: ProbeAgent):
+    """Run an agent on the current loop until SIGINT or SIGTERM."""
+    loop = asyncio.get_running_loop()
+    task = loop.create_task(agent.run())
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on this platform, KeyboardInterrupt still works
+    try:
+        await task
+    except asyncio.CancelledError:
+        logger.info(f"Agent {agent.name} stopped after sending {agent.sent} results")
+
+
+def run_agent(nodes: list[NodeData], host: str, port: int, name: str | None = None, simulate: bool = False):
+    """Run a probe agent until interrupted.
+
+    Args:
+        nodes (list[NodeData]): The nodes to probe.
+        host (str): The collector's host.
+        port (int): The collector's port.
+        name (str | None): Name reported to the collector, defaults to the hostname.
+        simulate (bool): Use a simulated prober instead of sending ICMP probes.
+    """
+    probe = icmp_probe
+    if simulate:
+        from network.simulate import SimulatedProber
+        probe = SimulatedProber(loss=0.05)
+    agent = ProbeAgent(nodes, host, port, name, probe)
+    logging.info(f"Agent {agent.name} probing {len(nodes)} nodes for {host}:{port}")
+    asyncio.run(run_until_stopped(agent))
@@ -1,7 +1,68 @@
-import asyncio
 import logging
-import subprocess
+from typing import Awaitable, Callable
+from network.icmp import get_prober
 from network.node import NodeData  # Import NodeData from the new module
+from network.nodestore import ICMP
+from network.registry import load_registry
+from network.resolver import ResolutionError, get_resolver
+from network.services import get_service_prober
+
+async def resolve(host: str) -> str:
+    """Resolve a hostname to an IP address through the shared cache, passing IP literals through.
+
+    Args:
+        host (str): The IP address or hostname to resolve.
+
+    Returns:
+        str: The first address returned by the resolver.
+
+    Raises:
+        ResolutionError: If the name does not resolve.
+    """
+    return await get_resolver().resolve(host)
+
+async def probe(host: str) -> float | None:
+    """Probe a host and measure its round-trip time.
+
+    Args:
+        host (str): The IP address or hostname to probe.
+
+    Returns:
+        float | None: The round-trip time in seconds, or None if the host is unreachable.
+
+    Raises:
+        ResolutionError: If the host is a name that does not resolve.
+    """
+    address = await resolve(host)
+    try:
+        logging.info(f"Pinging {host}...")
+        rtt = await get_prober().probe(address)
+        logging.info(f"Ping to {host} {'failed' if rtt is None else f'succeeded in {rtt * 1000:.2f} ms'}.")
+        return rtt
+    except Exception as e:
+        logging.error(f"Error pinging {host}: {e}")
+        return None
+
+async def probe_node(node: NodeData, icmp: Callable[[str], Awaitable[float | None]] = probe) -> float | None:
+    """Probe a node with its check, ICMP unless the node file names a service check.
+
+    Args:
+        node (NodeData): The node to probe.
+        icmp (Callable[[str], Awaitable[float | None]]): Probe used for ICMP nodes.
+
+    Returns:
+        float | None: The round-trip, connect or request time in seconds, or None if the check failed.
+
+    Raises:
+        ResolutionError: If the node is a name that does not resolve, nothing was probed.
+    """
+    address = await resolve(node.ip)
+    check = getattr(node, "check", ICMP)
+    if check == ICMP:
+        return await icmp(address)
+    rtt = await get_service_prober().probe(node.ip, check, address)
+    logging.info(f"{check} check of {node.ip} {'failed' if rtt is None else f'succeeded in {rtt * 1000:.2f} ms'}.")
+    return rtt
 
 async def ping(host: str) -> bool:
     """Ping a host to check if it is reachable.
@@ -13,55 +74,25 @@ async def ping(host: str) -> bool:
         bool: True if the host is reachable, False otherwise.
     """
     try:
-        logging.info(f"Pinging {host}...")
-        result = await asyncio.create_subprocess_shell(
-            f"ping -c 1 -W 1 {host}",
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        await result.communicate()
-        success = result.returncode == 0
-        logging.info(f"Ping to {host} {'succeeded' if success else 'failed'}.")
-        return success
-    except Exception as e:
-        logging.error(f"Error pinging {host}: {e}")
+        return await probe(host) is not None
+    except ResolutionError:
         return False
 
 def read_node_file(file_path: str) -> list[NodeData]:
     """Read a file containing a list of IP addresses, device types, and connections.
 
+    Node lines may use CIDR blocks (``10.0.0.0/22,PC``) or address ranges
+    (``10.0.0.1-50,PC``), see ``network.registry.load_registry``.
+
     Args:
         file_path (str): The path to the node file.
 
     Returns:
         list[NodeData]: A list of NodeData objects representing the nodes.
     """
-    nodes = {}
-    connections = []
-
     try:
         logging.info(f"Reading node file: {file_path}")
-        with open(file_path, 'r') as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                parts = line.split(',')
-                if len(parts) == 2:
-                    ip, device_type = parts
-                    if device_type.lower() in ["router", "switch", "pc"]:
-                        nodes[ip] = NodeData(ip, device_type)
-                    else:
-                        connections.append(parts)
-                elif len(parts) == 2:
-                    connections.append(parts)
-
-        # Establish connections
-        for ip1, ip2 in connections:
-            if ip1 in nodes and ip2 in nodes:
-                nodes[ip1].connect(nodes[ip2])
-
+        return load_registry(file_path).nodes
     except FileNotFoundError:
         logging.error(f"Error: The file {file_path} was not found.")
-
-    return list(nodes.values()) 
\ No newline at end of file
+        return []
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import Callable
+from network.node import NodeData
+from network.protocol import HELLO, NODES, UPDATE, ProtocolError, decode_hello, decode_nodes, decode_update, read_frame
+from network.scheduler import SchedulerControl
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+IDLE_TIMEOUT = 15.0  # Seconds without a frame after which an agent is considered gone
+
+
+class AgentSession:
+    """State of one connected agent."""
+
+    def __init__(self, name: str, peer: str):
+        """Initialize the session.
+
+        Args:
+            name (str): The name the agent reported.
+            peer (str): The agent's address.
+        """
+        self.name = name
+        self.peer = peer
+        self.ips: list[str] = []
+        self.results = 0
+
+
+class Collector(SchedulerControl):
+    """Receives probe results streamed by remote agents.
+
+    Takes the place of the probe scheduler in a Monitor: it keeps track of
+    the monitored nodes through the same control interface, but instead of
+    probing them it hands the results agents report for them to ``record``;
+    agents choose their own intervals, so the rate controls do nothing.
+    Results for nodes the collector does not monitor are ignored, and if
+    several agents probe the same node the latest result wins. Frames are
+    only read as fast as they are processed, so a busy collector holds its
+    agents back through TCP flow control.
+    """
+
+    def __init__(
+        self,
+        record: Callable[[NodeData, float | None, float], None],
+        host: str,
+        port: int,
+        on_disconnect: Callable[[list[str]], None] | None = None,
+        idle_timeout: float = IDLE_TIMEOUT,
+    ):
+        """Initialize the collector.
+
+        Args:
+            record (Callable[[NodeData, float | None, float], None]): Called with the node, its RTT
+                (None if the probe failed) and the check time for every result.
+            host (str): Address to listen on.
+            port (int): Port to listen on.
+            on_disconnect (Callable[[list[str]], None] | None): Called with the addresses an agent
+                was probing when its connection ends.
+            idle_timeout (float): Seconds without a frame after which an agent is dropped.
+        """
+        self.record = record
+        self.host = host
+        self.port = port
+        self.on_disconnect = on_disconnect
+        self.idle_timeout = idle_timeout
+        self.nodes: dict[str, NodeData] = {}
+        self.sessions: set[AgentSession] = set()
+        self._server = None
+        self._task = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    def add(self, node: NodeData, interval: float | None = None, delay: float | None = None):
+        """Accept results for a node."""
+        self.nodes[node.ip] = node
+
+    def remove(self, ip: str):
+        """Ignore results for a node."""
+        self.nodes.pop(ip, None)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one agent connection."""
+        peer = writer.get_extra_info("peername")
+        peer = f"{peer[0]}:{peer[1]}" if peer else "unknown"
+        session = None
+        self._writers.add(writer)
+        try:
+            kind, payload = await asyncio.wait_for(read_frame(reader), self.idle_timeout)
+            if kind != HELLO:
+                raise ProtocolError("Expected hello")
+            session = AgentSession(decode_hello(payload), peer)
+            self.sessions.add(session)
+            logger.info(f"Agent {session.name} connected from {peer}")
+            while True:
+                kind, payload = await asyncio.wait_for(read_frame(reader), self.idle_timeout)
+                if kind == NODES:
+                    session.ips = decode_nodes(payload)
+                elif kind == UPDATE:
+                    self._apply(session, decode_update(payload))
+        except asyncio.IncompleteReadError:
+            pass  # Agent closed the connection
+        except asyncio.CancelledError:
+            pass  # Shutting down, ending normally keeps asyncio from logging the cancelled handler
+        except asyncio.TimeoutError:
+            logger.warning(f"Agent at {peer} went silent, dropping it")
+        except (ProtocolError, UnicodeDecodeError) as e:
+            logger.error(f"Bad frame from agent at {peer}: {e}")
+        except OSError as e:
+            logger.warning(f"Lost agent at {peer}: {e}")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            if session is not None:
+                self.sessions.discard(session)
+                logger.info(f"Agent {session.name} at {peer} disconnected")
+                if self.on_disconnect is not None and session.ips:
+                    self.on_disconnect(session.ips)
+
+    def _apply(self, session: AgentSession, results: list[tuple[int, float | None, float]]):
+        """Record a batch of results from an agent."""
+        ips, nodes = session.ips, self.nodes
+        for index, rtt, checked in results:
+            node = nodes.get(ips[index]) if index < len(ips) else None
+            if node is not None:
+                self.record(node, rtt, checked)
+        session.results += len(results)
+
+    async def _serve(self):
+        """Listen for agents."""
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            logger.error(f"Cannot listen for agents on {self.host}:{self.port}: {e}")
+            return
+        logger.info(f"Collector listening on {self.host}:{self.port} for {len(self.nodes)} nodes")
+
+    def start(self):
+        """Start listening on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._serve())
+
+    def stop(self):
+        """Stop listening and drop every agent."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in list(self._writers):
+            writer.close()
@@ -0,0 +1,454 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+EVENT_DIR = 'events'
+NAMES_FILE = 'names.txt'
+MAGIC = b'NMEV\x01\x00\x00\x00'  # Format tag and version, every segment starts with it
+SEGMENT_RECORDS = 65536  # Records per segment, 1.5 MiB on disk
+MAX_SEGMENTS = 64  # Oldest segments are deleted past this, about four million events
+MAX_OPEN_SEGMENTS = 16  # Sealed segments kept mapped at once
+NO_NODE = 0xFFFFFFFF  # Node field of group events caused by a reload
+
+# Event kinds
+WENT_OFFLINE = 0
+CAME_ONLINE = 1
+CUT_OFF = 2  # A group of nodes became unreachable, the node is the cause
+RECONNECTED = 3  # A group of nodes became reachable again
+
+RECORD = np.dtype([
+    ('ts', '<f8'),  # Epoch seconds, never decreasing within the log
+    ('node', '<u4'),  # Index into the name table, NO_NODE for none
+    ('count', '<u4'),  # Number of nodes in a group event, 1 otherwise
+    ('duration', '<f4'),  # Seconds offline before coming online, NaN if unknown
+    ('kind', 'u1'),
+    ('pad', 'V3'),
+])
+
+
+def format_duration(seconds: float) -> str:
+    """Return a duration as e.g. ``45s``, ``5m 3s`` or ``2h 10m``."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds // 3600}h {seconds // 60 % 60}m"
+
+
+class _Segment:
+    """A sealed segment file with its node index."""
+
+    def __init__(self, path: str, first: int, count: int):
+        """Describe a segment.
+
+        Args:
+            path (str): The segment file.
+            first (int): Sequence number of its first record.
+            count (int): Number of records.
+        """
+        self.path = path
+        self.first = first
+        self.count = count
+        self.first_ts = self.last_ts = 0.0
+        self.nodes: np.ndarray | None = None  # Distinct node indexes, sorted
+        self.starts: np.ndarray | None = None  # Offset of each node's rows in order
+        self.order: np.ndarray | None = None  # Record rows grouped by node, ascending within a node
+
+    @property
+    def index_path(self) -> str:
+        """Return the path of the node index file."""
+        return self.path[:-len('.seg')] + '.idx'
+
+    def build_index(self, records: np.ndarray):
+        """Build the node index and time bounds from the records."""
+        self.first_ts, self.last_ts = float(records['ts'][0]), float(records['ts'][-1])
+        self.order = np.argsort(records['node'], kind='stable').astype(np.uint32)
+        self.nodes, self.starts = np.unique(records['node'][self.order], return_index=True)
+
+    def save_index(self):
+        """Write the node index next to the segment."""
+        with open(self.index_path, 'wb') as f:
+            np.savez(f, bounds=np.array([self.first_ts, self.last_ts]), nodes=self.nodes, starts=self.starts, order=self.order)
+
+    def load_index(self) -> bool:
+        """Read the node index, returning False if it is missing or does not match the segment."""
+        try:
+            with np.load(self.index_path) as index:
+                self.first_ts, self.last_ts = index['bounds'].tolist()
+                self.nodes, self.starts, self.order = index['nodes'], index['starts'], index['order']
+        except (OSError, ValueError, KeyError):
+            return False
+        return len(self.order) == self.count
+
+    def rows_of(self, nodes: np.ndarray, records: np.ndarray) -> np.ndarray:
+        """Return the rows holding any of the nodes, ascending."""
+        if len(nodes) > 64:
+            return np.flatnonzero(np.isin(records['node'], nodes))
+        ends = np.r_[self.starts[1:], len(self.order)]
+        found = np.searchsorted(self.nodes, nodes)
+        found = found[found < len(self.nodes)]
+        found = found[np.isin(self.nodes[found], nodes)]
+        if not len(found):
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate([self.order[self.starts[i]:ends[i]] for i in found]).astype(np.int64))
+
+
+class EventLog:
+    """Append-only, segmented on-disk log of status events.
+
+    Events are fixed-size binary records, so any event can be read by its
+    sequence number without scanning. Records go to the active segment,
+    which is also held in memory; once it is full it is sealed, a node index
+    is written next to it, and older segments past ``max_segments`` are
+    deleted. Sealed segments are memory-mapped on demand, with only the most
+    recently used few kept mapped. Timestamps never decrease, so time
+    windows are found by binary search, and the node index narrows node
+    queries to the rows of those nodes.
+
+    Node addresses are kept once in a name table and referenced by index.
+    When old segments are deleted, the names no remaining event refers to
+    are blanked in the table and their indexes reused for new names.
+    """
+
+    def __init__(self, directory: str, segment_records: int = SEGMENT_RECORDS, max_segments: int = MAX_SEGMENTS):
+        """Open or create the log.
+
+        Args:
+            directory (str): Directory holding the segments and the name table.
+            segment_records (int): Records per segment.
+            max_segments (int): Segments kept on disk, including the active one.
+        """
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+        self._free_names: list[int] = []  # Blank name table entries, reused before appending
+        self._names_dirty = False  # A blank entry was reused, the table is rewritten on flush
+        self._load_names()
+        self._names_file = open(os.path.join(directory, NAMES_FILE), 'a', encoding='utf-8')
+        self.segments: list[_Segment] = []
+        self._mapped: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.down_since: dict[int, float] = {}  # Nodes offline since the time, from this run's events
+        self.active = np.zeros(segment_records, dtype=RECORD)
+        self.active_first = 0
+        self.active_count = 0
+        self._active_file = None
+        self._open_segments()
+
+    def _load_names(self):
+        """Read the name table."""
+        try:
+            with open(os.path.join(self.directory, NAMES_FILE), encoding='utf-8') as f:
+                self.names = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        self.name_ids = {name: index for index, name in enumerate(self.names) if name}
+        self._free_names = [index for index, name in enumerate(self.names) if not name]
+
+    def name_id(self, name: str) -> int:
+        """Return the index of a node address, adding it to the name table if needed."""
+        index = self.name_ids.get(name)
+        if index is None:
+            if self._free_names:
+                index = self._free_names.pop()
+                self.names[index] = name
+                self._names_dirty = True
+            else:
+                index = len(self.names)
+                self.names.append(name)
+                self._names_file.write(name + '\n')
+                self._names_file.flush()
+            self.name_ids[name] = index
+        return index
+
+    def _prune_names(self):
+        """Blank the names no event on disk or offline node refers to, and rewrite the table."""
+        used = np.zeros(len(self.names), dtype=bool)
+        for segment in self.segments:
+            used[segment.nodes[segment.nodes < len(used)]] = True
+        nodes = self.active['node'][:self.active_count]
+        used[nodes[nodes < len(used)]] = True
+        used[[node for node in self.down_since if node < len(used)]] = True
+        for index in np.flatnonzero(~used).tolist():
+            if self.names[index]:
+                del self.name_ids[self.names[index]]
+                self.names[index] = ''
+        while self.names and not self.names[-1]:
+            self.names.pop()
+        self._free_names = [index for index, name in enumerate(self.names) if not name]
+        self._write_names()
+
+    def _write_names(self):
+        """Replace the name table file with the names in memory."""
+        path = os.path.join(self.directory, NAMES_FILE)
+        self._names_file.close()
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(''.join(name + '\n' for name in self.names))
+        os.replace(path + '.tmp', path)
+        self._names_file = open(path, 'a', encoding='utf-8')
+        self._names_dirty = False
+
+    def _segment_path(self, first: int) -> str:
+        """Return the path of the segment starting at a sequence number."""
+        return os.path.join(self.directory, f"{first:012d}.seg")
+
+    def _read_segment(self, path: str) -> np.ndarray | None:
+        """Map a segment file, None if it is missing or not a segment."""
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    logger.error(f"Ignoring {path}, not an event segment")
+                    return None
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        count = (size - len(MAGIC)) // RECORD.itemsize
+        if not count:
+            return np.zeros(0, dtype=RECORD)
+        return np.memmap(path, dtype=RECORD, mode='r', offset=len(MAGIC), shape=(count,))
+
+    def _open_segments(self):
+        """Find the segments on disk and reopen the newest as the active segment."""
+        firsts = sorted(int(name[:-len('.seg')]) for name in os.listdir(self.directory) if name.endswith('.seg') and name[:-4].isdigit())
+        for first in firsts:
+            path = self._segment_path(first)
+            records = self._read_segment(path)
+            if records is None:
+                if first == firsts[-1] and os.path.exists(path):
+                    # Moved aside so the new active segment, after the sealed ones, cannot collide with it
+                    os.replace(path, path + '.bad')
+                    if self.segments:
+                        self.active_first = self.segments[-1].first + self.segments[-1].count
+                continue
+            if first != firsts[-1]:
+                segment = _Segment(path, first, len(records))
+                if not segment.load_index() and len(records):
+                    segment.build_index(records)
+                    segment.save_index()
+                if len(records):
+                    self.segments.append(segment)
+                continue
+            # The newest segment is still being written, a torn last record is dropped
+            count = min(len(records), self.segment_records)
+            self.active[:count] = records[:count]
+            self.active_first, self.active_count = first, count
+            del records
+            with open(path, 'r+b') as f:
+                f.truncate(len(MAGIC) + count * RECORD.itemsize)
+        if self.active_count == self.segment_records:
+            self._seal()
+        self._open_active()
+
+    def _open_active(self):
+        """Open the active segment file for appending."""
+        path = self._segment_path(self.active_first)
+        new = not os.path.exists(path)
+        self._active_file = open(path, 'ab')
+        if new:
+            self._active_file.write(MAGIC)
+
+    def _seal(self):
+        """Close the full active segment, index it and start the next one."""
+        if self._active_file is not None:
+            self._active_file.close()
+        segment = _Segment(self._segment_path(self.active_first), self.active_first, self.active_count)
+        segment.build_index(self.active[:self.active_count])
+        segment.save_index()
+        self.segments.append(segment)
+        self.active_first += self.active_count
+        self.active_count = 0
+        self._active_file = None
+        expired_any = False
+        while len(self.segments) >= self.max_segments:
+            expired = self.segments.pop(0)
+            self._mapped.pop(expired.first, None)
+            for path in (expired.path, expired.index_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            expired_any = True
+        if expired_any:
+            self._prune_names()
+
+    @property
+    def first(self) -> int:
+        """Return the sequence number of the oldest event still on disk."""
+        return self.segments[0].first if self.segments else self.active_first
+
+    @property
+    def count(self) -> int:
+        """Return the sequence number the next event will get."""
+        return self.active_first + self.active_count
+
+    @property
+    def last_ts(self) -> float:
+        """Return the time of the newest event, 0 if there is none."""
+        if self.active_count:
+            return float(self.active['ts'][self.active_count - 1])
+        return self.segments[-1].last_ts if self.segments else 0.0
+
+    def append(self, kind: int, node: str | None, ts: float | None = None, count: int = 1) -> int:
+        """Append an event.
+
+        Args:
+            kind (int): WENT_OFFLINE, CAME_ONLINE, CUT_OFF or RECONNECTED.
+            node (str | None): The node address, or the cause of a group event.
+            ts (float | None): Epoch time, defaults to now. Earlier than the newest event counts as its time.
+            count (int): Number of nodes in a group event.
+
+        Returns:
+            int: The event's sequence number.
+        """
+        ts = max(time.time() if ts is None else ts, self.last_ts)
+        node_id = NO_NODE if node is None else self.name_id(node)
+        duration = np.nan
+        if kind == WENT_OFFLINE:
+            self.down_since.setdefault(node_id, ts)
+        elif kind == CAME_ONLINE and node_id in self.down_since:
+            duration = ts - self.down_since.pop(node_id)
+
+        self.active[self.active_count] = (ts, node_id, count, duration, kind, b'')
+        if self._active_file is None:
+            self._open_active()
+        self._active_file.write(self.active[self.active_count:self.active_count + 1].tobytes())
+        self.active_count += 1
+        sequence = self.count - 1
+        if self.active_count == self.segment_records:
+            self._seal()
+        return sequence
+
+    def flush(self):
+        """Push appended events to the operating system."""
+        if self._active_file is not None:
+            self._active_file.flush()
+        if self._names_dirty:
+            self._write_names()
+
+    def close(self):
+        """Flush and close the files."""
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
+        if self._names_dirty:
+            self._write_names()
+        self._names_file.close()
+        self._mapped.clear()
+
+    def _records(self, segment: _Segment) -> np.ndarray:
+        """Return the mapped records of a sealed segment, unmapping the least recently used."""
+        records = self._mapped.get(segment.first)
+        if records is not None:
+            self._mapped.move_to_end(segment.first)
+            return records
+        records = self._read_segment(segment.path)
+        if records is None or len(records) != segment.count:
+            records = np.zeros(0, dtype=RECORD)
+        if len(self._mapped) >= MAX_OPEN_SEGMENTS:
+            self._mapped.popitem(last=False)
+        self._mapped[segment.first] = records
+        return records
+
+    def nodes_matching(self, text: str) -> np.ndarray:
+        """Return the indexes of the node addresses containing a text."""
+        return np.array([index for index, name in enumerate(self.names) if text in name], dtype=np.uint32)
+
+    def query(
+        self,
+        nodes: np.ndarray | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        min_outage: float | None = None,
+        start: int = 0,
+    ) -> np.ndarray:
+        """Return the sequence numbers of matching events, oldest first.
+
+        Args:
+            nodes (np.ndarray | None): Node indexes to match, see ``nodes_matching``; None matches every event.
+            since (float | None): Only events at or after this epoch time.
+            until (float | None): Only events at or before this epoch time.
+            min_outage (float | None): Only nodes coming online after being offline at least this many seconds.
+            start (int): Only events with at least this sequence number.
+
+        Returns:
+            np.ndarray: Matching sequence numbers.
+        """
+        parts = []
+        ranges = [(segment, None) for segment in self.segments if segment.first + segment.count > start]
+        ranges.append((None, self.active[:self.active_count]))
+        for segment, records in ranges:
+            if segment is not None:
+                if (since is not None and segment.last_ts < since) or (until is not None and segment.first_ts > until):
+                    continue
+                records = self._records(segment)
+                first = segment.first
+            else:
+                first = self.active_first
+            lo = max(start - first, 0)
+            hi = len(records)
+            if since is not None:
+                lo = max(lo, int(np.searchsorted(records['ts'], since, 'left')))
+            if until is not None:
+                hi = int(np.searchsorted(records['ts'], until, 'right'))
+            if lo >= hi:
+                continue
+            if nodes is None:
+                rows = np.arange(lo, hi)
+            elif segment is not None:
+                rows = segment.rows_of(nodes, records)
+                rows = rows[(rows >= lo) & (rows < hi)]
+            else:
+                rows = lo + np.flatnonzero(np.isin(records['node'][lo:hi], nodes))
+            if min_outage is not None:
+                matched = records[rows]
+                rows = rows[(matched['kind'] == CAME_ONLINE) & (matched['duration'] >= min_outage)]
+            parts.append(rows + first)
+        return np.concatenate(parts).astype(np.int64) if parts else np.zeros(0, dtype=np.int64)
+
+    def read(self, sequences: np.ndarray) -> np.ndarray:
+        """Return the records of some sequence numbers, ascending and still on disk.
+
+        Args:
+            sequences (np.ndarray): Sequence numbers, ascending.
+
+        Returns:
+            np.ndarray: One record per sequence number, in the same order.
+        """
+        out = np.zeros(len(sequences), dtype=RECORD)
+        bounds = [segment.first for segment in self.segments] + [self.active_first]
+        owner = np.searchsorted(bounds, sequences, 'right') - 1
+        for index in np.unique(owner):
+            picked = owner == index
+            if index < 0:
+                continue  # Expired, left zeroed
+            if index == len(self.segments):
+                out[picked] = self.active[sequences[picked] - self.active_first]
+                continue
+            records = self._records(self.segments[index])
+            if len(records):
+                out[picked] = records[sequences[picked] - self.segments[index].first]
+        return out
+
+    def describe(self, record: np.void) -> str:
+        """Return a history line for an event record."""
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(float(record['ts'])))
+        node = int(record['node'])
+        name = self.names[node] if node < len(self.names) else None
+        kind = int(record['kind'])
+        if kind == WENT_OFFLINE:
+            return f"{stamp} - Node {name} has gone offline"
+        if kind == CAME_ONLINE:
+            duration = float(record['duration'])
+            after = "" if np.isnan(duration) else f" after {format_duration(duration)} offline"
+            return f"{stamp} - Node {name} has come online{after}"
+        behind = f" behind {name}" if name is not None else ""
+        state = "reachable again" if kind == RECONNECTED else "unreachable, parent down"
+        return f"{stamp} - {int(record['count'])} nodes{behind} are {state}"
@@ -0,0 +1,386 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Callable
+from network.metrics import Gauge, register
+from network.node import NodeData
+from network.protocol import MAX_FRAME
+from network.scheduler import SchedulerControl
+from network.stats import StatsSummary
+from network.status import StatusStore
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+FEED_PORT = 7879
+FEED_PATH = "/feed"
+TICK = 1.0  # Seconds between delta batches
+HEARTBEAT_TICKS = 5  # Empty ticks after which a keepalive comment is sent
+MAX_BUFFER = 4 * 2**20  # Bytes a viewer may leave unread before its deltas are dropped for a resync
+IDLE_TIMEOUT = 15.0  # Seconds without a line after which a viewer considers the feed gone
+RECONNECT_DELAY = 1.0  # First reconnect delay in seconds, doubled up to RECONNECT_MAX
+RECONNECT_MAX = 30.0
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Field order of a node entry, deltas prefix it with the node's row in the last snapshot
+FIELDS = ("status", "checked", "loss", "mean", "jitter", "total", "p50", "p95", "p99", "stale")
+FIELDS_JSON = json.dumps(FIELDS, separators=(",", ":"))
+
+
+def _rounded(value: float | None, digits: int) -> float | None:
+    """Round a published figure, passing None through."""
+    return None if value is None else round(value, digits)
+
+
+def encode_row(store: StatusStore, row: int) -> str:
+    """Return the JSON entry of a store row, see ``FIELDS``.
+
+    Times are rounded to milliseconds, RTTs to microseconds and loss to a
+    hundredth of a percent, which keeps a typical entry around 70 bytes.
+    """
+    stats = store.stats[row]
+    p50, p95, p99 = stats.quantiles(QUANTILES)
+    values = (
+        store.status[row],
+        round(store.checked[row], 3),
+        _rounded(stats.loss, 2),
+        _rounded(stats.mean, 6),
+        round(stats.jitter, 6),
+        stats.total,
+        _rounded(p50, 6),
+        _rounded(p95, 6),
+        _rounded(p99, 6),
+        int(row in store.stale),
+    )
+    # Built by hand, json.dumps costs more than the quantiles for entries this small
+    return f"[{','.join('null' if value is None else repr(value) for value in values)}]"
+
+
+def decode_row(values: list) -> tuple[int, float, StatsSummary, bool]:
+    """Return the status, check time, statistics and staleness of a node entry."""
+    status, checked, loss, mean, jitter, total, p50, p95, p99, stale = values
+    quantiles = dict(zip(QUANTILES, (p50, p95, p99)))
+    return status, checked, StatsSummary(loss, mean, jitter, total, quantiles), bool(stale)
+
+
+def event(kind: str, data: str) -> bytes:
+    """Return a Server-Sent Events message."""
+    return f"event: {kind}\ndata: {data}\n\n".encode()
+
+
+class _Viewer:
+    """State of one connected viewer."""
+
+    __slots__ = ("writer", "peer", "resync", "dropped")
+
+    def __init__(self, writer: asyncio.StreamWriter, peer: str):
+        """Initialize the viewer.
+
+        Args:
+            writer (asyncio.StreamWriter): The viewer's connection.
+            peer (str): The viewer's address.
+        """
+        self.writer = writer
+        self.peer = peer
+        self.resync = True  # Needs a snapshot before any delta
+        self.dropped = 0  # Ticks skipped because the viewer was not keeping up
+
+
+class StatusFeed:
+    """Publishes a status store to read-only viewers over Server-Sent Events.
+
+    ``GET /feed`` answers with a ``text/event-stream``. A new viewer first
+    gets a ``snapshot`` event with every node's address and state, then one
+    ``delta`` event per tick with the entries of the nodes that changed,
+    keyed by their row in the snapshot. Entries are encoded once per change
+    and the same bytes go to every viewer, so the cost of a tick hardly
+    depends on how many are connected.
+
+    Writes never wait for a viewer. One that lets more than ``max_buffer``
+    bytes pile up in its socket is skipped, and once it has caught up it
+    gets a fresh snapshot instead of the deltas it missed. A slow viewer so
+    costs at most its buffer and never holds up probing or other viewers.
+    A reload of the node list sends every viewer a new snapshot.
+    """
+
+    def __init__(
+        self,
+        store: StatusStore,
+        host: str = "127.0.0.1",
+        port: int = FEED_PORT,
+        tick: float = TICK,
+        max_buffer: int = MAX_BUFFER,
+    ):
+        """Initialize the feed.
+
+        Args:
+            store (StatusStore): The store to publish.
+            host (str): Address to listen on, local only by default.
+            port (int): Port to listen on.
+            tick (float): Seconds between delta batches.
+            max_buffer (int): Unread bytes after which a viewer's deltas are dropped for a resync.
+        """
+        self.store = store
+        self.host = host
+        self.port = port
+        self.tick = tick
+        self.max_buffer = max_buffer
+        self.viewers: set[_Viewer] = set()
+        self.seq = 0
+        self.changed = store.subscribe()
+        self.records: list[str] = []  # Encoded entry per row, kept only while someone is watching
+        self._ips = None  # The store's ``ips`` the records belong to
+        self._ips_json = "[]"
+        self._server = None
+        self._task = None
+        register(Gauge("netmon_feed_viewers", "Viewers connected to the status feed.", lambda: len(self.viewers)))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one viewer until it disconnects."""
+        peer = writer.get_extra_info("peername")
+        peer = f"{peer[0]}:{peer[1]}" if peer else "unknown"
+        viewer = None
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5.0)
+            while (await asyncio.wait_for(reader.readline(), 5.0)).strip():
+                pass  # Headers are not needed
+            parts = request.decode("latin-1").split()
+            if len(parts) < 2 or parts[0] != "GET" or parts[1].split("?")[0] != FEED_PATH:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 10\r\nConnection: close\r\n\r\nNot found\n")
+                await writer.drain()
+                return
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                b"Connection: keep-alive\r\n\r\n"
+            )
+            viewer = _Viewer(writer, peer)
+            self.viewers.add(viewer)
+            logger.info(f"Viewer {peer} connected to the status feed")
+            while await reader.read(4096):
+                pass  # Nothing is expected, reading only notices the viewer leaving
+        except (asyncio.TimeoutError, OSError, UnicodeDecodeError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Shutting down
+        finally:
+            if viewer is not None:
+                self.viewers.discard(viewer)
+                logger.info(f"Viewer {peer} left the status feed")
+            writer.close()
+
+    def _rebuild(self):
+        """Encode every row, after a reload or when the first viewer arrives."""
+        store = self.store
+        self._ips = store.ips
+        self._ips_json = json.dumps(store.ips)
+        self.records = [encode_row(store, row) for row in range(len(store))]
+        self.changed.clear()
+        for viewer in self.viewers:
+            viewer.resync = True
+
+    def snapshot(self) -> bytes:
+        """Return the snapshot event of the current records."""
+        return event(
+            "snapshot",
+            f'{{"seq":{self.seq},"time":{time.time():.3f},"fields":{FIELDS_JSON},"ips":{self._ips_json},'
+            f'"nodes":[{",".join(self.records)}]}}',
+        )
+
+    def publish(self):
+        """Send one tick: snapshots to viewers that need one, the changed rows to the others."""
+        if not self.viewers:
+            self._ips = None  # Nobody to keep the records for, rebuilt on the next viewer
+            self.changed.clear()
+            return
+        if self.store.ips is not self._ips:
+            self._rebuild()
+        self.seq += 1
+        rows = sorted(self.changed)
+        self.changed.clear()
+        delta = None
+        if rows:
+            store, records = self.store, self.records
+            entries = []
+            for row in rows:
+                records[row] = encode_row(store, row)
+                entries.append(f"[{row},{records[row][1:]}")
+            delta = event("delta", f'{{"seq":{self.seq},"time":{time.time():.3f},"nodes":[{",".join(entries)}]}}')
+        elif self.seq % HEARTBEAT_TICKS == 0:
+            delta = b": keepalive\n\n"
+
+        snapshot = None
+        for viewer in list(self.viewers):
+            transport = viewer.writer.transport
+            if transport.is_closing():
+                self.viewers.discard(viewer)
+                continue
+            if transport.get_write_buffer_size() > self.max_buffer:
+                if not viewer.resync:
+                    logger.warning(f"Viewer {viewer.peer} is falling behind, resyncing it once it catches up")
+                viewer.resync = True
+                viewer.dropped += 1
+                continue
+            if viewer.resync:
+                if snapshot is None:
+                    snapshot = self.snapshot()
+                transport.write(snapshot)
+                viewer.resync = False
+            elif delta is not None:
+                transport.write(delta)
+
+    async def _run(self):
+        """Listen for viewers and publish every tick."""
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            logger.error(f"Cannot serve the status feed on {self.host}:{self.port}: {e}")
+            return
+        logger.info(f"Serving the status feed on http://{self.host}:{self.port}{FEED_PATH}")
+        while True:
+            await asyncio.sleep(self.tick)
+            self.publish()
+
+    def start(self):
+        """Start serving on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop serving and drop every viewer."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for viewer in list(self.viewers):
+            viewer.writer.close()
+        self.viewers.clear()
+        self.store.unsubscribe(self.changed)
+
+
+class FeedClient(SchedulerControl):
+    """Shows the state published by another monitor's status feed.
+
+    Takes the place of the probe scheduler in a Monitor, like the Collector:
+    it keeps track of the monitored nodes through the same control
+    interface, but instead of probing them it hands the states the feed
+    publishes for them to ``record``; the publishing monitor schedules the
+    probes, so the rate controls do nothing. Nodes the feed does not know stay
+    "Checking...", and a lost connection is retried with exponential
+    backoff while the nodes it covered are shown as "Checking...".
+    """
+
+    def __init__(
+        self,
+        record: Callable[[NodeData, int, float, StatsSummary, bool, bool], None],
+        host: str,
+        port: int = FEED_PORT,
+        on_disconnect: Callable[[list[str]], None] | None = None,
+        idle_timeout: float = IDLE_TIMEOUT,
+    ):
+        """Initialize the client.
+
+        Args:
+            record (Callable[[NodeData, int, float, StatsSummary, bool, bool], None]): Called with the
+                node, its status code, check time, statistics, whether it is stale and whether the
+                change should be announced, which it is not for snapshots.
+            host (str): The publishing monitor's host.
+            port (int): The publishing monitor's feed port.
+            on_disconnect (Callable[[list[str]], None] | None): Called with the addresses the feed
+                covered when the connection ends.
+            idle_timeout (float): Seconds without a line after which the feed is considered gone.
+        """
+        self.record = record
+        self.host = host
+        self.port = port
+        self.on_disconnect = on_disconnect
+        self.idle_timeout = idle_timeout
+        self.nodes: dict[str, NodeData] = {}
+        self.ips: list[str] = []  # Addresses of the last snapshot, deltas refer to them by position
+        self.connected = False
+        self._task = None
+
+    def add(self, node: NodeData, interval: float | None = None, delay: float | None = None):
+        """Show the published state of a node."""
+        self.nodes[node.ip] = node
+
+    def remove(self, ip: str):
+        """Ignore the published state of a node."""
+        self.nodes.pop(ip, None)
+
+    def _apply(self, kind: str, payload: dict):
+        """Record the entries of a snapshot or delta event."""
+        if kind == "snapshot":
+            self.ips = payload["ips"]
+            entries = enumerate(payload["nodes"])
+        elif kind == "delta":
+            entries = ((values[0], values[1:]) for values in payload["nodes"])
+        else:
+            return
+        announce = kind == "delta"
+        ips, nodes = self.ips, self.nodes
+        for row, values in entries:
+            node = nodes.get(ips[row]) if row < len(ips) else None
+            if node is not None:
+                self.record(node, *decode_row(values), announce)
+
+    async def _session(self):
+        """Follow the feed until the connection ends."""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=MAX_FRAME), self.idle_timeout
+        )
+        try:
+            writer.write(f"GET {FEED_PATH} HTTP/1.1\r\nHost: {self.host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+            status = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+            if status.split()[1:2] != [b"200"]:
+                raise ConnectionError(f"Feed answered {status.decode('latin-1').strip()!r}")
+            while (await asyncio.wait_for(reader.readline(), self.idle_timeout)).strip():
+                pass
+            self.connected = True
+            logger.info(f"Following the status feed of {self.host}:{self.port}")
+            kind, data = None, []
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                if not line:
+                    raise ConnectionError("Feed closed the connection")
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    if kind is not None and data:
+                        self._apply(kind, json.loads(b"\n".join(data)))
+                    kind, data = None, []
+                elif line.startswith(b"event:"):
+                    kind = line[6:].strip().decode()
+                elif line.startswith(b"data:"):
+                    data.append(line[5:].removeprefix(b" "))
+        finally:
+            writer.close()
+
+    async def _run(self):
+        """Follow the feed, reconnecting with backoff whenever the connection ends."""
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                await self._session()
+            except asyncio.TimeoutError:
+                logger.warning(f"Status feed of {self.host}:{self.port} went silent")
+            except (OSError, ValueError, TypeError, KeyError, IndexError) as e:
+                logger.warning(f"Lost the status feed of {self.host}:{self.port}: {e}")
+            if self.connected:
+                self.connected = False
+                delay = RECONNECT_DELAY
+                if self.on_disconnect is not None and self.ips:
+                    self.on_disconnect(self.ips)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    def start(self):
+        """Start following the feed on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop following the feed."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
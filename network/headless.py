@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import signal
+import time
+from network.checker import read_node_file
+from network.metrics import MetricsServer
+from network.monitor import Monitor
+from network.node import NodeData
+from network.status import ONLINE, OFFLINE, UNREACHABLE, UNRESOLVED
+from network.watcher import FileWatcher
+
+SUMMARY_INTERVAL = 60.0
+
+
+def print_transition(node: NodeData, status: bool):
+    """Print a status transition to stdout.
+
+    Args:
+        node (NodeData): The node that changed status.
+        status (bool): True if the node came online, False if it went offline.
+    """
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - Node {node.ip} has {'come online' if status else 'gone offline'}", flush=True)
+
+
+def print_reachability(cause: NodeData | None, nodes: list[NodeData], reachable: bool):
+    """Print one line for a group of nodes cut off or reconnected together.
+
+    Args:
+        cause (NodeData | None): The node whose status change caused it, None after a reload.
+        nodes (list[NodeData]): The affected nodes.
+        reachable (bool): True if they became reachable again.
+    """
+    behind = f" behind {cause.ip}" if cause is not None else ""
+    state = "reachable again" if reachable else "unreachable, parent down"
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {len(nodes)} nodes{behind} are {state}", flush=True)
+
+
+def print_summary(monitor: Monitor):
+    """Print a one-line summary of every node's status to stdout.
+
+    Args:
+        monitor (Monitor): The running monitor.
+    """
+    store = monitor.status_store
+    online = store.status.count(ONLINE)
+    offline = store.status.count(OFFLINE)
+    unreachable = store.status.count(UNREACHABLE)
+    unresolved = store.status.count(UNRESOLVED)
+    degraded = sum(1 for ip in store.ips if store.is_degraded(ip))
+    print(
+        f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {online} online ({degraded} degraded), "
+        f"{offline} offline, {unreachable} unreachable, {unresolved} unresolved, "
+        f"{len(store) - online - offline - unreachable - unresolved} checking",
+        flush=True
+    )
+
+
+def reload_file(monitor: Monitor, file_path: str):
+    """Apply the changes in the node file to a running monitor.
+
+    Args:
+        monitor (Monitor): The running monitor.
+        file_path (str): The path to the node file.
+    """
+    nodes = read_node_file(file_path)
+    if not nodes:
+        logging.warning(f"No nodes in {file_path}, keeping the current nodes")
+        return
+    diff = monitor.reload(nodes)
+    if diff:
+        logging.info(f"Reloaded {file_path}: {diff.summary()}")
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - Reloaded {file_path}: {diff.summary()}", flush=True)
+
+
+def save_state(monitor: Monitor, state_path: str):
+    """Write a monitor's state snapshot, logging rather than raising if that fails.
+
+    Args:
+        monitor (Monitor): The running monitor.
+        state_path (str): The snapshot file.
+    """
+    try:
+        monitor.save_state(state_path)
+    except OSError as e:
+        logging.error(f"Could not save state to {state_path}: {e}")
+
+
+async def save_periodically(monitor: Monitor, state_path: str, interval: float):
+    """Save a monitor's state snapshot every interval until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        save_state(monitor, state_path)
+
+
+async def run_monitor(
+    monitor: Monitor,
+    summary_interval: float = SUMMARY_INTERVAL,
+    file_path: str | None = None,
+    metrics: tuple[str, int] | None = None,
+    state_path: str | None = None,
+    feed: tuple[str, int] | None = None,
+):
+    """Run a monitor on the current loop until SIGINT or SIGTERM.
+
+    Args:
+        monitor (Monitor): The monitor to run.
+        summary_interval (float): Seconds between summary lines, 0 disables them.
+        file_path (str | None): Node file to watch and hot reload, if any.
+        metrics (tuple[str, int] | None): Host and port to serve Prometheus metrics on, if any.
+        state_path (str | None): Snapshot file to save the state to periodically and on the way out, if any.
+        feed (tuple[str, int] | None): Host and port to publish the status feed on, if any.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on this platform, KeyboardInterrupt still works
+
+    monitor.start()
+    server = None
+    if metrics is not None:
+        server = MetricsServer(*metrics)
+        server.start()
+    publisher = None
+    if feed is not None:
+        from network.feed import StatusFeed
+        publisher = StatusFeed(monitor.status_store, *feed)
+        publisher.start()
+    watcher = None
+    if file_path is not None:
+        watcher = FileWatcher(file_path, lambda: reload_file(monitor, file_path))
+        watcher.start()
+    saver = None
+    if state_path is not None:
+        from network.snapshot import SNAPSHOT_INTERVAL
+        saver = asyncio.create_task(save_periodically(monitor, state_path, SNAPSHOT_INTERVAL))
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), summary_interval or None)
+            except asyncio.TimeoutError:
+                print_summary(monitor)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        if server is not None:
+            server.stop()
+        if publisher is not None:
+            publisher.stop()
+        if saver is not None:
+            saver.cancel()
+            save_state(monitor, state_path)
+        monitor.stop()
+
+
+def run_headless(
+    nodes: list[NodeData],
+    summary_interval: float = SUMMARY_INTERVAL,
+    file_path: str | None = None,
+    workers: int = 0,
+    listen: tuple[str, int] | None = None,
+    metrics: tuple[str, int] | None = None,
+    restore: bool = True,
+    passive: bool = False,
+    feed: tuple[str, int] | None = None,
+    view: tuple[str, int] | None = None,
+):
+    """Monitor nodes without a GUI, reporting to stdout and the log files.
+
+    The last-known state is restored from the state snapshot and saved back
+    to it while running, so a restart picks up where the last run left off.
+
+    Args:
+        nodes (list[NodeData]): List of nodes to monitor.
+        summary_interval (float): Seconds between summary lines, 0 disables them.
+        file_path (str | None): Node file to watch and hot reload, if any.
+        workers (int): Number of probe worker processes, 0 probes in this process.
+        listen (tuple[str, int] | None): Collect results from remote agents on this host and port instead of probing.
+        metrics (tuple[str, int] | None): Host and port to serve Prometheus metrics on, if any.
+        restore (bool): Restore and save the state snapshot, False to start fresh and save nothing.
+        passive (bool): Confirm directly attached nodes from the kernel neighbour table.
+        feed (tuple[str, int] | None): Host and port to publish the status feed on, if any.
+        view (tuple[str, int] | None): Host and port of another monitor's status feed to show instead of probing.
+    """
+    monitor = Monitor(
+        nodes, on_transition=print_transition, on_reachability=print_reachability, workers=workers, listen=listen,
+        passive=passive, view=view,
+    )
+    state_path = None
+    if restore and view is None:  # A viewer has no state of its own
+        # Imported here, numpy is not needed to import the headless runner
+        from network.snapshot import STATE_PATH, load_snapshot
+        state_path = STATE_PATH
+        snapshot = load_snapshot(state_path)
+        if snapshot is not None:
+            logging.info(f"Restored the last-known state of {monitor.restore(snapshot)} nodes from {state_path}")
+            snapshot.close()
+    logging.info(f"Monitoring {len(monitor.nodes)} nodes headless")
+    asyncio.run(run_monitor(monitor, summary_interval, file_path, metrics, state_path, feed))
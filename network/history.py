@@ -0,0 +1,295 @@
+import time
+import numpy as np
+
+RAW_SLOTS = 720  # One hour of 5-second samples per node
+TIERS = (
+    (60, 360),  # 1-minute buckets, six hours
+    (3600, 168),  # 1-hour buckets, one week
+)
+
+
+class _Tier:
+    """Ring of fixed-width time buckets aggregating samples for every node."""
+
+    def __init__(self, nodes: int, width: int, slots: int):
+        """Allocate the tier.
+
+        Args:
+            nodes (int): Number of node rows.
+            width (int): Bucket width in seconds.
+            slots (int): Number of buckets kept per node.
+        """
+        self.width = width
+        self.slots = slots
+        self.bucket = np.full(slots, -1, dtype=np.int64)  # Absolute bucket number held by each slot
+        self.samples = np.zeros((nodes, slots), dtype=np.uint16)
+        self.up = np.zeros((nodes, slots), dtype=np.uint16)
+        self.rtt_sum = np.zeros((nodes, slots), dtype=np.float32)
+
+    @property
+    def span(self) -> int:
+        """Return the time covered by the tier in seconds."""
+        return self.width * self.slots
+
+    def arrays(self) -> tuple[np.ndarray, ...]:
+        """Return every array of the tier."""
+        return self.bucket, self.samples, self.up, self.rtt_sum
+
+    def add(self, rows: np.ndarray, ts: np.ndarray, up: np.ndarray, rtt: np.ndarray):
+        """Fold a batch of samples into their buckets."""
+        bucket = (ts // self.width).astype(np.int64)
+        slot = bucket % self.slots
+        for new_bucket in np.unique(bucket):
+            new_slot = new_bucket % self.slots
+            if self.bucket[new_slot] < new_bucket:
+                # The slot still holds an older bucket, recycle it for every node
+                self.bucket[new_slot] = new_bucket
+                self.samples[:, new_slot] = 0
+                self.up[:, new_slot] = 0
+                self.rtt_sum[:, new_slot] = 0
+        # Samples older than the bucket now occupying their slot are dropped
+        keep = self.bucket[slot] == bucket
+        rows, slot, up, rtt = rows[keep], slot[keep], up[keep], rtt[keep]
+        np.add.at(self.samples, (rows, slot), 1)
+        np.add.at(self.up, (rows, slot), up)
+        np.add.at(self.rtt_sum, (rows, slot), np.where(up, rtt, 0))
+
+    def window(self, since: float, until: float) -> np.ndarray:
+        """Return a mask of the slots whose bucket lies within a time range."""
+        first, last = int(since // self.width), int(until // self.width)
+        return (self.bucket >= first) & (self.bucket <= last)
+
+
+class HistoryStore:
+    """Preallocated in-memory time series of node status and RTT.
+
+    Raw samples go into a 2-D ring buffer with one row per node. Every sample
+    is also folded into coarser 1-minute and 1-hour tiers as it is recorded,
+    so memory is fixed by the node count and slot counts alone. Queries are
+    vectorized across nodes and pick the finest tier covering the window.
+    """
+
+    def __init__(self, nodes: int, raw_slots: int = RAW_SLOTS, tiers: tuple[tuple[int, int], ...] = TIERS):
+        """Allocate the store.
+
+        Args:
+            nodes (int): Number of node rows.
+            raw_slots (int): Number of raw samples kept per node.
+            tiers (tuple[tuple[int, int], ...]): ``(bucket width in seconds, slots)`` per coarse tier.
+        """
+        self.raw_slots = raw_slots
+        self.tier_specs = tiers
+        self.epoch = time.time() - 1  # Raw timestamps are stored as seconds since this, 0 means empty
+        self.pending: list[tuple[int, float, bool, float]] = []
+        self._allocate(nodes)
+
+    def _allocate(self, nodes: int):
+        """Allocate empty buffers for a number of node rows."""
+        self.raw_ts = np.zeros((nodes, self.raw_slots), dtype=np.uint32)
+        self.raw_up = np.zeros((nodes, self.raw_slots), dtype=np.bool_)
+        self.raw_rtt = np.zeros((nodes, self.raw_slots), dtype=np.float32)
+        self.head = np.zeros(nodes, dtype=np.int64)
+        self.tiers = [_Tier(nodes, width, slots) for width, slots in self.tier_specs]
+
+    def __len__(self) -> int:
+        """Return the number of node rows."""
+        return len(self.head)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the buffers in bytes."""
+        arrays = [self.raw_ts, self.raw_up, self.raw_rtt, self.head]
+        for tier in self.tiers:
+            arrays += tier.arrays()
+        return sum(array.nbytes for array in arrays)
+
+    def reset(self, nodes: int):
+        """Drop every sample and resize the store.
+
+        Args:
+            nodes (int): Number of node rows.
+        """
+        self.pending.clear()
+        self._allocate(nodes)
+
+    def remap(self, keep: list[int], added: int):
+        """Rearrange the node rows, keeping the samples of surviving nodes.
+
+        Args:
+            keep (list[int]): The previous row of each surviving row, in new row order.
+            added (int): Number of empty rows appended after the survivors.
+        """
+        self.flush()
+        keep = np.asarray(keep, dtype=np.int64)
+        survivors, rows = len(keep), len(keep) + added
+        if rows == len(self) and np.array_equal(keep, np.arange(rows)):
+            return
+
+        def remapped(array: np.ndarray) -> np.ndarray:
+            # Only the surviving rows are copied, in place when the row count stays the same
+            if rows == len(array):
+                array[:survivors] = array[keep]
+                array[survivors:] = 0
+                return array
+            result = np.zeros((rows,) + array.shape[1:], dtype=array.dtype)
+            np.take(array, keep, axis=0, out=result[:survivors], mode='clip')
+            return result
+
+        self.raw_ts = remapped(self.raw_ts)
+        self.raw_up = remapped(self.raw_up)
+        self.raw_rtt = remapped(self.raw_rtt)
+        self.head = remapped(self.head)
+        for tier in self.tiers:
+            tier.samples = remapped(tier.samples)
+            tier.up = remapped(tier.up)
+            tier.rtt_sum = remapped(tier.rtt_sum)
+
+    def append(self, row: int, ts: float, up: bool, rtt: float | None):
+        """Queue one sample, it is written on the next ``flush``.
+
+        Args:
+            row (int): The node row.
+            ts (float): Epoch time of the sample.
+            up (bool): Whether the node answered.
+            rtt (float | None): The round-trip time in seconds.
+        """
+        self.pending.append((row, ts, up, rtt or 0.0))
+
+    def flush(self):
+        """Write the queued samples to the buffers in one vectorized batch."""
+        if not self.pending:
+            return
+        rows, ts, up, rtt = (np.array(column) for column in zip(*self.pending))
+        self.pending.clear()
+        self.record_many(rows.astype(np.int64), ts.astype(np.float64), up.astype(np.bool_), rtt.astype(np.float32))
+
+    def record_many(self, rows: np.ndarray, ts: np.ndarray, up: np.ndarray, rtt: np.ndarray):
+        """Record a batch of samples.
+
+        Args:
+            rows (np.ndarray): Node rows, may repeat.
+            ts (np.ndarray): Epoch times.
+            up (np.ndarray): Whether each node answered.
+            rtt (np.ndarray): Round-trip times in seconds.
+        """
+        valid = (rows >= 0) & (rows < len(self))
+        rows, ts, up, rtt = rows[valid], ts[valid], up[valid], rtt[valid]
+        if not len(rows):
+            return
+
+        # Samples of the same node in one batch take consecutive ring slots
+        order = np.argsort(rows, kind='stable')
+        rows, ts, up, rtt = rows[order], ts[order], up[order], rtt[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        counts = np.diff(np.r_[starts, len(rows)])
+        rank = np.arange(len(rows)) - np.repeat(starts, counts)
+        slot = (self.head[rows] + rank) % self.raw_slots
+
+        self.raw_ts[rows, slot] = np.maximum(ts - self.epoch, 1).astype(np.uint32)
+        self.raw_up[rows, slot] = up
+        self.raw_rtt[rows, slot] = rtt
+        self.head[rows[starts]] += counts
+
+        for tier in self.tiers:
+            tier.add(rows, ts, up, rtt)
+
+    def _raw_covers(self, since: float, rows: slice = slice(None)) -> bool:
+        """Return whether the raw ring still holds every sample since a time, for a slice of the rows."""
+        full = self.head[rows] >= self.raw_slots
+        if not full.any():
+            return True
+        return bool((self.raw_ts[rows][full].min(axis=1) + self.epoch <= since).all())
+
+    def _tier_for(self, since: float, until: float, rows: slice = slice(None)):
+        """Return the finest tier covering a window for a slice of the rows, None meaning the raw ring."""
+        if self._raw_covers(since, rows):
+            return None
+        for tier in self.tiers:
+            if until - since <= tier.span:
+                return tier
+        return self.tiers[-1] if self.tiers else None
+
+    def _counts(
+        self, since: float, until: float | None = None, rows: slice = slice(None)
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return per-node sample, up and RTT-sum totals over a window, for a slice of the rows."""
+        self.flush()
+        until = time.time() if until is None else until
+        tier = self._tier_for(since, until, rows)
+        if tier is None:
+            lo, hi = max(since - self.epoch, 1), until - self.epoch
+            raw_ts, raw_up = self.raw_ts[rows], self.raw_up[rows]
+            mask = (raw_ts >= lo) & (raw_ts <= hi)
+            samples = mask.sum(axis=1)
+            up = (mask & raw_up).sum(axis=1)
+            rtt_sum = np.where(mask & raw_up, self.raw_rtt[rows], 0).sum(axis=1)
+        else:
+            mask = tier.window(since, until)
+            samples = tier.samples[rows][:, mask].sum(axis=1)
+            up = tier.up[rows][:, mask].sum(axis=1)
+            rtt_sum = tier.rtt_sum[rows][:, mask].sum(axis=1)
+        return samples, up, rtt_sum
+
+    def availability(self, since: float, until: float | None = None) -> np.ndarray:
+        """Return the fraction of successful probes per node over a window.
+
+        Args:
+            since (float): Start of the window, epoch seconds.
+            until (float | None): End of the window, defaults to now.
+
+        Returns:
+            np.ndarray: Availability between 0 and 1 per node row, NaN without samples.
+        """
+        samples, up, _ = self._counts(since, until)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return up / samples
+
+    def node_availability(self, row: int, hours: float = 24) -> float | None:
+        """Return the availability of one node over the last hours.
+
+        Args:
+            row (int): The node row.
+            hours (float): Length of the window in hours.
+
+        Returns:
+            float | None: Availability between 0 and 1, None without samples.
+        """
+        samples, up, _ = self._counts(time.time() - hours * 3600, rows=slice(row, row + 1))
+        return float(up[0] / samples[0]) if samples[0] else None
+
+    def mean_rtt(self, since: float, until: float | None = None) -> np.ndarray:
+        """Return the mean RTT of successful probes per node over a window, NaN without replies."""
+        _, up, rtt_sum = self._counts(since, until)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return rtt_sum / up
+
+    def lossy_nodes(self, threshold: float = 0.01, hours: float = 1) -> np.ndarray:
+        """Return the rows of nodes whose loss exceeded a threshold.
+
+        Args:
+            threshold (float): Loss fraction, e.g. 0.01 for 1%.
+            hours (float): Length of the window in hours.
+
+        Returns:
+            np.ndarray: The matching node rows.
+        """
+        samples, up, _ = self._counts(time.time() - hours * 3600)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            loss = 1 - up / samples
+        return np.flatnonzero(loss > threshold)
+
+    def series(self, row: int, since: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the raw samples of one node since a time, oldest first.
+
+        Args:
+            row (int): The node row.
+            since (float): Start of the window, epoch seconds.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Epoch times, up flags and RTTs.
+        """
+        self.flush()
+        order = np.argsort(self.raw_ts[row])
+        ts = self.raw_ts[row][order]
+        keep = (ts > 0) & (ts + self.epoch >= since)
+        return ts[keep] + self.epoch, self.raw_up[row][order][keep], self.raw_rtt[row][order][keep]
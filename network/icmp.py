@@ -0,0 +1,380 @@
+import asyncio
+import heapq
+import ipaddress
+import logging
+import os
+import socket
+import struct
+import subprocess
+import sys
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+DEFAULT_TIMEOUT = 1.0
+PAYLOAD = b"network-monitor!"  # 16 bytes, also used as a sanity check on replies
+
+
+def checksum(data: bytes) -> int:
+    """Compute the RFC 1071 internet checksum of a byte string.
+
+    Args:
+        data (bytes): The bytes to checksum.
+
+    Returns:
+        int: The 16-bit one's complement checksum.
+    """
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(ident: int, seq: int, ipv6: bool = False, payload: bytes = PAYLOAD) -> bytes:
+    """Build an ICMP (or ICMPv6) echo request packet.
+
+    Args:
+        ident (int): The 16-bit echo identifier.
+        seq (int): The 16-bit echo sequence number.
+        ipv6 (bool): Build an ICMPv6 echo request instead of ICMPv4.
+        payload (bytes): The echo payload.
+
+    Returns:
+        bytes: The packet, ready to be sent on an ICMP socket.
+    """
+    icmp_type = ICMPV6_ECHO_REQUEST if ipv6 else ICMP_ECHO_REQUEST
+    header = struct.pack("!BBHHH", icmp_type, 0, 0, ident, seq)
+    if ipv6:
+        # The kernel fills in the ICMPv6 checksum, it needs the pseudo header
+        return header + payload
+    csum = checksum(header + payload)
+    return struct.pack("!BBHHH", icmp_type, 0, csum, ident, seq) + payload
+
+
+def parse_echo_reply(packet: bytes, ipv6: bool = False, has_ip_header: bool = False) -> tuple[int, int] | None:
+    """Parse an echo reply and return its identifier and sequence number.
+
+    Args:
+        packet (bytes): The received packet.
+        ipv6 (bool): Whether the packet came from an ICMPv6 socket.
+        has_ip_header (bool): Whether the packet starts with an IPv4 header (raw sockets).
+
+    Returns:
+        tuple[int, int] | None: ``(ident, seq)`` for echo replies, None for anything else.
+    """
+    offset = 0
+    if has_ip_header and packet:
+        offset = (packet[0] & 0x0F) * 4
+    if len(packet) < offset + 8:
+        return None
+    icmp_type, _code, _csum, ident, seq = struct.unpack_from("!BBHHH", packet, offset)
+    if icmp_type != (ICMPV6_ECHO_REPLY if ipv6 else ICMP_ECHO_REPLY):
+        return None
+    return ident, seq
+
+
+class _IcmpSocket:
+    """One ICMP socket shared by every outstanding probe of an address family."""
+
+    def __init__(self, family: int):
+        """Open an unprivileged datagram ICMP socket, falling back to a raw socket.
+
+        Args:
+            family (int): ``socket.AF_INET`` or ``socket.AF_INET6``.
+
+        Raises:
+            OSError: If neither a datagram nor a raw ICMP socket can be opened.
+        """
+        self.family = family
+        self.ipv6 = family == socket.AF_INET6
+        proto = socket.IPPROTO_ICMPV6 if self.ipv6 else socket.IPPROTO_ICMP
+        try:
+            self.sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            self.raw = False
+        except OSError:
+            self.sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.raw = True
+        self.sock.setblocking(False)
+
+        if self.raw:
+            self.ident = os.getpid() & 0xFFFF
+        else:
+            # Datagram ICMP sockets get their identifier rewritten by the kernel
+            # to the local "port", so bind first and read it back.
+            self.sock.bind(("::", 0) if self.ipv6 else ("0.0.0.0", 0))
+            self.ident = self.sock.getsockname()[1]
+
+        # IPv4 raw sockets deliver the IP header, everything else does not
+        self.has_ip_header = self.raw and not self.ipv6
+
+    def fileno(self) -> int:
+        """Return the socket file descriptor."""
+        return self.sock.fileno()
+
+    def close(self):
+        """Close the socket."""
+        self.sock.close()
+
+
+class IcmpProber:
+    """Asynchronous ICMP echo engine multiplexing many probes over one socket per family.
+
+    Replies are matched to probes by identifier and sequence number. A single
+    reader coroutine drains the sockets and expires overdue probes, so the
+    number of outstanding probes does not change the number of coroutines.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        """Initialize the prober.
+
+        Args:
+            timeout (float): Default per-probe timeout in seconds.
+        """
+        self.timeout = timeout
+        self._sockets: dict[int, _IcmpSocket] = {}
+        self._pending: dict[tuple[int, int, int], tuple[asyncio.Future, float]] = {}
+        self._deadlines: list[tuple[float, tuple[int, int, int], float]] = []  # Deadline, key, send time
+        self._seq = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def _socket_for(self, family: int) -> _IcmpSocket:
+        """Return (opening on first use) the socket for an address family."""
+        icmp_socket = self._sockets.get(family)
+        if icmp_socket is None:
+            icmp_socket = _IcmpSocket(family)
+            self._sockets[family] = icmp_socket
+            self._loop.add_reader(icmp_socket.fileno(), self._on_readable)
+            logger.info(
+                f"Opened {'raw' if icmp_socket.raw else 'datagram'} "
+                f"{'ICMPv6' if icmp_socket.ipv6 else 'ICMP'} socket (ident {icmp_socket.ident})"
+            )
+        return icmp_socket
+
+    def _ensure_started(self):
+        """Bind the prober to the running loop and start the reader coroutine."""
+        if self._reader_task is None or self._reader_task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._reader_task = self._loop.create_task(self._reader())
+
+    def _next_seq(self, family: int, ident: int) -> int:
+        """Return the next free 16-bit sequence number for a socket."""
+        for _ in range(0x10000):
+            self._seq = (self._seq + 1) & 0xFFFF
+            if (family, ident, self._seq) not in self._pending:
+                return self._seq
+        raise RuntimeError("Too many outstanding ICMP probes")
+
+    async def probe(self, address: str, timeout: float | None = None) -> float | None:
+        """Send one echo request and wait for the matching reply.
+
+        Args:
+            address (str): The IPv4 or IPv6 address to probe.
+            timeout (float | None): Timeout in seconds, defaults to the prober timeout.
+
+        Returns:
+            float | None: The round-trip time in seconds, or None on timeout.
+        """
+        self._ensure_started()
+        ip = ipaddress.ip_address(address)
+        family = socket.AF_INET6 if ip.version == 6 else socket.AF_INET
+        icmp_socket = self._socket_for(family)
+        seq = self._next_seq(family, icmp_socket.ident)
+        key = (family, icmp_socket.ident, seq)
+
+        future = self._loop.create_future()
+        sent_at = self._loop.time()
+        deadline = sent_at + (self.timeout if timeout is None else timeout)
+        self._pending[key] = (future, sent_at)
+        heapq.heappush(self._deadlines, (deadline, key, sent_at))
+        if self._deadlines[0][0] == deadline:
+            # New earliest deadline, let the reader recompute its sleep
+            self._wakeup.set()
+
+        packet = build_echo_request(icmp_socket.ident, seq, icmp_socket.ipv6)
+        try:
+            icmp_socket.sock.sendto(packet, (str(ip), 0))
+        except OSError as e:
+            self._pending.pop(key, None)
+            logger.debug(f"Error sending echo request to {address}: {e}")
+            return None
+
+        try:
+            return await future
+        finally:
+            self._pending.pop(key, None)
+
+    def _on_readable(self):
+        """Wake the reader coroutine when a socket becomes readable."""
+        self._wakeup.set()
+
+    def _drain(self):
+        """Read every queued reply and resolve the matching probes."""
+        now = self._loop.time()
+        for family, icmp_socket in self._sockets.items():
+            while True:
+                try:
+                    packet = icmp_socket.sock.recv(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError as e:
+                    logger.debug(f"Error reading ICMP socket: {e}")
+                    break
+                reply = parse_echo_reply(packet, icmp_socket.ipv6, icmp_socket.has_ip_header)
+                if reply is None:
+                    continue
+                ident, seq = reply
+                if icmp_socket.raw and ident != icmp_socket.ident:
+                    continue  # Someone else's echo reply on a raw socket
+                entry = self._pending.get((family, icmp_socket.ident, seq))
+                if entry is not None and not entry[0].done():
+                    entry[0].set_result(now - entry[1])
+
+    def _expire(self):
+        """Time out every probe whose deadline has passed.
+
+        Deadlines of finished probes stay in the heap. Their sequence number
+        may have been reused since, so an entry only expires the probe sent
+        at its send time.
+        """
+        now = self._loop.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _deadline, key, sent_at = heapq.heappop(self._deadlines)
+            entry = self._pending.get(key)
+            if entry is not None and entry[1] == sent_at and not entry[0].done():
+                entry[0].set_result(None)
+
+    async def _reader(self):
+        """Single coroutine that drains replies and enforces probe timeouts."""
+        while True:
+            timeout = None
+            if self._deadlines:
+                timeout = max(0.0, self._deadlines[0][0] - self._loop.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._drain()
+            self._expire()
+
+    def close(self):
+        """Stop the reader coroutine and close the sockets."""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        for icmp_socket in self._sockets.values():
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.remove_reader(icmp_socket.fileno())
+            icmp_socket.close()
+        self._sockets.clear()
+        for future, _sent_at in self._pending.values():
+            if not future.done():
+                future.set_result(None)
+        self._pending.clear()
+        self._deadlines.clear()
+
+
+class SubprocessProber:
+    """Fallback prober running the system ``ping`` binary once per probe."""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        """Initialize the prober.
+
+        Args:
+            timeout (float): Default per-probe timeout in seconds.
+        """
+        self.timeout = timeout
+
+    async def probe(self, address: str, timeout: float | None = None) -> float | None:
+        """Run ``ping -c 1`` against an address.
+
+        Args:
+            address (str): The IP address or hostname to probe.
+            timeout (float | None): Timeout in seconds, defaults to the prober timeout.
+
+        Returns:
+            float | None: The wall-clock round-trip time in seconds, or None on failure.
+        """
+        loop = asyncio.get_running_loop()
+        wait = max(1, round(self.timeout if timeout is None else timeout))
+        started = loop.time()
+        process = await asyncio.create_subprocess_exec(
+            "ping", "-c", "1", "-W", str(wait), address,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        await process.communicate()
+        if process.returncode != 0:
+            return None
+        return loop.time() - started
+
+    def close(self):
+        """Nothing to release for the subprocess backend."""
+
+
+_backend = os.environ.get("NETWORK_MONITOR_PROBE_BACKEND", "icmp")
+_prober: IcmpProber | SubprocessProber | None = None
+
+
+def set_backend(backend: str):
+    """Select the probe backend used by ``get_prober``.
+
+    Args:
+        backend (str): ``"icmp"`` for the in-process engine or ``"subprocess"`` for ``ping``.
+    """
+    global _backend, _prober
+    if backend not in ("icmp", "subprocess"):
+        raise ValueError(f"Unknown probe backend: {backend}")
+    if _prober is not None:
+        _prober.close()
+        _prober = None
+    _backend = backend
+
+
+def get_prober() -> IcmpProber | SubprocessProber:
+    """Return the shared prober, falling back to ``ping`` if ICMP sockets are unavailable.
+
+    Returns:
+        IcmpProber | SubprocessProber: The process-wide prober.
+    """
+    global _prober
+    if _prober is None:
+        if _backend == "icmp":
+            try:
+                # Opening a socket up front tells us whether we are allowed to
+                _IcmpSocket(socket.AF_INET).close()
+                _prober = IcmpProber()
+            except OSError as e:
+                logger.warning(f"ICMP sockets unavailable ({e}), falling back to the ping binary")
+                _prober = SubprocessProber()
+        else:
+            _prober = SubprocessProber()
+    return _prober
+
+
+def _format_rtt(rtt: float | None) -> str:
+    """Return an RTT in milliseconds, or "timeout"."""
+    return "timeout" if rtt is None else f"{rtt * 1000:.2f} ms"
+
+
+async def _compare(hosts: list[str]):
+    """Probe each host with both backends and print the results side by side."""
+    icmp, subproc = IcmpProber(), SubprocessProber()
+    for host in hosts:
+        native, external = await asyncio.gather(icmp.probe(host), subproc.probe(host))
+        print(f"{host:<40} icmp={_format_rtt(native):<12} ping={_format_rtt(external)}")
+    icmp.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_compare(sys.argv[1:]))
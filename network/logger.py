@@ -1,31 +1,261 @@
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
 
-def setup_logging():
-    """Set up logging for the main application."""
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+LOG_DIR = 'logs'
+MAIN_LOG = 'network_monitor.log'
+SHARED_NODE_LOG = 'nodes.log'
+NODE_LOGGER = 'nodes'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class _LogFile:
+    """An open log file with the bookkeeping needed for rotation."""
+
+    def __init__(self, path: str):
+        """Open a log file for appending.
+
+        Args:
+            path (str): The path of the log file.
+        """
+        self.path = path
+        self.stream = open(path, 'a', encoding='utf-8')
+        self.size = self.stream.tell()
+        self.opened = time.time()
+
+    def close(self):
+        """Close the file."""
+        self.stream.close()
+
+
+class LogWriter(threading.Thread):
+    """Single background thread writing every log record to disk.
+
+    The probe path only enqueues records. The writer drains the queue in
+    batches, routes node records to per-node files (kept in a bounded cache
+    of open files) or to one shared file with a node column, and writes
+    everything else to the main log. Files are rotated by size or age.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = LOG_DIR,
+        shared: bool = False,
+        max_open_files: int = 128,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 3,
+        rotate_interval: float | None = None,
+        queue_size: int = 100_000,
+        batch_size: int = 1000,
+    ):
+        """Initialize the writer.
+
+        Args:
+            log_dir (str): Directory holding the log files.
+            shared (bool): Write every node record to one shared file instead of one file per node.
+            max_open_files (int): Maximum number of node files kept open at once.
+            max_bytes (int): Rotate a file once it grows past this size, 0 disables.
+            backup_count (int): Number of rotated files to keep.
+            rotate_interval (float | None): Rotate a file once it has been open this many seconds.
+            queue_size (int): Maximum number of queued records, newer records are dropped past it.
+            batch_size (int): Maximum number of records written per batch.
+        """
+        super().__init__(name='log-writer', daemon=True)
+        self.log_dir = log_dir
+        self.shared = shared
+        self.max_open_files = max_open_files
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.formatter = logging.Formatter(LOG_FORMAT)
+        self._files: OrderedDict[str, _LogFile] = OrderedDict()
+        self._stopping = threading.Event()
+        os.makedirs(log_dir, exist_ok=True)
+
+    def enqueue(self, record: logging.LogRecord):
+        """Queue a record without blocking, dropping it if the queue is full.
+
+        Args:
+            record (logging.LogRecord): The record to write.
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _file(self, name: str) -> _LogFile:
+        """Return an open log file, evicting the least recently used one if needed."""
+        log_file = self._files.get(name)
+        if log_file is not None:
+            self._files.move_to_end(name)
+            return log_file
+        if len(self._files) >= self.max_open_files:
+            _, evicted = self._files.popitem(last=False)
+            evicted.close()
+        log_file = _LogFile(os.path.join(self.log_dir, name))
+        self._files[name] = log_file
+        return log_file
+
+    def _should_rotate(self, log_file: _LogFile) -> bool:
+        """Return whether a file has outgrown its size or age limit."""
+        if self.max_bytes and log_file.size >= self.max_bytes:
+            return True
+        return self.rotate_interval is not None and time.time() - log_file.opened >= self.rotate_interval
+
+    def _rotate(self, name: str):
+        """Rotate ``name`` to ``name.1``, shifting older backups up by one."""
+        self._files.pop(name).close()
+        path = os.path.join(self.log_dir, name)
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if self.backup_count:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+    def _route(self, record: logging.LogRecord) -> tuple[str, str]:
+        """Return the file name and formatted line for a record."""
+        line = self.formatter.format(record)
+        prefix = NODE_LOGGER + '.'
+        if not record.name.startswith(prefix):
+            return MAIN_LOG, line
+        node = record.name[len(prefix):]
+        if self.shared:
+            return SHARED_NODE_LOG, f"{node} - {line}"
+        return f"{node}.log", line
+
+    def _write_batch(self, records: list[logging.LogRecord]):
+        """Write a batch of records, one write and flush per touched file."""
+        lines: dict[str, list[str]] = {}
+        for record in records:
+            try:
+                name, line = self._route(record)
+            except Exception:
+                continue
+            lines.setdefault(name, []).append(line)
+
+        for name, file_lines in lines.items():
+            try:
+                log_file = self._file(name)
+                data = '\n'.join(file_lines) + '\n'
+                log_file.stream.write(data)
+                log_file.stream.flush()
+                log_file.size += len(data)
+                if self._should_rotate(log_file):
+                    self._rotate(name)
+            except OSError:
+                self._files.pop(name, None)
+
+    def run(self):
+        """Drain the queue in batches until stopped."""
+        while not (self._stopping.is_set() and self.queue.empty()):
+            try:
+                records = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(records) < self.batch_size:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(records)
+
+    def stop(self):
+        """Write out everything still queued, then close the files."""
+        self._stopping.set()
+        if self.is_alive():
+            self.join()
+        for log_file in self._files.values():
+            log_file.close()
+        self._files.clear()
+
+
+class QueueLogHandler(logging.Handler):
+    """Logging handler that hands records to the LogWriter thread."""
+
+    def __init__(self, writer: LogWriter):
+        """Initialize the handler.
+
+        Args:
+            writer (LogWriter): The writer receiving the records.
+        """
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord):
+        """Queue a record, freezing its message so it can be formatted later."""
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        self.writer.enqueue(record)
+
+
+def get_log_writer(**kwargs) -> LogWriter:
+    """Return the process-wide log writer, starting it on first use.
+
+    Args:
+        **kwargs: Options passed to LogWriter when it is first created.
+
+    Returns:
+        LogWriter: The running writer.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter(**kwargs)
+            _writer.start()
+            atexit.register(_writer.stop)
+
+            # Node records only go through the writer, not the main log
+            node_logger = logging.getLogger(NODE_LOGGER)
+            node_logger.setLevel(logging.INFO)
+            node_logger.propagate = False
+            node_logger.addHandler(QueueLogHandler(_writer))
+    return _writer
+
+
+def log_queue_depth() -> int | None:
+    """Return the number of records waiting for the log writer, or None if it is not running."""
+    writer = _writer
+    return writer.queue.qsize() if writer is not None else None
+
+
+def setup_logging(**kwargs):
+    """Set up logging for the main application.
+
+    Args:
+        **kwargs: Options for the background LogWriter, see its constructor.
+    """
+    writer = get_log_writer(**kwargs)
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[logging.FileHandler("logs/network_monitor.log", mode='a')]
+        format=LOG_FORMAT,
+        handlers=[QueueLogHandler(writer)]
     )
 
+
 def setup_node_logging(node: str) -> logging.Logger:
     """Set up logging for a specific node.
 
+    Node loggers share the writer's single handler through their parent, so
+    calling this again for the same node does not add handlers.
+
     Args:
         node (str): The IP address of the node.
 
     Returns:
         logging.Logger: A logger for the specified node.
     """
-    node_log_file = f"logs/{node}.log"
-    node_logger = logging.getLogger(node)
-    node_logger.setLevel(logging.INFO)
-    handler = logging.FileHandler(node_log_file, mode='a')
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    node_logger.addHandler(handler)
-    return node_logger 
\ No newline at end of file
+    get_log_writer()
+    return logging.getLogger(f"{NODE_LOGGER}.{node}")
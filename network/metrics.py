@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable
+from network.logger import LOG_DIR, log_queue_depth
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = 9464
+LAG_INTERVAL = 0.25  # Seconds between event loop lag samples
+PROFILE_INTERVAL = 0.005  # Seconds between profiler samples
+
+# Bucket bounds in seconds, roughly three per decade from 100 µs to 60 s
+TIME_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+DEPTH_BUCKETS = (0, 10, 100, 1000, 10_000, 100_000)
+
+
+class Histogram:
+    """Prometheus-style histogram with fixed buckets.
+
+    Observing a value is a binary search and three additions, cheap enough
+    to leave on for every probe.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = TIME_BUCKETS):
+        """Initialize the histogram.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): One-line description.
+            buckets (tuple[float, ...]): Upper bucket bounds in ascending order.
+        """
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record a value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> list[str]:
+        """Return the metric in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum:.6f}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback when the metrics are scraped."""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        """Initialize the gauge.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): One-line description.
+            read (Callable[[], float]): Returns the current value.
+        """
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self) -> list[str]:
+        """Return the metric in the Prometheus text format."""
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value:g}"]
+
+
+PROBE_DURATION = Histogram("netmon_probe_duration_seconds", "Time from sending a probe to its result.")
+SCHEDULING_DELAY = Histogram("netmon_scheduling_delay_seconds", "How late probes start compared to their due time.")
+LOOP_LAG = Histogram("netmon_event_loop_lag_seconds", "How late a periodic event loop callback runs.")
+LOG_QUEUE_DEPTH = Histogram("netmon_log_queue_depth", "Records waiting for the log writer thread.", DEPTH_BUCKETS)
+MAP_REDRAW = Histogram("netmon_map_redraw_seconds", "Time spent redrawing the network map.")
+RESOLVE_DURATION = Histogram("netmon_resolve_duration_seconds", "Time taken by hostname lookups that missed the cache.")
+
+METRICS: list[Histogram | Gauge] = [PROBE_DURATION, SCHEDULING_DELAY, LOOP_LAG, LOG_QUEUE_DEPTH, MAP_REDRAW, RESOLVE_DURATION]
+
+
+def register(metric: Histogram | Gauge):
+    """Add a metric to the exposition, replacing one of the same name."""
+    METRICS[:] = [m for m in METRICS if m.name != metric.name] + [metric]
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+async def sample_loop(interval: float = LAG_INTERVAL):
+    """Sample event loop lag and log queue depth until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        before = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - before - interval))
+        depth = log_queue_depth()
+        if depth is not None:
+            LOG_QUEUE_DEPTH.observe(depth)
+
+
+async def _serve_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Answer one HTTP request, ``GET /metrics`` being the only page."""
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5.0)
+        while (await asyncio.wait_for(reader.readline(), 5.0)).strip():
+            pass  # Headers are not needed
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"Not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, OSError, UnicodeDecodeError):
+        pass
+    finally:
+        writer.close()
+
+
+class MetricsServer:
+    """Serves the metrics over HTTP and samples the event loop it runs on."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = METRICS_PORT):
+        """Initialize the server.
+
+        Args:
+            host (str): Address to listen on, local only by default.
+            port (int): Port to listen on.
+        """
+        self.host = host
+        self.port = port
+        self._server = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def _serve(self):
+        """Start listening."""
+        try:
+            self._server = await asyncio.start_server(_serve_request, self.host, self.port)
+        except OSError as e:
+            logger.error(f"Cannot serve metrics on {self.host}:{self.port}: {e}")
+            return
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def start(self):
+        """Start serving and sampling on the running loop."""
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._serve()), loop.create_task(sample_loop())]
+
+    def stop(self):
+        """Stop serving and sampling."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling the main thread's stack from a background thread.
+
+    Costs nothing while stopped. While running, a thread wakes every few
+    milliseconds and records the main thread's call stack, and stopping
+    writes the counts as folded stacks, the input format of flame graph tools.
+    """
+
+    def __init__(self, log_dir: str = LOG_DIR, interval: float = PROFILE_INTERVAL):
+        """Initialize the profiler.
+
+        Args:
+            log_dir (str): Directory the profiles are written to.
+            interval (float): Seconds between samples.
+        """
+        self.log_dir = log_dir
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """Return whether the profiler is sampling."""
+        return self._thread is not None
+
+    def _run(self, thread_id: int):
+        """Sample a thread's stack until stopped."""
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """Start sampling the main thread."""
+        if self.running:
+            return
+        self.samples.clear()
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(threading.main_thread().ident,), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        logger.info("Sampling profiler started")
+
+    def stop(self) -> str | None:
+        """Stop sampling and write the profile.
+
+        Returns:
+            str | None: The path of the folded stacks file, None if nothing was sampled.
+        """
+        if not self.running:
+            return None
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if not self.samples:
+            return None
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = os.path.join(self.log_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w", encoding="utf-8") as profile:
+            for stack, count in self.samples.most_common():
+                profile.write(f"{stack} {count}\n")
+        logger.info(f"Sampling profiler stopped, {sum(self.samples.values())} samples written to {path}")
+        return path
+
+    def toggle(self) -> str | None:
+        """Start the profiler if it is stopped, otherwise stop it and return the profile's path."""
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+
+
+PROFILER = SamplingProfiler()
+register(Gauge("netmon_profiler_running", "Whether the sampling profiler is running.", lambda: PROFILER.running))
+
+
+def install_profiler_signal():
+    """Toggle the profiler on SIGUSR1, where the platform has it."""
+    import signal
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: PROFILER.toggle())
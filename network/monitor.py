@@ -0,0 +1,482 @@
+import math
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
+from network.checker import probe, probe_node
+from network.logger import setup_node_logging
+from network.metrics import PROBE_DURATION
+from network.neighbours import NUD_REACHABLE, NeighbourWatcher
+from network.node import NodeData
+from network.nodestore import ICMP, NodeStore, adopt
+from network.reachability import Reachability
+from network.registry import NodeDiff, diff_nodes
+from network.resolver import ResolutionError, get_resolver
+from network.scheduler import ProbeScheduler
+from network.status import StatusStore, CHECKING, ONLINE, OFFLINE, UNREACHABLE, UNRESOLVED
+
+if TYPE_CHECKING:
+    from network.snapshot import Snapshot
+
+
+class Monitor:
+    """Probe engine shared by the GUI and the headless front ends.
+
+    Owns the node list, the status store and the probe scheduler. Front ends
+    get status transitions through the ``on_transition`` callback and read
+    everything else from ``status_store``.
+
+    When the node file marks root nodes, nodes cut off from every root by a
+    down node are marked unreachable and probed at the scheduler's suppressed
+    rate until a path opens again. Front ends hear about those changes once
+    per cause through ``on_reachability`` instead of once per node.
+
+    With ``workers`` set, probing is sharded across that many worker
+    processes and their results are recorded as they show up in shared memory.
+    With ``listen`` set, nothing is probed locally; results streamed by remote
+    probe agents are recorded instead.
+
+    With ``view`` set, nothing is probed either; the states another monitor
+    publishes on its status feed are shown instead.
+
+    With ``passive`` set, the kernel neighbour table is read every few seconds
+    and ICMP nodes it shows as REACHABLE count as online without a probe;
+    their active probes are stretched, and a lost one does not mark them
+    offline, until the entry goes stale or fails.
+    """
+
+    def __init__(
+        self,
+        nodes: list[NodeData],
+        on_transition: Callable[[NodeData, bool], None] | None = None,
+        history=None,
+        on_reachability: Callable[[NodeData | None, list[NodeData], bool], None] | None = None,
+        workers: int = 0,
+        listen: tuple[str, int] | None = None,
+        probe: Callable[[str], Awaitable[float | None]] = probe,
+        scheduler_options: dict | None = None,
+        passive: bool = False,
+        view: tuple[str, int] | None = None,
+    ):
+        """Initialize the monitor.
+
+        Args:
+            nodes (list[NodeData]): List of nodes to monitor.
+            on_transition (Callable[[NodeData, bool], None] | None): Called with the node and its
+                new online state whenever a node changes status.
+            history (HistoryStore | None): Optional time-series store fed with every probe result.
+            on_reachability (Callable[[NodeData | None, list[NodeData], bool], None] | None): Called
+                with the node whose status change caused it (None after a reload), the affected
+                nodes and whether they became reachable.
+            workers (int): Number of probe worker processes, 0 probes on the running loop.
+            listen (tuple[str, int] | None): Host and port to collect agent results on, instead of probing.
+            probe (Callable[[str], Awaitable[float | None]]): ICMP probe used on the running loop, returns
+                the RTT in seconds or None. Nodes with a service check and worker processes always probe
+                for real.
+            scheduler_options (dict | None): Keyword arguments for the probe scheduler, e.g. ``interval``.
+            passive (bool): Confirm directly attached nodes from the neighbour table, ignored with ``listen``.
+            view (tuple[str, int] | None): Host and port of another monitor's status feed to show, instead of probing.
+        """
+        self.probe = probe
+        self.scheduler_options = scheduler_options or {}
+        self.workers = workers
+        self.listen = listen
+        self.on_transition = on_transition
+        self.on_reachability = on_reachability
+        self.history = history
+        self.passive = passive
+        self.view = view
+        self.scheduler = None
+        self.neighbours = None
+        self.status_store = StatusStore([])
+        self.reset(nodes)
+
+    def reset(self, nodes: list[NodeData]):
+        """Replace the monitored nodes, dropping their previous state.
+
+        Nodes that are not views of one ``NodeStore`` are copied into a new
+        store, so ``nodes`` always holds views.
+
+        Args:
+            nodes (list[NodeData]): List of nodes to monitor.
+        """
+        self.nodes = sorted(adopt(nodes), key=lambda node: node.ip)
+        self.topology = self.nodes[0].store if self.nodes else NodeStore()
+        self.node_map = {node.ip: node for node in self.nodes}
+        self.status_store.reset([node.ip for node in self.nodes])
+        if self.history is not None:
+            self.history.reset(len(self.nodes))
+        self.node_loggers = {node.ip: setup_node_logging(node.ip) for node in self.nodes}
+        self.reachability = Reachability(self.topology)
+        self._restored: set[str] = set()  # Reachable again, their next "online" is expected
+        self._unresolved: dict[str, int] = {}  # Status of each unresolved node before its name stopped resolving
+        self._schedule: dict[str, tuple[float, float, int]] = {}  # Restored next-due time, interval and failures
+        self._confirmed: set[str] = set()  # Nodes the neighbour table shows as reachable
+
+    def reload(self, nodes: list[NodeData]) -> NodeDiff:
+        """Reconcile the monitored nodes with a freshly read node file.
+
+        Only the difference is applied: unchanged nodes keep their node
+        object, status, statistics, history and place in the probe schedule.
+
+        Args:
+            nodes (list[NodeData]): The nodes read from the node file.
+
+        Returns:
+            NodeDiff: The applied diff, falsy if nothing changed.
+        """
+        diff = diff_nodes(self.nodes, nodes)
+        if diff:
+            self.apply(diff)
+        return diff
+
+    def apply(self, diff: NodeDiff):
+        """Apply a node diff to the running nodes, the stores and the scheduler.
+
+        Surviving nodes keep their rows in order, added nodes get new rows
+        after them.
+
+        Args:
+            diff (NodeDiff): The diff to apply.
+        """
+        topology = self.topology
+        removed = set(diff.removed)
+        for ip in diff.removed:
+            topology.remove(self.node_map.pop(ip).id)
+            self.node_loggers.pop(ip, None)
+            self._restored.discard(ip)
+            self._unresolved.pop(ip, None)
+            self._confirmed.discard(ip)
+            get_resolver().forget(ip)
+            if self.scheduler is not None:
+                self.scheduler.remove(ip)
+
+        for ip, device_type in diff.retyped.items():
+            node = self.node_map[ip]
+            node.device_type = device_type
+            if self.scheduler is not None:
+                self.scheduler.retype(node)
+
+        for ip, check in diff.rechecked.items():
+            node = self.node_map[ip]
+            node.check = check
+            if self.scheduler is not None:
+                self.scheduler.retype(node)
+
+        for ip, is_root in diff.rooted.items():
+            self.node_map[ip].is_root = is_root
+
+        # Added nodes are copied into the running store, connections come from the edge diff
+        added = [topology.view(topology.add(node.ip, node.device_type)) for node in diff.added]
+        for node, source in zip(added, diff.added):
+            node.is_root = source.is_root
+            node.check = source.check
+            self.node_map[node.ip] = node
+            self.node_loggers[node.ip] = setup_node_logging(node.ip)
+
+        for edges, wire in ((diff.removed_edges, topology.disconnect), (diff.added_edges, topology.connect)):
+            for a, b in edges:
+                if a in self.node_map and b in self.node_map:
+                    wire(self.node_map[a].id, self.node_map[b].id)
+
+        self.nodes = [node for node in self.nodes if node.ip not in removed] + added
+        keep = self.status_store.apply(removed, [node.ip for node in added])
+        if self.history is not None:
+            self.history.remap(keep, len(added))
+
+        if self.scheduler is not None:
+            # New nodes get a random first offset, so a large addition does not fire at once
+            for node in added:
+                self.scheduler.add(node)
+
+        self._update_reachability(None, *self.reachability.rebuild())
+
+    def _update_reachability(self, cause: NodeData | None, lost: list[int], regained: list[int]):
+        """Mark nodes that were cut off or reconnected and adjust their probe rate.
+
+        Args:
+            cause (NodeData | None): The node whose status change caused this, None after a reload.
+            lost (list[int]): IDs of the nodes that became unreachable.
+            regained (list[int]): IDs of the nodes that became reachable again.
+        """
+        for node_ids, reachable in ((lost, False), (regained, True)):
+            if not node_ids:
+                continue
+            nodes = [self.topology.view(node_id) for node_id in node_ids]
+            for node in nodes:
+                if reachable:
+                    self.status_store.mark(node.ip, CHECKING)
+                    self._restored.add(node.ip)
+                else:
+                    self.status_store.mark(node.ip, UNREACHABLE)
+                    node.is_online = False
+                if self.scheduler is not None:
+                    (self.scheduler.resume if reachable else self.scheduler.suppress)(node.ip)
+            if self.on_reachability is not None:
+                self.on_reachability(cause, nodes, reachable)
+
+    def start(self):
+        """Start the probe scheduler for every node."""
+        if self.view:
+            from network.feed import FeedClient
+            self.scheduler = FeedClient(self.record_remote, *self.view, on_disconnect=self.mark_checking)
+        elif self.listen:
+            from network.collector import Collector
+            self.scheduler = Collector(self.record, *self.listen, on_disconnect=self.mark_checking)
+        elif self.workers:
+            from network.sharding import ShardedScheduler
+            self.scheduler = ShardedScheduler(self.record, self.workers, **self.scheduler_options)
+        else:
+            self.scheduler = ProbeScheduler(self.check_node, **self.scheduler_options)
+        now = time.time()
+        for node in self.nodes:
+            due, interval, failures = self._schedule.pop(node.ip, (math.nan, math.nan, 0))
+            if math.isnan(due) or not interval > 0:
+                self.scheduler.add(node)
+                continue
+            # Overdue nodes keep their phase within the interval, so they do not all fire at once
+            self.scheduler.add(node, delay=(due - now) % interval)
+            self.scheduler.set_failures(node.ip, failures)
+        self._schedule.clear()
+        for node_id in self.reachability.unreachable():
+            self.scheduler.suppress(self.topology.ip(node_id))
+        self.scheduler.start()
+        if self.passive and not (self.listen or self.view):
+            self.neighbours = NeighbourWatcher(self.record_neighbours)
+            self.neighbours.start()
+
+    def restore(self, snapshot: "Snapshot") -> int:
+        """Show the last-known state of the nodes in a snapshot until they are probed again.
+
+        Statuses and latency statistics are restored and marked stale, nodes
+        behind a node that was offline are unreachable again, and ``start``
+        schedules each node's first probe at its saved next-due time. Call
+        before ``start``.
+
+        Args:
+            snapshot (Snapshot): The snapshot, still open.
+
+        Returns:
+            int: The number of nodes restored.
+        """
+        restored = 0
+        lost = []
+        status, checked = snapshot.column('status'), snapshot.column('checked')
+        due, interval, failures = snapshot.column('due'), snapshot.column('interval'), snapshot.column('failures')
+        for ip in self.status_store.ips:
+            row = snapshot.rows.get(ip)
+            if row is None:
+                continue
+            if status[row] in (ONLINE, OFFLINE, UNRESOLVED):
+                node = self.node_map[ip]
+                self.status_store.restore(ip, status[row], checked[row], snapshot.stats(row))
+                node.is_online = status[row] == ONLINE
+                if status[row] == OFFLINE:
+                    lost += self.reachability.set_down(node.id, True)[0]
+            self._schedule[ip] = (due[row], interval[row], failures[row])
+            restored += 1
+        for node_id in lost:
+            self.status_store.restore(self.topology.ip(node_id), UNREACHABLE)
+            self.topology.view(node_id).is_online = False
+        return restored
+
+    def save_state(self, path: str, positions: dict[str, tuple[float, float]] | None = None):
+        """Write the current state to a snapshot file.
+
+        Args:
+            path (str): The snapshot file.
+            positions (dict[str, tuple[float, float]] | None): Map layout positions to keep with it.
+        """
+        from network.snapshot import save_snapshot  # Needs numpy, which headless runs do not import otherwise
+
+        now = time.time()
+        schedule = dict(self._schedule)
+        if self.scheduler is not None:
+            schedule.update(
+                (ip, (now + wait, interval, failures)) for ip, (wait, interval, failures) in self.scheduler.due_in().items()
+            )
+        store = self.status_store
+        save_snapshot(path, store.ips, list(store.status), list(store.checked), store.stats, schedule, positions)
+
+    def stop(self):
+        """Stop the probe scheduler."""
+        if self.neighbours is not None:
+            self.neighbours.stop()
+            self.neighbours = None
+        self._confirmed.clear()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+
+    async def check_node(self, node: NodeData) -> bool:
+        """Check the status of a node and record the result.
+
+        Args:
+            node (NodeData): The node to check.
+
+        Returns:
+            bool: True if the node is online, False otherwise.
+        """
+        started = time.perf_counter()
+        try:
+            rtt = await probe_node(node, self.probe)
+        except ResolutionError:
+            return self.record(node, None, resolved=False)
+        PROBE_DURATION.observe(time.perf_counter() - started)
+        return self.record(node, rtt)
+
+    def record_neighbours(self, table: dict[str, int]):
+        """Record the nodes the kernel neighbour table confirms are alive.
+
+        Args:
+            table (dict[str, int]): The NUD_* state of each neighbour address.
+        """
+        names = get_resolver().addresses()
+        confirmed = set()
+        for address, state in table.items():
+            if state != NUD_REACHABLE:
+                continue
+            node = self.node_map.get(address) or self.node_map.get(names.get(address))
+            if node is not None and node.check == ICMP:
+                confirmed.add(node.ip)
+
+        checked = time.time()
+        for ip in self._confirmed - confirmed:
+            if ip in self.node_map:
+                self.scheduler.set_passive(ip, False)  # Stale or failed, active probes take over again
+        for ip in confirmed:
+            if ip not in self._confirmed:
+                self.scheduler.set_passive(ip, True)
+            self.record(self.node_map[ip], None, checked, passive=True)
+        self._confirmed = confirmed
+
+    def record(
+        self, node: NodeData, rtt: float | None, checked: float | None = None, resolved: bool = True, passive: bool = False
+    ) -> bool:
+        """Record the result of a probe.
+
+        Args:
+            node (NodeData): The probed node.
+            rtt (float | None): The round-trip time in seconds, None if the probe failed.
+            checked (float | None): Epoch time of the check, defaults to now.
+            resolved (bool): False if the node's hostname did not resolve and nothing was probed.
+            passive (bool): True if the node was seen alive in the neighbour table, which counts as
+                online but is no latency sample.
+
+        Returns:
+            bool: True if the node is online, False otherwise.
+        """
+        status = rtt is not None or passive
+        if node.ip not in self.node_map:
+            return status  # Node was removed while the probe was in flight
+        if checked is None:
+            checked = time.time()
+        if not resolved:
+            return self._record_unresolved(node, checked)
+        if not status and node.ip in self._confirmed:
+            return True  # Seen answering by the kernel within seconds, a lost probe does not make it offline
+        was_online = node.is_online
+        node.is_online = status
+
+        # Log status to node-specific log, passive confirmations only when they change it
+        if not passive or was_online != status:
+            self.node_loggers[node.ip].info(f"Node {node.ip} is {'Online' if status else 'Offline'}")
+
+        if self.history is not None and not passive:
+            self.history.append(self.status_store.rows[node.ip], checked, status, rtt)
+        if not status and not self.reachability.is_reachable(node.id):
+            return status  # Still cut off, a failure says nothing new
+
+        # Mark the row dirty, views pick it up on their next frame
+        previous = self.status_store.update(node.ip, status, checked, rtt, sample=not passive)
+        if previous == UNRESOLVED:
+            previous = self._unresolved.pop(node.ip, CHECKING)
+        if previous == UNREACHABLE and self.scheduler is not None:
+            self.scheduler.resume(node.ip)  # Answers despite the down parent
+
+        expected = status and node.ip in self._restored
+        self._restored.discard(node.ip)
+        if previous != (ONLINE if status else OFFLINE) and not expected and self.on_transition is not None:
+            self.on_transition(node, status)
+
+        self._update_reachability(node, *self.reachability.set_down(node.id, not status))
+        return status
+
+    def record_remote(
+        self, node: NodeData, status: int, checked: float, stats, stale: bool = False, announce: bool = True
+    ):
+        """Record a node's state as published by another monitor's status feed.
+
+        The state is shown as published, reachability included, since the
+        publishing monitor already worked it out. Changes between online and
+        offline are reported as transitions, except a node coming back from
+        "Checking...", which the publisher does not report after a path
+        opens again either.
+
+        Args:
+            node (NodeData): The node.
+            status (int): Its status code.
+            checked (float): Epoch time of its last check, 0 for never.
+            stats (StatsSummary): Its published latency statistics.
+            stale (bool): Whether the publisher only has its last-known state.
+            announce (bool): Whether a change is reported, False for the snapshot a feed starts with.
+        """
+        if node.ip not in self.node_map:
+            return
+        if stale:
+            previous = self.status_store.status[self.status_store.rows[node.ip]]
+            self.status_store.restore(node.ip, status, checked, stats)
+        else:
+            previous = self.status_store.mark(node.ip, status, checked or None, stats)
+        node.is_online = status == ONLINE
+        if not announce or status == previous or status not in (ONLINE, OFFLINE) or self.on_transition is None:
+            return
+        if status == ONLINE and previous == CHECKING:
+            return
+        self.on_transition(node, status == ONLINE)
+
+    def _record_unresolved(self, node: NodeData, checked: float) -> bool:
+        """Record that a node's hostname did not resolve.
+
+        Nothing is known about the host itself, so its online state,
+        statistics, history and reachability are left alone and no transition
+        is reported. The next probe result is compared with the status from
+        before the name stopped resolving.
+        """
+        self.node_loggers[node.ip].warning(f"Node {node.ip} could not be resolved")
+        if self.reachability.is_reachable(node.id):
+            previous = self.status_store.mark(node.ip, UNRESOLVED, checked)
+            if previous != UNRESOLVED:
+                self._unresolved[node.ip] = previous
+        return False
+
+    def mark_checking(self, ips: list[str]):
+        """Mark nodes whose status is no longer being reported, e.g. when their agent disconnects.
+
+        Args:
+            ips (list[str]): The addresses of the nodes.
+        """
+        for ip in ips:
+            if ip in self.node_map and self.reachability.is_reachable(self.node_map[ip].id):
+                self.status_store.mark(ip, CHECKING)
+
+    def node_health(self, node: NodeData) -> str:
+        """Return "online", "degraded", "offline" or "unreachable" for a node.
+
+        Args:
+            node (NodeData): The node.
+
+        Returns:
+            str: The node's health, "unreachable" for a node that is not monitored (any more).
+        """
+        row = self.status_store.rows.get(node.ip)
+        if row is None:
+            return "unreachable"
+        status = self.status_store.status[row]
+        if status == UNRESOLVED:
+            return "unreachable"  # Shown like a node that cannot be probed, its host may well be up
+        if status == UNREACHABLE:
+            return "unreachable"
+        if not self.reachability.is_reachable(node.id) and not node.is_online:
+            return "unreachable"
+        if not node.is_online:
+            return "offline"
+        return "degraded" if self.status_store.is_degraded(node.ip) else "online"
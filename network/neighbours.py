@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import socket
+import struct
+from typing import Callable, Iterator
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+PASSIVE_INTERVAL = 5.0  # Seconds between neighbour table reads
+DUMP_TIMEOUT = 2.0  # Seconds to wait for each part of the kernel's answer
+
+# Neighbour states, see NUD_* in linux/neighbour.h
+NUD_INCOMPLETE = 0x01
+NUD_REACHABLE = 0x02
+NUD_STALE = 0x04
+NUD_DELAY = 0x08
+NUD_PROBE = 0x10
+NUD_FAILED = 0x20
+NUD_NOARP = 0x40
+NUD_PERMANENT = 0x80
+
+# rtnetlink message layout, see linux/netlink.h and linux/rtnetlink.h
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWNEIGH = 28
+RTM_GETNEIGH = 30
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+NDA_DST = 1
+
+NLMSGHDR = struct.Struct('=IHHII')  # Length, type, flags, sequence, port
+NDMSG = struct.Struct('=BBHiHBB')  # Family, padding, interface, state, flags, type
+RTATTR = struct.Struct('=HH')  # Length, type
+ERRNO = struct.Struct('=i')
+
+
+def _align(size: int) -> int:
+    """Round a netlink length up to 4 bytes."""
+    return (size + 3) & ~3
+
+
+def iter_messages(data: bytes) -> Iterator[tuple[int, bytes]]:
+    """Yield the type and payload of each netlink message in a buffer.
+
+    Args:
+        data (bytes): One or more received netlink datagrams, concatenated.
+
+    Raises:
+        OSError: If the kernel answered with an error.
+    """
+    offset = 0
+    while offset + NLMSGHDR.size <= len(data):
+        length, kind, _, _, _ = NLMSGHDR.unpack_from(data, offset)
+        if length < NLMSGHDR.size or offset + length > len(data):
+            break  # Truncated
+        payload = data[offset + NLMSGHDR.size:offset + length]
+        if kind == NLMSG_ERROR:
+            errno = -ERRNO.unpack_from(payload)[0]
+            if errno:
+                raise OSError(errno, f"Neighbour dump failed: {errno}")
+        yield kind, payload
+        offset += _align(length)
+
+
+def parse_neighbours(data: bytes) -> dict[str, int]:
+    """Parse an RTM_GETNEIGH dump into neighbour states.
+
+    Pure, so captured dumps (``dump_neighbours``) can be replayed.
+
+    Args:
+        data (bytes): The raw dump.
+
+    Returns:
+        dict[str, int]: The NUD_* state of each neighbour address, IPv4 and IPv6.
+    """
+    neighbours = {}
+    for kind, payload in iter_messages(data):
+        if kind != RTM_NEWNEIGH or len(payload) < NDMSG.size:
+            continue
+        family, _, _, _, state, _, _ = NDMSG.unpack_from(payload)
+        offset = NDMSG.size
+        while offset + RTATTR.size <= len(payload):
+            length, attribute = RTATTR.unpack_from(payload, offset)
+            if length < RTATTR.size:
+                break
+            if attribute == NDA_DST:
+                address = payload[offset + RTATTR.size:offset + length]
+                try:
+                    neighbours[socket.inet_ntop(family, address)] = state
+                except (OSError, ValueError):
+                    pass  # Not an IP neighbour
+                break
+            offset += _align(length)
+    return neighbours
+
+
+def dump_neighbours() -> bytes:
+    """Return the raw rtnetlink dump of the kernel neighbour table.
+
+    The whole table of every interface comes back from one request, however
+    many hosts are in it.
+
+    Raises:
+        TimeoutError: If the kernel stops answering before the dump is complete.
+        OSError: If netlink is not available, e.g. off Linux.
+    """
+    if not hasattr(socket, 'AF_NETLINK'):
+        raise OSError("The neighbour table needs Linux netlink")
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.settimeout(DUMP_TIMEOUT)
+        request = NDMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0, 0, 0)
+        sock.send(NLMSGHDR.pack(NLMSGHDR.size + len(request), RTM_GETNEIGH, NLM_F_REQUEST | NLM_F_DUMP, 1, 0) + request)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            chunks.append(chunk)
+            if not chunk or any(kind == NLMSG_DONE for kind, _ in iter_messages(chunk)):
+                return b''.join(chunks)
+
+
+def read_neighbours() -> dict[str, int]:
+    """Return the NUD_* state of each neighbour in the kernel table.
+
+    Raises:
+        OSError: If the table cannot be read.
+    """
+    return parse_neighbours(dump_neighbours())
+
+
+class NeighbourWatcher:
+    """Reads the kernel neighbour table periodically and reports it.
+
+    ``/proc/net/arp`` only tells complete entries from incomplete ones, so
+    the table is dumped over rtnetlink, which also carries each entry's NUD
+    state: a REACHABLE entry means the kernel saw the host answer within the
+    last ``base_reachable_time`` (30 s by default).
+    """
+
+    def __init__(
+        self,
+        on_table: Callable[[dict[str, int]], None],
+        interval: float = PASSIVE_INTERVAL,
+        read: Callable[[], dict[str, int]] = read_neighbours,
+    ):
+        """Initialize the watcher.
+
+        Args:
+            on_table (Callable[[dict[str, int]], None]): Called with the neighbour states after each read.
+            interval (float): Seconds between reads.
+            read (Callable[[], dict[str, int]]): Reads the table, e.g. replaying a captured fixture.
+        """
+        self.on_table = on_table
+        self.interval = interval
+        self.read = read
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        """Read the table off the loop every interval, stopping for good if it cannot be read."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                table = await loop.run_in_executor(None, self.read)
+            except TimeoutError:
+                logger.warning("Timed out reading the neighbour table, trying again next time")
+            except OSError as e:
+                logger.warning(f"Passive liveness disabled, cannot read the neighbour table: {e}")
+                return
+            else:
+                self.on_table(table)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start reading on the running loop."""
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stop reading."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -8,6 +8,8 @@ class NodeData:
     device_type: str = "PC"
     connections: Set['NodeData'] = field(default_factory=set)
     is_online: bool = False
+    is_root: bool = False  # Vantage point for dependency-aware probing
+    check: str = "icmp"  # How the node is probed, see network.services.parse_check
 
     def __hash__(self):
         """Make NodeData hashable by using the IP address."""
@@ -0,0 +1,403 @@
+import socket
+from array import array
+from typing import Iterable, Iterator
+
+IPV6_FLAG = 1 << 128  # Set in the key of IPv6 addresses
+V4_MAPPED = bytes(10) + b"\xff\xff"  # IPv4 addresses are packed as IPv4-mapped IPv6
+
+# Address family codes
+HOSTNAME = 0
+IPV4 = 4
+IPV6 = 6
+
+ICMP = "icmp"  # Check of nodes without a service check
+
+
+def pack_address(text: str) -> int | None:
+    """Return the packed integer key of an address string, or None if it is not one.
+
+    Uses ``inet_pton``, which is strict and far cheaper than building
+    ``ipaddress`` objects for every line of a large node file.
+    """
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, text), 'big')
+    except OSError:
+        pass
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, text), 'big') | IPV6_FLAG
+    except OSError:
+        return None
+
+
+def format_key(key: int) -> str:
+    """Return the canonical string form of a packed address key."""
+    if key & IPV6_FLAG:
+        return socket.inet_ntop(socket.AF_INET6, (key & ~IPV6_FLAG).to_bytes(16, 'big'))
+    return socket.inet_ntop(socket.AF_INET, key.to_bytes(4, 'big'))
+
+
+def _pair(a: int, b: int) -> int:
+    """Pack an unordered pair of node IDs into one integer."""
+    return (a << 32) | b if a < b else (b << 32) | a
+
+
+class NodeStore:
+    """Columnar store of nodes and their connections.
+
+    Every node has a dense integer ID indexing flat arrays: its address packed
+    into 16 bytes, its address family, an interned device-type code and an
+    online flag. Hostnames, which cannot be packed, and the service checks of
+    nodes not probed with ICMP live in side tables.
+    Connections are kept in CSR form, an offsets array into one flat
+    neighbour array, which is rebuilt lazily after edits. IDs of removed nodes
+    are not reused, and their packed address stays readable for views still
+    held elsewhere. Their side table entries are dropped: the check at
+    removal, the hostname when the CSR is next rebuilt, after which a
+    removed hostname node reads as an empty name.
+    """
+
+    def __init__(self):
+        """Initialize an empty store."""
+        self.addresses = bytearray()
+        self.family = array('B')
+        self.type = array('B')
+        self.online = array('b')
+        self.hostnames: dict[int, str] = {}
+        self.checks: dict[int, str] = {}  # Service checks, see network.services
+        self.type_names: list[str] = []
+        self.type_codes: dict[str, int] = {}
+        self.index: dict[int | str, int] = {}  # Packed address or hostname -> ID, in insertion order
+        self.removed: set[int] = set()  # Removed since the last CSR rebuild
+        self.roots: set[int] = set()  # Vantage points for dependency-aware probing
+        self.offsets = array('I', [0])
+        self.neighbours = array('I')
+        self._connect: set[int] = set()
+        self._disconnect: set[int] = set()
+        self._stale = False
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable) -> 'NodeStore':
+        """Build a store from NodeData-like objects, copying their connections."""
+        store = cls()
+        nodes = list(nodes)
+        for node in nodes:
+            store.add(node.ip, node.device_type)
+            node_id = store.find(node.ip)
+            store.online[node_id] = node.is_online
+            store.set_check(node_id, getattr(node, "check", ICMP))
+            if getattr(node, "is_root", False):
+                store.roots.add(node_id)
+        for node in nodes:
+            for other in node.connections:
+                store.connect(store.find(node.ip), store.find(other.ip))
+        return store
+
+    def __len__(self) -> int:
+        """Return the number of nodes."""
+        return len(self.index)
+
+    def __contains__(self, ip: str) -> bool:
+        """Return whether a node with this address or hostname exists."""
+        return self.find(ip) is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the node and adjacency arrays in bytes."""
+        arrays = (self.family, self.type, self.online, self.offsets, self.neighbours)
+        return len(self.addresses) + sum(a.itemsize * len(a) for a in arrays)
+
+    @staticmethod
+    def key(ip: str) -> int | str:
+        """Return the index key of an address or hostname."""
+        key = pack_address(ip)
+        return ip if key is None else key
+
+    def find(self, ip: str) -> int | None:
+        """Return the ID of a node, or None if it is not in the store."""
+        return self.index.get(self.key(ip))
+
+    def ids(self) -> Iterator[int]:
+        """Iterate over the IDs of the nodes in insertion order."""
+        return iter(self.index.values())
+
+    def type_code(self, device_type: str) -> int:
+        """Return the interned code of a device type."""
+        code = self.type_codes.get(device_type)
+        if code is None:
+            code = self.type_codes[device_type] = len(self.type_names)
+            self.type_names.append(device_type)
+        return code
+
+    def add(self, ip: str | None, device_type: str, key: int | str | None = None) -> int:
+        """Add a node, or retype it if it already exists.
+
+        Args:
+            ip (str | None): The address or hostname of the node, only needed without a key.
+            device_type (str): The device type.
+            key (int | str | None): The index key of the node, if already known.
+
+        Returns:
+            int: The node's ID.
+        """
+        if key is None:
+            key = self.key(ip)
+        node_id = self.index.get(key)
+        if node_id is not None:
+            self.type[node_id] = self.type_code(device_type)
+            return node_id
+
+        node_id = len(self.family)
+        self.index[key] = node_id
+        if isinstance(key, str):
+            self.family.append(HOSTNAME)
+            self.addresses += bytes(16)
+            self.hostnames[node_id] = key
+        elif key & IPV6_FLAG:
+            self.family.append(IPV6)
+            self.addresses += (key & ~IPV6_FLAG).to_bytes(16, 'big')
+        else:
+            self.family.append(IPV4)
+            self.addresses += V4_MAPPED + key.to_bytes(4, 'big')
+        self.type.append(self.type_code(device_type))
+        self.online.append(False)
+        self._stale = True  # The offsets array needs an entry for the new node
+        return node_id
+
+    def remove(self, node_id: int):
+        """Remove a node and its connections."""
+        del self.index[self.key(self.ip(node_id))]
+        self.removed.add(node_id)
+        self.roots.discard(node_id)
+        self.checks.pop(node_id, None)
+        self._stale = True
+
+    def ip(self, node_id: int) -> str:
+        """Return the address or hostname of a node."""
+        family = self.family[node_id]
+        offset = node_id * 16
+        if family == IPV4:
+            return socket.inet_ntop(socket.AF_INET, self.addresses[offset + 12:offset + 16])
+        if family == IPV6:
+            return socket.inet_ntop(socket.AF_INET6, self.addresses[offset:offset + 16])
+        return self.hostnames.get(node_id, "")  # Empty once a removed node's hostname was dropped
+
+    def device_type(self, node_id: int) -> str:
+        """Return the device type of a node."""
+        return self.type_names[self.type[node_id]]
+
+    def check(self, node_id: int) -> str:
+        """Return the check a node is probed with."""
+        return self.checks.get(node_id, ICMP)
+
+    def set_check(self, node_id: int, check: str):
+        """Set the check a node is probed with."""
+        if check == ICMP:
+            self.checks.pop(node_id, None)
+        else:
+            self.checks[node_id] = check
+
+    def connect(self, a: int, b: int):
+        """Connect two nodes."""
+        if a != b:
+            pair = _pair(a, b)
+            self._disconnect.discard(pair)
+            self._connect.add(pair)
+            self._stale = True
+
+    def disconnect(self, a: int, b: int):
+        """Disconnect two nodes."""
+        pair = _pair(a, b)
+        self._connect.discard(pair)
+        self._disconnect.add(pair)
+        self._stale = True
+
+    def _compact(self):
+        """Rebuild the CSR arrays with the pending edits applied, and drop removed nodes' side table entries."""
+        import numpy as np
+
+        count = len(self.family)
+        offsets = np.frombuffer(self.offsets, dtype=np.uint32).astype(np.int64)
+        targets = np.frombuffer(self.neighbours, dtype=np.uint32).astype(np.int64)
+        sources = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+        pairs = (sources << 32 | targets)[sources < targets]
+        if self._disconnect:
+            pairs = np.setdiff1d(pairs, np.fromiter(self._disconnect, dtype=np.int64, count=len(self._disconnect)))
+        if self._connect:
+            pairs = np.union1d(pairs, np.fromiter(self._connect, dtype=np.int64, count=len(self._connect)))
+        self._connect.clear()
+        self._disconnect.clear()
+
+        u, v = pairs >> 32, pairs & 0xFFFFFFFF
+        if self.removed:
+            gone = np.fromiter(self.removed, dtype=np.int64, count=len(self.removed))
+            keep = ~(np.isin(u, gone) | np.isin(v, gone))
+            u, v = u[keep], v[keep]
+            for node_id in self.removed:
+                self.hostnames.pop(node_id, None)
+            self.removed.clear()
+
+        # Both directions of every edge, grouped by source with ascending neighbours
+        sources, targets = np.concatenate([u, v]), np.concatenate([v, u])
+        order = np.lexsort((targets, sources))
+        degree = np.zeros(count + 1, dtype=np.uint32)
+        np.cumsum(np.bincount(sources, minlength=count), out=degree[1:])
+        self.offsets = array('I', degree.tobytes())
+        self.neighbours = array('I', targets[order].astype(np.uint32).tobytes())
+        self._stale = False
+
+    def neighbour_ids(self, node_id: int) -> array:
+        """Return the IDs of the nodes connected to a node."""
+        if self._stale:
+            self._compact()
+        return self.neighbours[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def degree(self, node_id: int) -> int:
+        """Return the number of connections of a node."""
+        if self._stale:
+            self._compact()
+        return self.offsets[node_id + 1] - self.offsets[node_id]
+
+    def edges(self) -> Iterator[tuple[int, int]]:
+        """Yield every connection once as a pair of node IDs."""
+        if self._stale:
+            self._compact()
+        offsets, neighbours = self.offsets, self.neighbours
+        for u in range(len(offsets) - 1):
+            for v in neighbours[offsets[u]:offsets[u + 1]]:
+                if u < v:
+                    yield u, v
+
+    def view(self, node_id: int) -> 'NodeView':
+        """Return a NodeData-compatible view of a node."""
+        return NodeView(self, node_id)
+
+    def nodes(self) -> list['NodeView']:
+        """Return views of every node in insertion order."""
+        return [NodeView(self, node_id) for node_id in self.index.values()]
+
+
+class NodeView:
+    """NodeData-compatible handle on one node of a NodeStore.
+
+    Views hold nothing but the store and the node ID, every attribute reads
+    through to the store's arrays. Two views of the same node compare equal.
+    """
+
+    __slots__ = ("store", "id")
+
+    def __init__(self, store: NodeStore, node_id: int):
+        """Initialize the view.
+
+        Args:
+            store (NodeStore): The store holding the node.
+            node_id (int): The node's ID.
+        """
+        self.store = store
+        self.id = node_id
+
+    @property
+    def ip(self) -> str:
+        """Return the address or hostname of the node."""
+        return self.store.ip(self.id)
+
+    @property
+    def device_type(self) -> str:
+        """Return the device type of the node."""
+        return self.store.device_type(self.id)
+
+    @device_type.setter
+    def device_type(self, device_type: str):
+        self.store.type[self.id] = self.store.type_code(device_type)
+
+    @property
+    def check(self) -> str:
+        """Return the check the node is probed with."""
+        return self.store.check(self.id)
+
+    @check.setter
+    def check(self, check: str):
+        self.store.set_check(self.id, check)
+
+    @property
+    def is_online(self) -> bool:
+        """Return whether the node was online at its last check."""
+        return bool(self.store.online[self.id])
+
+    @is_online.setter
+    def is_online(self, is_online: bool):
+        self.store.online[self.id] = is_online
+
+    @property
+    def is_root(self) -> bool:
+        """Return whether the node is a vantage point for dependency-aware probing."""
+        return self.id in self.store.roots
+
+    @is_root.setter
+    def is_root(self, is_root: bool):
+        if is_root:
+            self.store.roots.add(self.id)
+        else:
+            self.store.roots.discard(self.id)
+
+    @property
+    def connections(self) -> list['NodeView']:
+        """Return views of the connected nodes."""
+        store = self.store
+        return [NodeView(store, node_id) for node_id in store.neighbour_ids(self.id)]
+
+    def connect(self, other_node: 'NodeView'):
+        """Connect this node to another node of the same store."""
+        self.store.connect(self.id, other_node.id)
+
+    def disconnect(self, other_node: 'NodeView'):
+        """Disconnect this node from another node of the same store."""
+        self.store.disconnect(self.id, other_node.id)
+
+    def __eq__(self, other) -> bool:
+        """Return whether both views refer to the same node."""
+        return isinstance(other, NodeView) and other.store is self.store and other.id == self.id
+
+    def __hash__(self) -> int:
+        """Hash by node ID."""
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        """Return a NodeData-like representation."""
+        return f"NodeView(ip={self.ip!r}, device_type={self.device_type!r}, is_online={self.is_online})"
+
+
+def common_store(nodes: list) -> NodeStore | None:
+    """Return the store holding exactly these nodes, or None if they are not all views of one store."""
+    if not nodes or not isinstance(nodes[0], NodeView):
+        return None
+    store = nodes[0].store
+    if len(nodes) != len(store) or not all(isinstance(node, NodeView) and node.store is store for node in nodes):
+        return None
+    return store
+
+
+def adopt(nodes: list) -> list[NodeView]:
+    """Return the nodes as views of a single store, copying them into a new store if needed."""
+    if common_store(nodes) is not None:
+        return list(nodes)
+    return NodeStore.from_nodes(nodes).nodes()
+
+
+def iter_edges(nodes: list) -> Iterator[tuple[str, str]]:
+    """Yield every connection between the nodes once, as a pair of addresses.
+
+    Walks the CSR arrays directly when the nodes make up a whole store.
+    """
+    store = common_store(nodes)
+    if store is not None:
+        ip = store.ip
+        for u, v in store.edges():
+            yield ip(u), ip(v)
+        return
+    seen = set()
+    for node in nodes:
+        for other in node.connections:
+            pair = (node.ip, other.ip) if node.ip < other.ip else (other.ip, node.ip)
+            if pair not in seen:
+                seen.add(pair)
+                yield pair
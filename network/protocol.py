@@ -0,0 +1,152 @@
+import asyncio
+import json
+import struct
+
+# Wire format between probe agents and the collector. Every frame is a one
+# byte kind and a four byte big-endian payload length, followed by the payload.
+VERSION = 1
+DEFAULT_PORT = 7878
+HEADER = struct.Struct("!BI")
+MAX_FRAME = 16 * 2**20
+
+# Frame kinds
+HELLO = 1  # Agent -> collector, JSON {"agent": name, "version": VERSION}
+NODES = 2  # Agent -> collector, newline separated addresses, their position is the node index
+UPDATE = 3  # Agent -> collector, a batch of probe results, see encode_update
+
+BASE_TIME = struct.Struct("!d")
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a malformed frame."""
+
+
+def encode_varint(value: int, out: bytearray):
+    """Append an unsigned LEB128 varint to a buffer."""
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data: bytes, offset: int) -> tuple[int, int]:
+    """Read an unsigned LEB128 varint.
+
+    Returns:
+        tuple[int, int]: The value and the offset just past it.
+    """
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ProtocolError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def frame(kind: int, payload: bytes) -> bytes:
+    """Return a complete frame."""
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    """Read one frame from a stream.
+
+    Returns:
+        tuple[int, bytes]: The frame kind and its payload.
+
+    Raises:
+        asyncio.IncompleteReadError: If the peer closed the connection.
+        ProtocolError: If the frame is too large.
+    """
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_FRAME:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the limit")
+    return kind, await reader.readexactly(length)
+
+
+def encode_hello(name: str) -> bytes:
+    """Return a HELLO frame."""
+    return frame(HELLO, json.dumps({"agent": name, "version": VERSION}).encode())
+
+
+def decode_hello(payload: bytes) -> str:
+    """Return the agent name from a HELLO payload."""
+    try:
+        hello = json.loads(payload)
+    except ValueError:
+        raise ProtocolError("Malformed hello") from None
+    if hello.get("version") != VERSION:
+        raise ProtocolError(f"Unsupported protocol version {hello.get('version')}")
+    return str(hello.get("agent", ""))
+
+
+def encode_nodes(ips: list[str]) -> bytes:
+    """Return a NODES frame defining the node indexes used by later updates."""
+    return frame(NODES, "\n".join(ips).encode())
+
+
+def decode_nodes(payload: bytes) -> list[str]:
+    """Return the addresses from a NODES payload."""
+    return payload.decode().split("\n") if payload else []
+
+
+def encode_update(results: list[tuple[int, float | None, float]]) -> bytes:
+    """Return an UPDATE frame carrying a batch of probe results.
+
+    The payload is the batch's earliest check time as a double, a varint
+    count, then per result, sorted by node index: the index as a delta from
+    the previous one, the check time in milliseconds after the batch's
+    earliest, and the RTT in microseconds plus one, 0 meaning the probe
+    failed. A typical result takes five or six bytes.
+
+    Args:
+        results (list[tuple[int, float | None, float]]): ``(index, rtt, checked)`` per result.
+    """
+    results = sorted(results)
+    base = min((checked for _, _, checked in results), default=0.0)
+    out = bytearray(BASE_TIME.pack(base))
+    encode_varint(len(results), out)
+    previous = 0
+    for index, rtt, checked in results:
+        encode_varint(index - previous, out)
+        encode_varint(round((checked - base) * 1000), out)
+        encode_varint(0 if rtt is None else round(rtt * 1_000_000) + 1, out)
+        previous = index
+    return frame(UPDATE, bytes(out))
+
+
+def decode_update(payload: bytes) -> list[tuple[int, float | None, float]]:
+    """Return the ``(index, rtt, checked)`` results of an UPDATE payload."""
+    if len(payload) < BASE_TIME.size:
+        raise ProtocolError("Truncated update")
+    (base,) = BASE_TIME.unpack_from(payload)
+    count, offset = decode_varint(payload, BASE_TIME.size)
+    results = []
+    index = 0
+    for _ in range(count):
+        delta, offset = decode_varint(payload, offset)
+        elapsed, offset = decode_varint(payload, offset)
+        rtt, offset = decode_varint(payload, offset)
+        index += delta
+        results.append((index, None if rtt == 0 else (rtt - 1) / 1_000_000, base + elapsed / 1000))
+    return results
+
+
+def parse_endpoint(text: str, default_host: str = "0.0.0.0", default_port: int = DEFAULT_PORT) -> tuple[str, int]:
+    """Parse ``host:port``, ``[v6 address]:port``, ``host``, ``:port`` or ``port``.
+
+    Raises:
+        ValueError: If the port is not a number.
+    """
+    if text.isdigit():
+        return default_host, int(text)
+    host, separator, port = text.rpartition(":")
+    if not separator or "]" in port:
+        host, port = text, ""
+    elif ":" in host and not host.startswith("["):
+        host, port = text, ""  # A bare IPv6 address
+    return host.strip("[]") or default_host, int(port) if port else default_port
@@ -0,0 +1,155 @@
+from network.nodestore import NodeStore
+
+UNSET = -1  # No parent, the node is cut off from every root
+ROOT = -2  # Parent marker of the roots themselves
+
+
+class Reachability:
+    """Incrementally maintained reachability from the root nodes.
+
+    A node is reachable if a path of connections leads to it from a root
+    through nodes that are not down. Every reachable node keeps a parent, so
+    the reachable nodes form a spanning forest hanging off the roots. When a
+    node goes down only its subtree in that forest is re-examined, and when it
+    comes back up the search only extends into nodes that were cut off, so
+    the cost of a status change is proportional to the part of the graph it
+    affects. With no roots marked every node counts as reachable.
+    """
+
+    def __init__(self, store: NodeStore):
+        """Initialize the reachability of every node in a store.
+
+        Args:
+            store (NodeStore): The nodes and their connections.
+        """
+        self.store = store
+        self.parent: list[int] = []
+        self.down = bytearray()
+        self.rebuild()
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether any root is marked."""
+        return bool(self.store.roots)
+
+    def is_reachable(self, node_id: int) -> bool:
+        """Return whether a node has a path from a root."""
+        return self.parent[node_id] != UNSET
+
+    def _passes(self, node_id: int) -> bool:
+        """Return whether reachability propagates through a node."""
+        return self.parent[node_id] != UNSET and not self.down[node_id]
+
+    def rebuild(self) -> tuple[list[int], list[int]]:
+        """Recompute every node from scratch, e.g. after the topology changed.
+
+        Down states of existing nodes are kept.
+
+        Returns:
+            tuple[list[int], list[int]]: The IDs of the nodes that became
+            unreachable and of those that became reachable again.
+        """
+        store = self.store
+        count = len(store.family)
+        before = self.parent + [ROOT] * (count - len(self.parent))  # New nodes start out reachable
+        self.down.extend(bytes(count - len(self.down)))
+        alive = list(store.ids())
+
+        if not self.enabled:
+            self.parent = [ROOT] * count
+        else:
+            self.parent = [UNSET] * count
+            frontier = []
+            for node_id in store.roots:
+                self.parent[node_id] = ROOT
+                frontier.append(node_id)
+            self._spread(frontier)
+
+        lost = [node_id for node_id in alive if before[node_id] != UNSET and self.parent[node_id] == UNSET]
+        regained = [node_id for node_id in alive if before[node_id] == UNSET and self.parent[node_id] != UNSET]
+        return lost, regained
+
+    def _spread(self, frontier: list[int], within: set[int] | None = None) -> list[int]:
+        """Extend reachability breadth-first from reachable nodes.
+
+        Args:
+            frontier (list[int]): Reachable nodes to spread from.
+            within (set[int] | None): Only claim nodes in this set, if given.
+
+        Returns:
+            list[int]: The nodes that were claimed.
+        """
+        parent, down, store = self.parent, self.down, self.store
+        claimed = []
+        while frontier:
+            next_frontier = []
+            for node_id in frontier:
+                if down[node_id]:
+                    continue  # A down node is reachable itself but relays nothing
+                for other in store.neighbour_ids(node_id):
+                    if parent[other] == UNSET and (within is None or other in within):
+                        parent[other] = node_id
+                        claimed.append(other)
+                        next_frontier.append(other)
+            frontier = next_frontier
+        return claimed
+
+    def _subtree(self, node_id: int) -> list[int]:
+        """Return every node whose parent chain runs through a node, excluding the node."""
+        parent, store = self.parent, self.store
+        subtree = []
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            for other in store.neighbour_ids(current):
+                if parent[other] == current:
+                    subtree.append(other)
+                    stack.append(other)
+        return subtree
+
+    def set_down(self, node_id: int, down: bool) -> tuple[list[int], list[int]]:
+        """Record a node's probe result and update the nodes behind it.
+
+        Args:
+            node_id (int): The node's ID.
+            down (bool): Whether the node failed its probe.
+
+        Returns:
+            tuple[list[int], list[int]]: The IDs of the nodes that became
+            unreachable and of those that became reachable again.
+        """
+        if node_id >= len(self.down) or bool(self.down[node_id]) == down:
+            return [], []
+        self.down[node_id] = down
+        if not self.enabled:
+            return [], []
+        if self.parent[node_id] == UNSET:
+            if down:
+                return [], []  # Nothing relays through a node that is cut off itself
+            # A cut-off node that answers rejoins through its first neighbour that relays
+            for neighbour in self.store.neighbour_ids(node_id):
+                if self._passes(neighbour):
+                    self.parent[node_id] = neighbour
+                    return [], [node_id] + self._spread([node_id])
+            return [], []
+        if not down:
+            return [], self._spread([node_id])
+
+        # Cut the subtree loose, then reattach what still has another way in
+        subtree = self._subtree(node_id)
+        for other in subtree:
+            self.parent[other] = UNSET
+        members = set(subtree)
+        seeds = []
+        for other in subtree:
+            for neighbour in self.store.neighbour_ids(other):
+                if neighbour not in members and self._passes(neighbour):
+                    self.parent[other] = neighbour
+                    seeds.append(other)
+                    break
+        self._spread(seeds, members)
+        return [other for other in subtree if self.parent[other] == UNSET], []
+
+    def unreachable(self) -> list[int]:
+        """Return the IDs of every node that is cut off."""
+        return [node_id for node_id in self.store.ids() if self.parent[node_id] == UNSET]
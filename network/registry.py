@@ -0,0 +1,431 @@
+import ipaddress
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+from network.node import NodeData
+from network.nodestore import ICMP, IPV6_FLAG, NodeStore, NodeView, iter_edges, pack_address
+from network.services import parse_check
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+DEVICE_TYPES = {"router": "router", "switch": "switch", "pc": "PC"}
+ROOT = "root"  # ``<target>,root`` marks vantage points for dependency-aware probing
+MAX_EXPANSION = 1 << 16  # Largest CIDR block or range a single line may expand to
+SUBNET_PREFIX = {4: 24, 6: 64}  # Prefix length of the subnets in the subnet index
+ADDRESS_BITS = {4: 32, 6: 128}
+
+def address_key(address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> int:
+    """Return the packed integer key of an address, keeping IPv4 and IPv6 apart."""
+    return int(address) | IPV6_FLAG if address.version == 6 else int(address)
+
+
+def subnet_key(key: int) -> tuple[int, int]:
+    """Return the subnet index key of a packed address: its version and network bits."""
+    version = 6 if key & IPV6_FLAG else 4
+    return version, (key & ~IPV6_FLAG) >> (ADDRESS_BITS[version] - SUBNET_PREFIX[version])
+
+
+class AddressRange:
+    """An inclusive range of addresses such as ``10.0.0.1-10.0.0.50``."""
+
+    def __init__(self, start: ipaddress.IPv4Address | ipaddress.IPv6Address, end: ipaddress.IPv4Address | ipaddress.IPv6Address):
+        """Initialize the range.
+
+        Args:
+            start (IPv4Address | IPv6Address): The first address.
+            end (IPv4Address | IPv6Address): The last address.
+
+        Raises:
+            ValueError: If the addresses are of different versions or out of order.
+        """
+        if end.version != start.version or end < start:
+            raise ValueError(f"Invalid range: {start}-{end}")
+        self.start = start
+        self.end = end
+        self.version = start.version
+
+    def __len__(self) -> int:
+        """Return the number of addresses in the range."""
+        return int(self.end) - int(self.start) + 1
+
+    def __iter__(self) -> Iterator[ipaddress.IPv4Address | ipaddress.IPv6Address]:
+        """Lazily yield every address in the range."""
+        factory = type(self.start)
+        for value in range(int(self.start), int(self.end) + 1):
+            yield factory(value)
+
+
+def parse_target(text: str):
+    """Parse the address part of a node file line.
+
+    Args:
+        text (str): A single address, a CIDR block (``10.0.0.0/22``) or a range
+            (``10.0.0.1-10.0.0.50`` or ``10.0.0.1-50``).
+
+    Returns:
+        The packed key of a single address, an ``ip_network``, an
+        ``AddressRange``, or None if the text is not an address at all (i.e. a
+        hostname).
+
+    Raises:
+        ValueError: If the text looks like a block or range but is invalid.
+    """
+    if "/" in text:
+        return ipaddress.ip_network(text, strict=False)
+    if "-" in text:
+        start_text, end_text = text.split("-", 1)
+        try:
+            start = ipaddress.ip_address(start_text)
+        except ValueError:
+            return None  # A hostname containing a dash
+        if end_text.isdigit() and start.version == 4:
+            # Short form, the end replaces the last octet
+            last = int(end_text)
+            if last > 0xFF or last < int(start) & 0xFF:
+                raise ValueError(f"Invalid range: {text}, the end must be a last octet from {int(start) & 0xFF} to 255")
+            return AddressRange(start, ipaddress.IPv4Address((int(start) & ~0xFF) | last))
+        return AddressRange(start, ipaddress.ip_address(end_text))
+    key = pack_address(text)
+    if key is None and text.replace(".", "").isdigit():
+        raise ValueError(f"{text!r} does not appear to be an IPv4 address")  # Not a hostname either
+    return key
+
+
+def expand(target) -> Iterator[int]:
+    """Lazily yield the packed keys of the addresses of a parsed target.
+
+    CIDR blocks yield their usable hosts, ranges yield every address.
+    """
+    if isinstance(target, int):
+        yield target
+        return
+    if isinstance(target, AddressRange) or target.num_addresses <= 2:
+        addresses = iter(target)
+    else:
+        addresses = target.hosts()
+    for address in addresses:
+        yield address_key(address)
+
+
+def target_size(target) -> int:
+    """Return (an upper bound of) the number of addresses a parsed target expands to."""
+    if isinstance(target, int):
+        return 1
+    if isinstance(target, AddressRange):
+        return len(target)
+    return target.num_addresses
+
+
+class NodeRegistry:
+    """Nodes indexed by address, device type and subnet.
+
+    The nodes live in a compact ``NodeStore`` keyed by packed address, so
+    lookups and connection wiring cost one dict access per edge. Hostnames,
+    which cannot be packed, are keyed by name. The registry hands out
+    NodeData-compatible views of the stored nodes.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self.store = NodeStore()
+        self.by_subnet: dict[tuple[int, int], list[int]] = {}  # Subnet key -> node IDs
+        self.errors: list[tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        """Return the number of nodes."""
+        return len(self.store)
+
+    def __iter__(self) -> Iterator[NodeView]:
+        """Iterate over the nodes in file order."""
+        return iter(self.store.nodes())
+
+    def __contains__(self, ip: str) -> bool:
+        """Return whether a node with this address or hostname exists."""
+        return ip in self.store
+
+    @property
+    def nodes(self) -> list[NodeView]:
+        """Return the nodes as a list."""
+        return self.store.nodes()
+
+    key = staticmethod(NodeStore.key)
+
+    def get(self, ip: str) -> NodeView | None:
+        """Look up a node by address or hostname.
+
+        Args:
+            ip (str): The address or hostname.
+
+        Returns:
+            NodeView | None: The node, or None if it is not registered.
+        """
+        node_id = self.store.find(ip)
+        return None if node_id is None else self.store.view(node_id)
+
+    def add(self, ip: str, device_type: str, key: int | str | None = None, check: str = ICMP) -> NodeView:
+        """Register a node, or retype it if it already exists.
+
+        Args:
+            ip (str): The address or hostname of the node.
+            device_type (str): The device type.
+            key (int | str | None): The index key of the node, if already known.
+            check (str): How the node is probed, see ``network.services.parse_check``.
+
+        Returns:
+            NodeView: The registered node.
+        """
+        return self.store.view(self._add(self.key(ip) if key is None else key, device_type, check))
+
+    def _add(self, key: int | str, device_type: str, check: str) -> int:
+        """Register a node under a known key and return its ID, the hot path of ``load_registry``."""
+        store = self.store
+        new = key not in store.index
+        node_id = store.add(None, device_type, key)
+        if new and isinstance(key, int):
+            self.by_subnet.setdefault(subnet_key(key), []).append(node_id)
+        if check != ICMP or node_id in store.checks:
+            store.set_check(node_id, check)
+        return node_id
+
+    def of_type(self, device_type: str) -> list[NodeView]:
+        """Return the nodes of a device type."""
+        code = self.store.type_codes.get(DEVICE_TYPES.get(device_type.lower(), device_type))
+        types = self.store.type
+        return [self.store.view(node_id) for node_id in self.store.ids() if types[node_id] == code]
+
+    def in_subnet(self, network: str) -> list[NodeView]:
+        """Return the nodes inside a subnet.
+
+        Args:
+            network (str): A CIDR block, e.g. ``10.0.0.0/16``.
+
+        Returns:
+            list[NodeView]: The nodes whose address lies inside the block.
+        """
+        return [self.store.view(node_id) for node_id in self.subnet_ids(ipaddress.ip_network(network, strict=False))]
+
+    def subnet_ids(self, network: ipaddress.IPv4Network | ipaddress.IPv6Network) -> list[int]:
+        """Return the IDs of the nodes inside a subnet."""
+        version = network.version
+        if network.prefixlen >= SUBNET_PREFIX[version]:
+            # Narrower than an indexed subnet, filter its bucket
+            bucket = self.by_subnet.get(subnet_key(address_key(network.network_address)), [])
+            return [node_id for node_id in bucket if ipaddress.ip_address(self.store.ip(node_id)) in network]
+        first = subnet_key(address_key(network.network_address))[1]
+        last = subnet_key(address_key(network.broadcast_address))[1]
+        return [
+            node_id for (bucket_version, bits), bucket in self.by_subnet.items()
+            if bucket_version == version and first <= bits <= last
+            for node_id in bucket
+        ]
+
+    def resolve(self, text: str, target) -> list[int]:
+        """Return the IDs of the registered nodes a connection endpoint refers to.
+
+        Args:
+            text (str): The endpoint as written in the node file.
+            target: The endpoint parsed by ``parse_target``.
+
+        Returns:
+            list[int]: The matching node IDs.
+        """
+        index = self.store.index
+        if target is None or isinstance(target, int):
+            node_id = index.get(text if target is None else target)
+            return [node_id] if node_id is not None else []
+        if isinstance(target, AddressRange):
+            return [node_id for node_id in (index.get(address_key(a)) for a in target) if node_id is not None]
+        return self.subnet_ids(target)
+
+    def error(self, line_number: int, message: str):
+        """Record and log a problem with a node file line."""
+        self.errors.append((line_number, message))
+        logger.warning(f"Line {line_number}: {message}")
+
+
+def load_registry(file_path: str) -> NodeRegistry:
+    """Stream a node file into a registry.
+
+    Each line is either ``<target>,<device type>`` declaring nodes,
+    ``<target>,<target>`` declaring connections or ``<target>,root`` marking
+    vantage points for dependency-aware probing, where a target is an address,
+    hostname, CIDR block or address range. Node lines may add a third field
+    naming a service check instead of ICMP, e.g. ``10.0.0.5,PC,tcp:22`` or
+    ``web01,PC,https/health``, see ``network.services.parse_check``. Blocks
+    and ranges are expanded lazily. Malformed lines are logged with their line
+    number and skipped.
+
+    Args:
+        file_path (str): The path to the node file.
+
+    Returns:
+        NodeRegistry: The registry, with parse problems in ``errors``.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    registry = NodeRegistry()
+    targets = {}  # Text -> parsed target
+    connections = []
+    roots = []
+
+    with open(file_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split(',')
+            if ' ' in line or '\t' in line:
+                parts = [part.strip() for part in parts]
+            if len(parts) not in (2, 3):
+                registry.error(line_number, f"Expected two or three comma separated fields: {line}")
+                continue
+            first, second = parts[0], parts[1]
+            check = parts[2] if len(parts) == 3 and parts[2].lower() != ICMP else ICMP
+            if not all(parts):
+                registry.error(line_number, f"Empty field: {line}")
+                continue
+
+            try:
+                target = targets[first] if first in targets else parse_target(first)
+                kind = second.lower()
+                device_type = DEVICE_TYPES.get(kind)
+                if len(parts) == 3 and device_type is None:
+                    registry.error(line_number, f"A check can only follow a device type: {line}")
+                    continue
+                if check != ICMP:
+                    try:
+                        parse_check(check)
+                    except ValueError as e:
+                        registry.error(line_number, f"Invalid check in {line}: {e}")
+                        continue
+                if device_type is not None and isinstance(target, int):
+                    registry._add(target, device_type, check)  # Single address, most lines
+                    continue
+                targets[first] = target  # Connection endpoints repeat, often many times
+                other = None
+                if kind != ROOT and device_type is None:
+                    other = targets[second] if second in targets else parse_target(second)
+                    targets[second] = other
+                    if isinstance(target, int) and isinstance(other, int):
+                        connections.append((line_number, first, target, second, other))
+                        continue
+                oversized = [text for text, parsed in ((first, target), (second, other))
+                             if parsed is not None and target_size(parsed) > MAX_EXPANSION]
+                if oversized:
+                    registry.error(line_number, f"{oversized[0]} expands to more than {MAX_EXPANSION} addresses")
+                elif kind == ROOT:
+                    roots.append((line_number, first, target))
+                elif device_type is None:
+                    # Not a device type, so a connection between two targets
+                    connections.append((line_number, first, target, second, other))
+                elif target is None:
+                    registry._add(first, device_type, check)  # Hostname
+                else:
+                    for key in expand(target):
+                        registry._add(key, device_type, check)
+            except ValueError as e:
+                registry.error(line_number, f"Invalid address in {line}: {e}")
+
+    # Establish connections once every node is known
+    index = registry.store.index
+    for line_number, first, target, second, other in connections:
+        if isinstance(target, int) and isinstance(other, int) and target in index and other in index:
+            registry.store.connect(index[target], index[other])
+            continue
+        left = registry.resolve(first, target)
+        right = registry.resolve(second, other)
+        if not left or not right:
+            registry.error(line_number, f"Connection refers to unknown nodes: {first},{second}")
+            continue
+        if len(left) * len(right) > MAX_EXPANSION:
+            registry.error(
+                line_number, f"Connection {first},{second} expands to {len(left) * len(right)} edges, "
+                f"more than {MAX_EXPANSION}"
+            )
+            continue
+        for node_id in left:
+            for other_id in right:
+                registry.store.connect(node_id, other_id)
+
+    for line_number, first, target in roots:
+        node_ids = registry.resolve(first, target)
+        if not node_ids:
+            registry.error(line_number, f"Root refers to unknown nodes: {first}")
+        registry.store.roots.update(node_ids)
+
+    return registry
+
+
+def edge_set(nodes: list[NodeData]) -> set[tuple[str, str]]:
+    """Return the connections between nodes as ordered pairs of addresses."""
+    return {(a, b) if a < b else (b, a) for a, b in iter_edges(nodes)}
+
+
+@dataclass
+class NodeDiff:
+    """Difference between the running nodes and a freshly read node file."""
+    added: list[NodeData] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    retyped: dict[str, str] = field(default_factory=dict)  # Address -> new device type
+    rechecked: dict[str, str] = field(default_factory=dict)  # Address -> new check
+    rooted: dict[str, bool] = field(default_factory=dict)  # Address -> new root flag
+    added_edges: set[tuple[str, str]] = field(default_factory=set)
+    removed_edges: set[tuple[str, str]] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        """Return whether anything changed."""
+        return bool(
+            self.added or self.removed or self.retyped or self.rechecked or self.rooted
+            or self.added_edges or self.removed_edges
+        )
+
+    @property
+    def topology_changed(self) -> bool:
+        """Return whether nodes or connections were added or removed."""
+        return bool(self.added or self.removed or self.added_edges or self.removed_edges)
+
+    def summary(self) -> str:
+        """Return a short human readable description of the diff."""
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, {len(self.retyped)} retyped, "
+            f"{len(self.rechecked)} checks changed, {len(self.rooted)} roots changed, "
+            f"{len(self.added_edges)} connections added, {len(self.removed_edges)} connections removed"
+        )
+
+
+def diff_nodes(old: Iterable[NodeData], new: Iterable[NodeData]) -> NodeDiff:
+    """Compute the diff that turns one node set into another.
+
+    Nodes are matched by address. The added nodes in the diff are the objects
+    from ``new``, the rest is expressed in addresses so it can be applied to
+    the running node objects.
+
+    Args:
+        old (Iterable[NodeData]): The running nodes.
+        new (Iterable[NodeData]): The nodes read from the node file.
+
+    Returns:
+        NodeDiff: The diff, falsy if nothing changed.
+    """
+    old = {node.ip: node for node in old}
+    new = {node.ip: node for node in new}
+    diff = NodeDiff()
+    for ip, node in new.items():
+        current = old.get(ip)
+        if current is None:
+            diff.added.append(node)
+        else:
+            if current.device_type != node.device_type:
+                diff.retyped[ip] = node.device_type
+            if current.check != node.check:
+                diff.rechecked[ip] = node.check
+            if current.is_root != node.is_root:
+                diff.rooted[ip] = node.is_root
+    diff.removed = [ip for ip in old if ip not in new]
+    old_edges = edge_set(list(old.values()))
+    new_edges = edge_set(list(new.values()))
+    diff.added_edges = new_edges - old_edges
+    diff.removed_edges = old_edges - new_edges
+    return diff
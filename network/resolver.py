@@ -0,0 +1,177 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from functools import lru_cache
+from network.metrics import RESOLVE_DURATION, Gauge, register
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+TTL = 300.0  # Seconds a resolved address is used, getaddrinfo does not report the record's TTL
+NEGATIVE_TTL = 30.0  # Seconds a failed lookup is remembered
+REFRESH_AT = 0.8  # Fraction of the TTL after which a used entry is refreshed in the background
+LOOKUP_TIMEOUT = 5.0  # Seconds before a lookup counts as failed
+MAX_STALE = 3600.0  # Seconds an address is still used while its refreshes keep failing
+
+
+class ResolutionError(Exception):
+    """Raised when a hostname cannot be resolved."""
+
+
+@lru_cache(maxsize=65536)
+def is_address(host: str) -> bool:
+    """Return whether a host is an IP literal rather than a name."""
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class _Entry:
+    """A cached lookup result."""
+
+    __slots__ = ("address", "error", "resolved", "due")
+
+    def __init__(self, address: str | None, error: str | None, due: float):
+        """Initialize the entry.
+
+        Args:
+            address (str | None): The resolved address, None for a failed lookup.
+            error (str | None): Why the lookup, or the last refresh of an address, failed.
+            due (float): Monotonic time of the next lookup, a refresh for an address.
+        """
+        self.address = address
+        self.error = error
+        self.resolved = time.monotonic()
+        self.due = due
+
+
+class Resolver:
+    """Asynchronous hostname resolver with a TTL cache.
+
+    Probes ask for an address every cycle, so lookups are answered from the
+    cache: addresses are kept for ``ttl`` seconds and failures for
+    ``negative_ttl``. Concurrent lookups of the same name share one
+    ``getaddrinfo`` call. An address that is used after ``REFRESH_AT`` of
+    its TTL is refreshed in the background while the cached address keeps
+    being returned, so a steadily probed name never waits for the resolver.
+    If a refresh fails it is retried after ``negative_ttl`` and the last good
+    address stays in use for up to ``max_stale`` seconds past its TTL; a slow
+    or broken resolver then does not make healthy hosts look down.
+    """
+
+    def __init__(
+        self,
+        ttl: float = TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+        timeout: float = LOOKUP_TIMEOUT,
+        max_stale: float = MAX_STALE,
+    ):
+        """Initialize the resolver.
+
+        Args:
+            ttl (float): Seconds a resolved address is used.
+            negative_ttl (float): Seconds a failed lookup is remembered.
+            timeout (float): Seconds before a lookup counts as failed.
+            max_stale (float): Seconds an address outlives its TTL while refreshes fail.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_stale = max_stale
+        self.cache: dict[str, _Entry] = {}
+        self.inflight: dict[str, asyncio.Future] = {}
+        self.lookups = 0  # getaddrinfo calls made
+
+    async def _lookup(self, host: str) -> _Entry:
+        """Resolve a name and cache the result, keeping a good address if the lookup fails."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.lookups += 1
+        try:
+            infos = await asyncio.wait_for(loop.getaddrinfo(host, None, type=socket.SOCK_RAW), self.timeout)
+            entry = _Entry(infos[0][4][0], None, time.monotonic() + self.ttl * REFRESH_AT)
+        except asyncio.TimeoutError:
+            entry = _Entry(None, f"lookup timed out after {self.timeout:g}s", time.monotonic() + self.negative_ttl)
+        except (OSError, IndexError, UnicodeError) as e:
+            entry = _Entry(None, str(e) or type(e).__name__, time.monotonic() + self.negative_ttl)
+        RESOLVE_DURATION.observe(time.perf_counter() - started)
+
+        previous = self.cache.get(host)
+        stale = previous is not None and previous.address is not None and entry.resolved - previous.resolved < self.ttl + self.max_stale
+        if entry.address is None and stale:
+            logger.warning(f"Could not refresh {host} ({entry.error}), still using {previous.address}")
+            previous.error, previous.due = entry.error, entry.due
+            return previous
+        if entry.address is None:
+            logger.warning(f"Could not resolve {host}: {entry.error}")
+        elif previous is not None and previous.address not in (None, entry.address):
+            logger.info(f"{host} now resolves to {entry.address}, was {previous.address}")
+        self.cache[host] = entry
+        return entry
+
+    def _usable(self, entry: _Entry, now: float) -> bool:
+        """Return whether an entry holds an address that may still be used, past its TTL only if refreshing it failed."""
+        if entry.address is None:
+            return False
+        return now - entry.resolved < (self.ttl if entry.error is None else self.ttl + self.max_stale)
+
+    def _start_lookup(self, host: str) -> asyncio.Future:
+        """Return the running lookup of a name, starting one if there is none."""
+        future = self.inflight.get(host)
+        if future is None:
+            future = asyncio.ensure_future(self._lookup(host))
+            self.inflight[host] = future
+            future.add_done_callback(lambda _: self.inflight.pop(host, None))
+        return future
+
+    async def resolve(self, host: str) -> str:
+        """Return the address of a host, passing IP literals through.
+
+        Args:
+            host (str): The IP address or hostname to resolve.
+
+        Returns:
+            str: The first address returned by the resolver.
+
+        Raises:
+            ResolutionError: If the name does not resolve, or did not within the negative TTL.
+        """
+        if is_address(host):
+            return host
+        entry = self.cache.get(host)
+        now = time.monotonic()
+        cached = entry is not None and (self._usable(entry, now) if entry.address is not None else now < entry.due)
+        if not cached:
+            # Shielded, so a cancelled probe does not cancel the lookup other probes wait for
+            entry = await asyncio.shield(self._start_lookup(host))
+        elif entry.address is not None and now >= entry.due:
+            self._start_lookup(host)  # Refresh in the background, the cached address is used meanwhile
+        if entry.address is None:
+            raise ResolutionError(f"{host}: {entry.error}")
+        return entry.address
+
+    def addresses(self) -> dict[str, str]:
+        """Return the cached hostname of each resolved address."""
+        return {entry.address: host for host, entry in self.cache.items() if entry.address is not None}
+
+    def forget(self, host: str):
+        """Drop a name from the cache, e.g. when its node is removed."""
+        self.cache.pop(host, None)
+
+
+_resolver: Resolver | None = None
+
+
+def get_resolver() -> Resolver:
+    """Return the process-wide resolver, creating it on first use."""
+    global _resolver
+    if _resolver is None:
+        _resolver = Resolver()
+    return _resolver
+
+
+register(Gauge("netmon_resolver_cache_entries", "Hostnames held by the resolver cache.", lambda: len(get_resolver().cache)))
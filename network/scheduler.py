@@ -0,0 +1,337 @@
+import asyncio
+import heapq
+import logging
+import random
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from network.metrics import SCHEDULING_DELAY
+from network.node import NodeData
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_CONCURRENCY = 256
+SUPPRESSED_INTERVAL = 300.0  # Probe interval of nodes cut off behind a down parent
+PASSIVE_STRETCH = 6.0  # Interval multiplier of nodes confirmed alive by the neighbour table
+
+
+class SchedulerControl(ABC):
+    """Control interface the Monitor drives its probe source through.
+
+    Implemented by the ProbeScheduler and by everything that takes its place:
+    the ShardedScheduler, the agent Collector and the status FeedClient.
+    Sources that do not schedule probes themselves inherit the no-op
+    defaults of the rate controls.
+    """
+
+    @abstractmethod
+    def add(self, node: NodeData, interval: float | None = None, delay: float | None = None):
+        """Start covering a node."""
+
+    @abstractmethod
+    def remove(self, ip: str):
+        """Stop covering a node."""
+
+    def retype(self, node: NodeData):
+        """Pick up a node's new device type and check, nothing to do by default."""
+
+    def suppress(self, ip: str):
+        """Probe a node at the suppressed rate, nothing to do by default."""
+
+    def resume(self, ip: str):
+        """Return a suppressed node to its normal rate, nothing to do by default."""
+
+    def set_passive(self, ip: str, confirmed: bool):
+        """Stretch or restore a node's interval, nothing to do by default."""
+
+    def due_in(self) -> dict[str, tuple[float, float, int]]:
+        """Return the schedule to save in a snapshot, nothing by default."""
+        return {}
+
+    def set_failures(self, ip: str, failures: int):
+        """Restore a node's failure count, nothing to do by default."""
+
+    @abstractmethod
+    def start(self):
+        """Start on the running loop."""
+
+    @abstractmethod
+    def stop(self):
+        """Stop."""
+
+
+@dataclass(eq=False)
+class ScheduledNode:
+    """Scheduling state for a single node."""
+    node: NodeData
+    interval: float
+    due: float = 0.0
+    failures: int = 0
+    removed: bool = False
+    suppressed: bool = False
+    passive: bool = False  # Confirmed alive by the neighbour table, probed less often
+    busy: bool = False  # Queued or being probed, so not in the heap
+
+
+class ProbeScheduler(SchedulerControl):
+    """Central probe scheduler keyed on next-due time.
+
+    Nodes live in a heap ordered by their next due time. A single dispatcher
+    coroutine pops due nodes into a bounded queue that a fixed pool of worker
+    coroutines drains, so the number of coroutines and in-flight probes stays
+    constant no matter how many nodes are monitored.
+    """
+
+    def __init__(
+        self,
+        check: Callable[[NodeData], Awaitable[bool]],
+        interval: float = DEFAULT_INTERVAL,
+        intervals: dict[str, float] | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        jitter: float = 0.1,
+        backoff_after: int = 3,
+        max_interval: float = 60.0,
+        suppressed_interval: float = SUPPRESSED_INTERVAL,
+        passive_stretch: float = PASSIVE_STRETCH,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            check (Callable[[NodeData], Awaitable[bool]]): Coroutine probing a node, returns True if it is up.
+            interval (float): Default probe interval in seconds.
+            intervals (dict[str, float] | None): Probe intervals by device type, overriding the default.
+            concurrency (int): Number of worker coroutines, i.e. the maximum number of probes in flight.
+            jitter (float): Random spread applied to each interval, as a fraction of the interval.
+            backoff_after (int): Consecutive failures after which a node's interval starts doubling.
+            max_interval (float): Upper bound for a backed-off interval in seconds.
+            suppressed_interval (float): Interval of suppressed nodes in seconds.
+            passive_stretch (float): Interval multiplier of nodes confirmed alive passively.
+        """
+        self.check = check
+        self.interval = interval
+        self.intervals = {k.lower(): v for k, v in (intervals or {}).items()}
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.backoff_after = backoff_after
+        self.max_interval = max_interval
+        self.suppressed_interval = suppressed_interval
+        self.passive_stretch = passive_stretch
+
+        self.entries: dict[str, ScheduledNode] = {}
+        self.lag = 0.0  # How late the last probe was dispatched, in seconds
+        self._heap: list[tuple[float, int, ScheduledNode]] = []
+        self._counter = 0
+        self._queue: asyncio.Queue | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def interval_for(self, node: NodeData) -> float:
+        """Return the base probe interval for a node.
+
+        Args:
+            node (NodeData): The node.
+
+        Returns:
+            float: The interval in seconds.
+        """
+        return self.intervals.get(node.device_type.lower(), self.interval)
+
+    def effective_interval(self, entry: ScheduledNode) -> float:
+        """Return the interval of a node after applying the down-node backoff or the passive stretch.
+
+        Args:
+            entry (ScheduledNode): The node's scheduling state.
+
+        Returns:
+            float: The interval in seconds.
+        """
+        if entry.suppressed:
+            return max(self.suppressed_interval, entry.interval)
+        if entry.passive:
+            return entry.interval * self.passive_stretch
+        excess = entry.failures - self.backoff_after
+        if excess <= 0:
+            return entry.interval
+        return min(entry.interval * (2 ** min(excess, 16)), max(self.max_interval, entry.interval))
+
+    def _push(self, entry: ScheduledNode, due: float):
+        """Queue a node to be probed at the given loop time."""
+        entry.due = due
+        self._counter += 1
+        heapq.heappush(self._heap, (due, self._counter, entry))
+        if self._wakeup is not None and self._heap[0][2] is entry:
+            self._wakeup.set()
+
+    def _now(self) -> float:
+        """Return the current loop time."""
+        return asyncio.get_running_loop().time()
+
+    def add(self, node: NodeData, interval: float | None = None, delay: float | None = None):
+        """Start scheduling a node.
+
+        The first probe is placed at a random offset within the node's
+        interval so that nodes added together do not fire together.
+
+        Args:
+            node (NodeData): The node to probe.
+            interval (float | None): Per-node interval overriding the device-type interval.
+            delay (float | None): Delay before the first probe, defaults to a random offset.
+        """
+        self.remove(node.ip)
+        entry = ScheduledNode(node, interval or self.interval_for(node))
+        self.entries[node.ip] = entry
+        if delay is None:
+            delay = random.uniform(0, entry.interval)
+        self._push(entry, self._now() + delay)
+
+    def remove(self, ip: str):
+        """Stop scheduling a node.
+
+        Args:
+            ip (str): The IP address of the node.
+        """
+        entry = self.entries.pop(ip, None)
+        if entry is not None:
+            entry.removed = True  # Lazily dropped when it reaches the top of the heap
+
+    def retype(self, node: NodeData):
+        """Pick up a node's new device type interval without disturbing its next probe.
+
+        Args:
+            node (NodeData): The node, already carrying its new device type.
+        """
+        entry = self.entries.get(node.ip)
+        if entry is not None:
+            entry.interval = self.interval_for(node)
+
+    def suppress(self, ip: str):
+        """Probe a node at the suppressed rate, e.g. while it is cut off behind a down parent.
+
+        Args:
+            ip (str): The IP address of the node.
+        """
+        entry = self.entries.get(ip)
+        if entry is not None and not entry.suppressed:
+            entry.suppressed = True
+            if not entry.busy:
+                self._push(entry, self._now() + self.effective_interval(entry))
+
+    def resume(self, ip: str):
+        """Return a suppressed node to its normal rate and probe it soon.
+
+        Args:
+            ip (str): The IP address of the node.
+        """
+        entry = self.entries.get(ip)
+        if entry is not None and entry.suppressed:
+            entry.suppressed = False
+            entry.failures = 0
+            if not entry.busy:
+                self._push(entry, self._now() + random.uniform(0, entry.interval * self.jitter))
+
+    def set_passive(self, ip: str, confirmed: bool):
+        """Stretch a node's interval while the neighbour table confirms it is alive.
+
+        When the confirmation lapses a probe that was pushed out by the
+        stretch is pulled back within the normal interval.
+
+        Args:
+            ip (str): The IP address of the node.
+            confirmed (bool): Whether its neighbour entry is currently REACHABLE.
+        """
+        entry = self.entries.get(ip)
+        if entry is None or entry.passive == confirmed:
+            return
+        entry.passive = confirmed
+        if not confirmed and not entry.busy:
+            due = self._now() + random.uniform(0, entry.interval)
+            if due < entry.due:
+                self._push(entry, due)
+
+    def due_in(self) -> dict[str, tuple[float, float, int]]:
+        """Return the seconds until each node's next probe, its interval and its consecutive failures.
+
+        Nodes being probed right now count as due now.
+        """
+        now = self._now()
+        return {
+            ip: (0.0 if entry.busy else max(0.0, entry.due - now), self.effective_interval(entry), entry.failures)
+            for ip, entry in self.entries.items()
+        }
+
+    def set_failures(self, ip: str, failures: int):
+        """Restore a node's consecutive failure count, e.g. from a state snapshot."""
+        entry = self.entries.get(ip)
+        if entry is not None:
+            entry.failures = failures
+
+    def _reschedule(self, entry: ScheduledNode):
+        """Compute a node's next due time from its previous one."""
+        interval = self.effective_interval(entry)
+        spread = interval * self.jitter
+        due = entry.due + interval + random.uniform(-spread, spread)
+        now = self._now()
+        if due < now:
+            # We fell behind, spread the catch-up instead of firing immediately
+            due = now + random.uniform(0, spread)
+        self._push(entry, due)
+
+    async def _dispatch(self):
+        """Pop due nodes off the heap and hand them to the workers."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            due, _, entry = self._heap[0]
+            if entry.removed or due != entry.due:
+                heapq.heappop(self._heap)  # Removed, or superseded by a later push
+                continue
+            delay = due - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            heapq.heappop(self._heap)
+            entry.busy = True
+            # Blocks while every worker is busy, which is the concurrency limit
+            await self._queue.put(entry)
+
+    async def _worker(self):
+        """Probe nodes taken from the queue and reschedule them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = await self._queue.get()
+            self.lag = max(0.0, loop.time() - entry.due)
+            SCHEDULING_DELAY.observe(self.lag)
+            try:
+                is_online = await self.check(entry.node)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error checking {entry.node.ip}: {e}")
+                is_online = False
+            entry.failures = 0 if is_online else entry.failures + 1
+            entry.busy = False
+            if not entry.removed:
+                self._reschedule(entry)
+
+    def start(self):
+        """Start the dispatcher and the worker pool on the running loop."""
+        self._queue = asyncio.Queue(maxsize=self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._dispatch())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info(f"Scheduler started with {len(self.entries)} nodes and {self.concurrency} workers")
+
+    def stop(self):
+        """Cancel the dispatcher and the workers."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
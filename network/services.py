@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import ssl
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from network.nodestore import ICMP
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 2.0
+MAX_IDLE = 60.0  # Seconds a pooled connection may sit unused before it is closed
+MAX_BODY = 1 << 20  # Largest response body read to keep a connection reusable
+DEFAULT_PORTS = {"tls": 443, "http": 80, "https": 443}
+
+
+@dataclass(frozen=True)
+class ServiceCheck:
+    """A parsed service check from the node file."""
+    kind: str  # "tcp", "tls", "http" or "https"
+    port: int
+    path: str = "/"
+    status: int = 200
+
+
+@lru_cache(maxsize=1024)
+def parse_check(text: str) -> ServiceCheck | None:
+    """Parse the check field of a node line.
+
+    The field is ``icmp``, ``tcp:PORT``, ``tls[:PORT]``, or
+    ``http[:PORT][/PATH][=STATUS]`` and the same for ``https``, e.g.
+    ``http:8080/health=204``. HTTP checks expect status 200 by default. The
+    path may carry a query, ``http/health?full=1``, so only a trailing HTTP
+    status code after the last ``=`` is taken as the expected status.
+
+    Args:
+        text (str): The check field.
+
+    Returns:
+        ServiceCheck | None: The check, None for ICMP.
+
+    Raises:
+        ValueError: If the field is not a valid check.
+    """
+    text = text.strip()
+    if text.lower() == ICMP:
+        return None
+    text, slash, path = text.partition("/")
+    path = slash + path or "/"
+    status = 200
+    # The status is the last "=" field, unless that belongs to a query in the path
+    head, equals, expected = (path if slash else text).rpartition("=")
+    if equals and expected.isdigit() and 100 <= int(expected) <= 599:
+        status = int(expected)
+        if slash:
+            path = head
+        else:
+            text = head
+    elif equals and not slash:
+        raise ValueError(f"Invalid status {expected!r}")
+    kind, _, port = text.partition(":")
+    kind = kind.lower()
+    if kind not in ("tcp", "tls", "http", "https"):
+        raise ValueError(f"Unknown check {kind!r}")
+    if not port and kind == "tcp":
+        raise ValueError("TCP checks need a port")
+    port = int(port) if port else DEFAULT_PORTS[kind]
+    if not 0 < port < 65536:
+        raise ValueError(f"Port {port} out of range")
+    if kind in ("tcp", "tls") and (path != "/" or status != 200):
+        raise ValueError(f"{kind.upper()} checks take no path or status")
+    return ServiceCheck(kind, port, path, status)
+
+
+class _Connection:
+    """A pooled keep-alive connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Initialize the connection."""
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+
+    def close(self):
+        """Close the connection."""
+        self.writer.close()
+
+
+class ServiceProber:
+    """Probes TCP, TLS and HTTP services on the running loop.
+
+    TCP and TLS checks time a fresh connect or handshake, since that is what
+    they check. HTTP checks time one request over a pooled keep-alive
+    connection, so only the first check of a host, or one after the server
+    dropped the connection, pays for TCP and TLS setup. A reused connection
+    that turns out to be closed is replaced and the request retried once.
+    Certificates are not verified, an internal CA or a self-signed
+    certificate still counts as a service that answers.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, max_idle: float = MAX_IDLE):
+        """Initialize the prober.
+
+        Args:
+            timeout (float): Per-probe timeout in seconds.
+            max_idle (float): Seconds a pooled connection may sit unused.
+        """
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.pool: dict[tuple[str, str, int], list[_Connection]] = {}  # (kind, address, port) -> idle connections
+        self._sweeper: asyncio.TimerHandle | None = None  # Pending _sweep while the pool is not empty
+        self._sweeper_loop: asyncio.AbstractEventLoop | None = None
+        self.context = ssl.create_default_context()
+        self.context.check_hostname = False
+        self.context.verify_mode = ssl.CERT_NONE
+
+    async def _open(self, host: str, address: str, check: ServiceCheck) -> _Connection:
+        """Open a connection to an address, with TLS for TLS and HTTPS checks."""
+        tls = check.kind in ("tls", "https")
+        reader, writer = await asyncio.open_connection(
+            address, check.port, ssl=self.context if tls else None, server_hostname=host if tls else None
+        )
+        return _Connection(reader, writer)
+
+    def _take(self, key: tuple[str, str, int]) -> _Connection | None:
+        """Return an idle pooled connection, dropping expired ones."""
+        idle = self.pool.get(key)
+        now = time.monotonic()
+        while idle:
+            connection = idle.pop()
+            if now - connection.idle_since < self.max_idle and not connection.reader.at_eof():
+                return connection
+            connection.close()
+        return None
+
+    def _give_back(self, key: tuple[str, str, int], connection: _Connection):
+        """Return a connection to the pool."""
+        connection.idle_since = time.monotonic()
+        self.pool.setdefault(key, []).append(connection)
+        loop = asyncio.get_running_loop()
+        if self._sweeper is None or self._sweeper_loop is not loop:
+            self._sweeper = loop.call_later(self.max_idle, self._sweep)
+            self._sweeper_loop = loop
+
+    def _sweep(self):
+        """Close connections idle for longer than ``max_idle``, e.g. of hosts no longer checked."""
+        self._sweeper = None
+        now = time.monotonic()
+        for key, idle in list(self.pool.items()):
+            fresh = []
+            for connection in idle:
+                if now - connection.idle_since < self.max_idle:
+                    fresh.append(connection)
+                else:
+                    connection.close()
+            if fresh:
+                self.pool[key] = fresh
+            else:
+                del self.pool[key]
+        if self.pool:
+            oldest = min(connection.idle_since for idle in self.pool.values() for connection in idle)
+            self._sweeper = self._sweeper_loop.call_later(max(oldest + self.max_idle - now, 0.0), self._sweep)
+
+    async def _request(self, connection: _Connection, host: str, check: ServiceCheck) -> tuple[int, bool]:
+        """Send a GET and read the full response.
+
+        Returns:
+            tuple[int, bool]: The status code and whether the connection can be reused.
+        """
+        default = DEFAULT_PORTS[check.kind]
+        authority = host if check.port == default else f"{host}:{check.port}"
+        if ":" in host and not host.startswith("["):
+            authority = f"[{host}]" if check.port == default else f"[{host}]:{check.port}"
+        connection.writer.write(
+            f"GET {check.path} HTTP/1.1\r\nHost: {authority}\r\nUser-Agent: network-monitor\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode("latin-1")
+        )
+        await connection.writer.drain()
+        status_line = await connection.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before the response")
+        parts = status_line.decode("latin-1").split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+            raise ValueError(f"Malformed status line {status_line[:80]!r}")
+        version, status = parts[0], int(parts[1])
+        headers = {}
+        while True:
+            line = await connection.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        reusable = version == "HTTP/1.1" and headers.get("connection") != "close"
+        if "chunked" in headers.get("transfer-encoding", ""):
+            while True:
+                size = int((await connection.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # Optional trailer fields, up to the blank line ending the message
+                    while await connection.reader.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                await connection.reader.readexactly(size + 2)  # Chunk and its CRLF
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length > MAX_BODY:
+                reusable = False
+            else:
+                await connection.reader.readexactly(length)
+        elif status not in (204, 304) and not 100 <= status < 200:
+            reusable = False  # Body runs until the server closes
+        return status, reusable
+
+    async def _check(self, host: str, address: str, check: ServiceCheck) -> float | None:
+        """Run a check without a timeout."""
+        if check.kind in ("tcp", "tls"):
+            started = time.perf_counter()
+            connection = await self._open(host, address, check)
+            elapsed = time.perf_counter() - started
+            connection.close()
+            return elapsed
+
+        key = (check.kind, address, check.port)
+        connection = self._take(key)
+        for attempt in range(2):
+            fresh = connection is None
+            started = time.perf_counter()
+            if fresh:
+                connection = await self._open(host, address, check)
+            try:
+                status, reusable = await self._request(connection, host, check)
+            except asyncio.CancelledError:
+                connection.close()  # Timed out mid-request, the response could still arrive
+                raise
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                connection.close()
+                if fresh or attempt:
+                    raise
+                connection = None  # The pooled connection went stale, retry on a new one
+                continue
+            elapsed = time.perf_counter() - started
+            if reusable:
+                self._give_back(key, connection)
+            else:
+                connection.close()
+            if status != check.status:
+                logger.info(f"{check.kind.upper()} check of {host}:{check.port}{check.path} returned {status}, expected {check.status}")
+                return None
+            return elapsed
+        return None
+
+    async def probe(self, host: str, check: str, address: str | None = None) -> float | None:
+        """Run a service check against a host.
+
+        Args:
+            host (str): The IP address or hostname to check, sent as the HTTP host and TLS server name.
+            check (str): The check field from the node file, see ``parse_check``.
+            address (str | None): The resolved address to connect to, defaults to the host.
+
+        Returns:
+            float | None: The connect, handshake or request time in seconds, or None if the check failed.
+        """
+        try:
+            service = parse_check(check)
+        except ValueError as e:
+            logger.error(f"Invalid check {check!r} for {host}: {e}")
+            return None
+        try:
+            return await asyncio.wait_for(self._check(host, address or host, service), self.timeout)
+        except asyncio.TimeoutError:
+            return None
+        except (OSError, asyncio.IncompleteReadError, ValueError, ssl.SSLError) as e:
+            logger.debug(f"{service.kind.upper()} check of {host}:{service.port} failed: {e}")
+            return None
+
+    def close(self):
+        """Close every pooled connection."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for connections in self.pool.values():
+            for connection in connections:
+                connection.close()
+        self.pool.clear()
+
+
+_prober: ServiceProber | None = None
+
+
+def get_service_prober() -> ServiceProber:
+    """Return the process-wide service prober, creating it on first use."""
+    global _prober
+    if _prober is None:
+        _prober = ServiceProber()
+    return _prober
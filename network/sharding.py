@@ -0,0 +1,451 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+from typing import Callable
+from network.node import NodeData
+from network.scheduler import ProbeScheduler, SchedulerControl
+from network.status import ONLINE, OFFLINE, UNRESOLVED
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+COLLECT_INTERVAL = 0.1  # Seconds between scans of the shared table
+COMMAND_POLL = 0.2  # Seconds between checks of a worker's command pipe
+RESTART_DELAY = 1.0  # Minimum seconds between restarts of the same worker
+REBALANCE_SLACK = 0.1  # Tolerated shard size deviation from the mean before nodes are moved
+MIN_CAPACITY = 1024
+
+
+class SharedStatusTable:
+    """Check time, RTT, status and a sequence counter per slot, in shared memory.
+
+    Every slot has a single writer, the worker probing that node, which
+    brackets its writes with the slot's sequence counter: odd while writing,
+    even when done. Readers skip slots whose counter is odd or moves under
+    them, so results cross processes without locks, pickling or messages.
+    """
+
+    def __init__(self, capacity: int, name: str | None = None):
+        """Create a new table, or attach to an existing one.
+
+        Args:
+            capacity (int): Number of slots.
+            name (str | None): Name of the shared memory block to attach to, None creates one.
+        """
+        self.capacity = capacity
+        size = capacity * (8 + 8 + 4 + 1)
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.owner = name is None
+        buffer = self.memory.buf
+        # Doubles first keeps every column aligned
+        self.checked = buffer[:capacity * 8].cast('d')
+        self.rtt = buffer[capacity * 8:capacity * 16].cast('d')
+        self.seq = buffer[capacity * 16:capacity * 20].cast('I')
+        self.status = buffer[capacity * 20:capacity * 21].cast('b')
+        self._seen = array('I', bytes(4 * capacity))
+
+    @property
+    def name(self) -> str:
+        """Return the name of the shared memory block."""
+        return self.memory.name
+
+    def write(self, slot: int, rtt: float | None, checked: float | None = None, resolved: bool = True):
+        """Publish a probe result (worker side).
+
+        Args:
+            slot (int): The node's slot.
+            rtt (float | None): The round-trip time in seconds, None if the probe failed.
+            checked (float | None): Epoch time of the check, defaults to now.
+            resolved (bool): False if the node's hostname did not resolve and nothing was probed.
+        """
+        # Forcing the counter odd, rather than incrementing it, keeps it from getting
+        # stuck odd if the previous and next owner overlap while a node is moved
+        seq = self.seq[slot] | 1
+        self.seq[slot] = seq
+        self.checked[slot] = time.time() if checked is None else checked
+        self.rtt[slot] = math.nan if rtt is None else rtt
+        self.status[slot] = UNRESOLVED if not resolved else OFFLINE if rtt is None else ONLINE
+        self.seq[slot] = (seq + 1) & 0xFFFFFFFF
+
+    def changes(self) -> list[tuple[int, float | None, float, bool]]:
+        """Return the results published since the last call (reader side).
+
+        Returns:
+            list[tuple[int, float | None, float, bool]]: ``(slot, rtt, checked, resolved)`` per new result.
+        """
+        seq, seen = self.seq, self._seen
+        changed = [slot for slot, (current, last) in enumerate(zip(seq, seen)) if current != last]
+        results = []
+        for slot in changed:
+            before = seq[slot]
+            if before & 1:
+                continue  # Being written, picked up on the next scan
+            rtt, checked, status = self.rtt[slot], self.checked[slot], self.status[slot]
+            if seq[slot] != before:
+                continue
+            seen[slot] = before
+            results.append((slot, None if math.isnan(rtt) else rtt, checked, status != UNRESOLVED))
+        return results
+
+    def forget(self, slot: int):
+        """Reset the reader's view of a slot that is being reassigned."""
+        self._seen[slot] = self.seq[slot]
+
+    def close(self):
+        """Detach from the table, destroying it if this side created it."""
+        for view in (self.checked, self.rtt, self.seq, self.status):
+            view.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def _worker_main(table_name: str, capacity: int, conn, options: dict):
+    """Entry point of a probe worker process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor decides when workers stop
+    asyncio.run(_run_worker(SharedStatusTable(capacity, table_name), conn, options))
+
+
+async def _run_worker(table: SharedStatusTable, conn, options: dict):
+    """Probe a shard of nodes and publish the results into the shared table.
+
+    Args:
+        table (SharedStatusTable): The attached shared table.
+        conn (Connection): Pipe carrying shard changes from the supervisor.
+        options (dict): Keyword arguments for the worker's ProbeScheduler.
+    """
+    from network.checker import probe_node
+    from network.resolver import ResolutionError
+
+    slots: dict[str, int] = {}
+
+    async def check(node: NodeData) -> bool:
+        try:
+            rtt, resolved = await probe_node(node), True
+        except ResolutionError:
+            rtt, resolved = None, False
+        slot = slots.get(node.ip)
+        if slot is not None:
+            table.write(slot, rtt, resolved=resolved)
+        return rtt is not None
+
+    scheduler = ProbeScheduler(check, **options)
+    scheduler.start()
+    try:
+        while True:
+            while conn.poll():
+                command, payload = conn.recv()
+                if command == "stop":
+                    return
+                if command == "add":
+                    for slot, ip, device_type, check, suppressed in payload:
+                        slots[ip] = slot
+                        scheduler.add(NodeData(ip, device_type, check=check))
+                        if suppressed:
+                            scheduler.suppress(ip)
+                elif command == "remove":
+                    released = []
+                    for ip in payload:
+                        scheduler.remove(ip)
+                        slot = slots.pop(ip, None)
+                        if slot is not None:
+                            released.append(slot)
+                    # Nothing is written to these slots any more, the supervisor may reuse them
+                    conn.send(("removed", released))
+                elif command == "retype":
+                    for ip, device_type, check in payload:
+                        entry = scheduler.entries.get(ip)
+                        if entry is not None:
+                            entry.node.device_type = device_type
+                            entry.node.check = check
+                            scheduler.retype(entry.node)
+                elif command in ("suppress", "resume"):
+                    for ip in payload:
+                        getattr(scheduler, command)(ip)
+                elif command == "passive":
+                    for ip, confirmed in payload:
+                        scheduler.set_passive(ip, confirmed)
+            await asyncio.sleep(COMMAND_POLL)
+    except (EOFError, OSError):
+        pass  # The supervisor went away
+    finally:
+        scheduler.stop()
+        table.close()
+
+
+class _Worker:
+    """Supervisor-side state of one worker process."""
+
+    def __init__(self, index: int):
+        """Initialize the worker record.
+
+        Args:
+            index (int): The worker's index.
+        """
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.nodes: set[str] = set()
+        self.pending: dict[str, list] = {}
+        self.draining: set[int] = set()  # Freed slots the worker may still write to
+        self.started = 0.0
+
+    def send(self, command: str, item):
+        """Queue a command item, sent in one batch on the next flush."""
+        self.pending.setdefault(command, []).append(item)
+
+    def flush(self):
+        """Send the queued command batches."""
+        for command, items in self.pending.items():
+            try:
+                self.conn.send((command, items))
+            except (BrokenPipeError, OSError):
+                break  # The worker died, its shard is resent on restart
+        self.pending.clear()
+
+    def released(self) -> list[int]:
+        """Return the draining slots the worker acknowledged it no longer writes to."""
+        slots = []
+        try:
+            while self.conn.poll():
+                command, payload = self.conn.recv()
+                if command == "removed":
+                    slots.extend(slot for slot in payload if slot in self.draining)
+        except (EOFError, OSError):
+            pass  # The worker died, its slots are released on restart
+        self.draining.difference_update(slots)
+        return slots
+
+
+def _reap(process: multiprocessing.Process):
+    """Wait for a stopped worker process to exit, killing it if it does not."""
+    process.join(timeout=2)
+    if process.is_alive():
+        process.terminate()
+        process.join(timeout=1)
+
+
+class ShardedScheduler(SchedulerControl):
+    """Probe scheduler spreading nodes across worker processes.
+
+    Drop-in replacement for ProbeScheduler's control interface, except that
+    due times and failure counts live in the workers and are not saved. Each worker
+    runs its own ProbeScheduler over a shard of the nodes and publishes
+    results into a SharedStatusTable. A collector task on the front end's
+    loop scans the table and hands new results to ``record``. Only shard
+    changes travel over the command pipes, never results. Dead workers are
+    restarted with their shard, and shards are rebalanced when the node set
+    changes. A removed node's slot is only reused once its worker confirmed
+    the removal, so a result still in flight cannot land on the next node.
+    """
+
+    def __init__(self, record: Callable[[NodeData, float | None, float, bool], None], workers: int | None = None, **options):
+        """Initialize the scheduler.
+
+        Args:
+            record (Callable[[NodeData, float | None, float, bool], None]): Called with the node, its RTT
+                (None if the probe failed), the check time and whether its name resolved for every result.
+            workers (int | None): Number of worker processes, defaults to the CPU count.
+            **options: Keyword arguments for each worker's ProbeScheduler.
+        """
+        self.record = record
+        self.options = options
+        self.workers = [_Worker(index) for index in range(max(1, workers or os.cpu_count() or 1))]
+        self.table = None
+        self.nodes: dict[str, NodeData] = {}
+        self.slots: dict[str, int] = {}
+        self.owner: dict[str, _Worker] = {}
+        self.suppressed: set[str] = set()
+        self._slot_nodes: list[NodeData | None] = []
+        self._free: list[int] = []
+        self._unbalanced = False
+        self._task = None
+        self._context = multiprocessing.get_context("spawn")  # Forking a Qt process is unsafe
+
+    def _least_loaded(self) -> _Worker:
+        """Return the worker with the smallest shard."""
+        return min(self.workers, key=lambda worker: len(worker.nodes))
+
+    def _assign(self, worker: _Worker, ip: str):
+        """Hand a node to a worker."""
+        node = self.nodes[ip]
+        worker.nodes.add(ip)
+        self.owner[ip] = worker
+        worker.send("add", (self.slots[ip], ip, node.device_type, node.check, ip in self.suppressed))
+
+    def add(self, node: NodeData, interval: float | None = None, delay: float | None = None):
+        """Start probing a node on the least loaded worker."""
+        self.remove(node.ip)
+        slot = self._free.pop() if self._free else len(self._slot_nodes)
+        if slot == len(self._slot_nodes):
+            self._slot_nodes.append(None)
+        self._slot_nodes[slot] = node
+        self.nodes[node.ip] = node
+        self.slots[node.ip] = slot
+        if self.table is not None:
+            if slot >= self.table.capacity:
+                self._grow()
+                return
+            self.table.forget(slot)
+        self._assign(self._least_loaded(), node.ip)
+
+    def remove(self, ip: str):
+        """Stop probing a node."""
+        if ip not in self.nodes:
+            return
+        worker = self.owner.pop(ip)
+        worker.nodes.discard(ip)
+        worker.send("remove", ip)
+        slot = self.slots.pop(ip)
+        self._slot_nodes[slot] = None
+        if worker.process is None:
+            self._free.append(slot)
+        else:
+            worker.draining.add(slot)
+        del self.nodes[ip]
+        self.suppressed.discard(ip)
+        self._unbalanced = True
+
+    def retype(self, node: NodeData):
+        """Pick up a node's new device type interval and check."""
+        if node.ip in self.owner:
+            self.owner[node.ip].send("retype", (node.ip, node.device_type, node.check))
+
+    def suppress(self, ip: str):
+        """Probe a node at the suppressed rate."""
+        if ip in self.owner and ip not in self.suppressed:
+            self.suppressed.add(ip)
+            self.owner[ip].send("suppress", ip)
+
+    def resume(self, ip: str):
+        """Return a suppressed node to its normal rate."""
+        if ip in self.suppressed:
+            self.suppressed.discard(ip)
+            self.owner[ip].send("resume", ip)
+
+    def set_passive(self, ip: str, confirmed: bool):
+        """Stretch a node's interval while the neighbour table confirms it is alive."""
+        if ip in self.owner:
+            self.owner[ip].send("passive", (ip, confirmed))
+
+    def _spawn(self, worker: _Worker):
+        """Start a worker process and send it its whole shard."""
+        parent, child = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=_worker_main, args=(self.table.name, self.table.capacity, child, self.options),
+            name=f"probe-worker-{worker.index}", daemon=True,
+        )
+        worker.process.start()
+        child.close()
+        worker.conn = parent
+        worker.started = time.monotonic()
+        worker.pending.clear()
+        # The new process never held the old one's nodes
+        self._free.extend(worker.draining)
+        worker.draining.clear()
+        for ip in worker.nodes:
+            node = self.nodes[ip]
+            worker.send("add", (self.slots[ip], ip, node.device_type, node.check, ip in self.suppressed))
+        worker.flush()
+
+    def _shutdown(self, worker: _Worker):
+        """Stop a worker process, waiting for it to exit on a separate thread."""
+        if worker.process is None:
+            return
+        try:
+            worker.conn.send(("stop", None))
+        except (BrokenPipeError, OSError):
+            pass
+        threading.Thread(target=_reap, args=(worker.process,), name=f"reap-{worker.process.name}", daemon=True).start()
+        worker.conn.close()
+        worker.process = None
+
+    def _grow(self):
+        """Move to a larger shared table, restarting the workers on it."""
+        for worker in self.workers:
+            self._shutdown(worker)
+        self.table.close()
+        self.table = SharedStatusTable(max(MIN_CAPACITY, 2 * len(self._slot_nodes)))
+        logger.info(f"Shared status table grown to {self.table.capacity} slots")
+        for ip in self.nodes:
+            if ip not in self.owner:
+                target = self._least_loaded()
+                target.nodes.add(ip)
+                self.owner[ip] = target
+        for worker in self.workers:
+            self._spawn(worker)
+
+    def rebalance(self):
+        """Move nodes from oversized shards to undersized ones."""
+        self._unbalanced = False
+        mean = len(self.nodes) / len(self.workers)
+        limit = math.ceil(mean * (1 + REBALANCE_SLACK))
+        for worker in self.workers:
+            excess = len(worker.nodes) - limit
+            for ip in list(worker.nodes)[:max(0, excess)]:
+                target = self._least_loaded()
+                if len(target.nodes) + 1 >= len(worker.nodes):
+                    break
+                worker.nodes.discard(ip)
+                worker.send("remove", ip)
+                self._assign(target, ip)
+        logger.debug(f"Shard sizes: {[len(worker.nodes) for worker in self.workers]}")
+
+    def supervise(self):
+        """Restart workers that died."""
+        for worker in self.workers:
+            if worker.process is None or worker.process.is_alive():
+                continue
+            if time.monotonic() - worker.started < RESTART_DELAY:
+                continue  # Crash looping, wait before trying again
+            logger.error(f"Probe worker {worker.index} exited with code {worker.process.exitcode}, restarting it")
+            worker.conn.close()
+            self._spawn(worker)
+
+    def collect(self):
+        """Send queued shard changes, supervise the workers and record new results."""
+        if self._unbalanced:
+            self.rebalance()
+        for worker in self.workers:
+            worker.flush()
+            self._free.extend(worker.released())
+        self.supervise()
+        for slot, rtt, checked, resolved in self.table.changes():
+            node = self._slot_nodes[slot] if slot < len(self._slot_nodes) else None
+            if node is not None:
+                self.record(node, rtt, checked, resolved)
+
+    async def _collector(self):
+        """Collect results on the front end's loop."""
+        while True:
+            await asyncio.sleep(COLLECT_INTERVAL)
+            try:
+                self.collect()
+            except Exception as e:
+                logger.error(f"Error collecting probe results: {e}")
+
+    def start(self):
+        """Start the worker processes and the collector on the running loop."""
+        self.table = SharedStatusTable(max(MIN_CAPACITY, 2 * len(self._slot_nodes)))
+        for worker in self.workers:
+            self._spawn(worker)
+        self._task = asyncio.get_running_loop().create_task(self._collector())
+        logger.info(f"Sharded scheduler started with {len(self.nodes)} nodes on {len(self.workers)} workers")
+
+    def stop(self):
+        """Stop the collector and the workers, and release the shared table."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for worker in self.workers:
+            self._shutdown(worker)
+        if self.table is not None:
+            self.table.close()
+            self.table = None
@@ -0,0 +1,65 @@
+import asyncio
+import random
+
+
+class SimulatedProber:
+    """Stand-in for ``network.checker.probe`` that sends no packets.
+
+    Answers after a random latency, drops a fraction of probes, keeps a
+    fraction of hosts down and lets hosts flap between up and down, so agents,
+    collectors, schedulers and views can be exercised on one machine.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        jitter: float = 0.5,
+        loss: float = 0.0,
+        down: float = 0.0,
+        flap: float = 0.0,
+        seed: int | None = None,
+    ):
+        """Initialize the prober.
+
+        Args:
+            latency (float): Mean round-trip time in seconds.
+            jitter (float): Random spread of the round-trip time, as a fraction of the latency.
+            loss (float): Probability that a probe of an up host fails anyway.
+            down (float): Fraction of hosts that start out down.
+            flap (float): Probability per probe that a host switches between up and down.
+            seed (int | None): Seed for reproducible runs.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.down = down
+        self.flap = flap
+        self.random = random.Random(seed)
+        self.hosts_down: dict[str, bool] = {}
+        self.probes = 0  # Completed probes
+
+    def is_down(self, host: str) -> bool:
+        """Return whether a host is currently down, flapping it first."""
+        down = self.hosts_down.get(host)
+        if down is None:
+            down = self.random.random() < self.down
+        if self.flap and self.random.random() < self.flap:
+            down = not down
+        self.hosts_down[host] = down
+        return down
+
+    async def __call__(self, host: str) -> float | None:
+        """Probe a host.
+
+        Args:
+            host (str): The IP address or hostname to probe.
+
+        Returns:
+            float | None: The simulated round-trip time in seconds, or None if the host is down or the probe was lost.
+        """
+        rtt = self.latency * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+        await asyncio.sleep(rtt)
+        self.probes += 1
+        if self.is_down(host) or self.random.random() < self.loss:
+            return None
+        return rtt
@@ -0,0 +1,219 @@
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+import numpy as np
+from network.logger import LOG_DIR
+from network.stats import LatencyStats, NUM_BUCKETS
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = 'state.snapshot'
+STATE_PATH = os.path.join(LOG_DIR, SNAPSHOT_FILE)
+SNAPSHOT_INTERVAL = 60.0  # Seconds between periodic snapshots
+MAGIC = b'NMSS'
+VERSION = 1
+
+# Magic, version, save time, then the node, bucket and position counts and the byte sizes of the two name blobs
+HEADER = struct.Struct('<4sIdIIIII')
+
+NODE = np.dtype([
+    ('status', 'u1'),
+    ('pad', 'V1'),
+    ('failures', '<u2'),  # Consecutive failed probes, drives the scheduler's backoff
+    ('sent', '<u4'),
+    ('lost', '<u4'),
+    ('total', '<u4'),
+    ('checked', '<f8'),  # Epoch time of the last check, 0 for never
+    ('due', '<f8'),  # Epoch time of the next probe, NaN if unknown
+    ('interval', '<f8'),  # Probe interval in effect for the next probe, NaN if unknown
+    ('mean', '<f8'),  # NaN for no reply yet
+    ('jitter', '<f8'),
+    ('last', '<f8'),  # NaN for no reply yet
+])
+
+# Non-empty RTT histogram buckets, most nodes only use a few dozen of them
+BUCKET = np.dtype([('row', '<u4'), ('bucket', '<u2'), ('pad', 'V2'), ('count', '<u4')])
+
+
+def _aligned(size: int) -> int:
+    """Round a section size up to 8 bytes, keeping every section aligned."""
+    return -(-size // 8) * 8
+
+
+def _optional(value: float | None) -> float:
+    """Return a value for a float column, NaN for None."""
+    return math.nan if value is None else value
+
+
+class Snapshot:
+    """A state snapshot read from disk.
+
+    The file is memory-mapped and its sections are used in place as numpy
+    arrays, so loading does not parse or copy anything up front. Call
+    ``close`` once the state has been applied.
+    """
+
+    def __init__(self, path: str):
+        """Map a snapshot file.
+
+        Args:
+            path (str): The snapshot file.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If it is not a snapshot of this version, or is truncated.
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+
+    def _parse(self):
+        """Locate the sections."""
+        buffer = self._map
+        if len(buffer) < HEADER.size:
+            raise ValueError("Truncated snapshot")
+        magic, version, saved, nodes, buckets, names_size, positions, keys_size = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Not a snapshot")
+        if version != VERSION:
+            raise ValueError(f"Snapshot version {version}, expected {VERSION}")
+        self.saved = saved
+        offset = _aligned(HEADER.size)
+        sizes = (nodes * NODE.itemsize, buckets * BUCKET.itemsize, names_size, positions * 8, keys_size)
+        if offset + sum(_aligned(size) for size in sizes) > len(buffer):
+            raise ValueError("Truncated snapshot")
+        self.nodes = np.frombuffer(buffer, NODE, nodes, offset)
+        offset += _aligned(sizes[0])
+        self.buckets = np.frombuffer(buffer, BUCKET, buckets, offset)
+        offset += _aligned(sizes[1])
+        self.ips = bytes(buffer[offset:offset + names_size]).decode().split('\n') if nodes else []
+        offset += _aligned(sizes[2])
+        self.xy = np.frombuffer(buffer, np.float32, positions * 2, offset).reshape(-1, 2)
+        offset += _aligned(sizes[3])
+        self.keys = bytes(buffer[offset:offset + keys_size]).decode().split('\n') if positions else []
+        if len(self.ips) != nodes or len(self.keys) != positions:
+            raise ValueError("Corrupt snapshot names")
+        self.rows = {ip: row for row, ip in enumerate(self.ips)}
+        self._bucket_starts = np.searchsorted(self.buckets['row'], np.arange(nodes + 1)).tolist()
+        self._bucket_ids = self.buckets['bucket'].tolist()
+        self._bucket_counts = self.buckets['count'].tolist()
+        self._columns: dict[str, list] = {}  # Node fields as lists, converted on first use
+
+    def column(self, name: str) -> list:
+        """Return a node field as a list, which is far cheaper to index row by row than the array."""
+        if name not in self._columns:
+            self._columns[name] = self.nodes[name].tolist()
+        return self._columns[name]
+
+    def stats(self, row: int) -> LatencyStats:
+        """Return the latency statistics of a node row."""
+        stats = LatencyStats()
+        stats.sent, stats.lost, stats.total = self.column('sent')[row], self.column('lost')[row], self.column('total')[row]
+        mean, last = self.column('mean')[row], self.column('last')[row]
+        stats.mean = None if math.isnan(mean) else mean
+        stats.jitter = self.column('jitter')[row]
+        stats.last = None if math.isnan(last) else last
+        start, end = self._bucket_starts[row], self._bucket_starts[row + 1]
+        if end > start:
+            stats.counts = array('I', bytes(4 * NUM_BUCKETS))
+            for bucket, count in zip(self._bucket_ids[start:end], self._bucket_counts[start:end]):
+                stats.counts[bucket] = count
+        return stats
+
+    def positions(self) -> dict[str, tuple[float, float]]:
+        """Return the map layout positions by node address and cluster key."""
+        return dict(zip(self.keys, map(tuple, self.xy.tolist())))
+
+    def close(self):
+        """Unmap the file."""
+        self.nodes = self.buckets = self.xy = self._columns = None  # Views must go before the map closes
+        self._map.close()
+
+
+def load_snapshot(path: str) -> Snapshot | None:
+    """Map a snapshot, None if there is none or it cannot be used.
+
+    Args:
+        path (str): The snapshot file.
+
+    Returns:
+        Snapshot | None: The snapshot.
+    """
+    try:
+        snapshot = Snapshot(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring state snapshot {path}: {e}")
+        return None
+    logger.info(f"Loaded state of {len(snapshot.ips)} nodes saved at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.saved))}")
+    return snapshot
+
+
+def save_snapshot(
+    path: str,
+    ips: list[str],
+    status: list[int],
+    checked: list[float],
+    stats: list[LatencyStats],
+    schedule: dict[str, tuple[float, float, int]],
+    positions: dict[str, tuple[float, float]] | None = None,
+):
+    """Write a snapshot, replacing the previous one atomically.
+
+    Args:
+        path (str): The snapshot file.
+        ips (list[str]): Node addresses in row order.
+        status (list[int]): Status code per row.
+        checked (list[float]): Epoch time of the last check per row, 0 for never.
+        stats (list[LatencyStats]): Latency statistics per row.
+        schedule (dict[str, tuple[float, float, int]]): Epoch time of the next probe, the interval and the
+            consecutive failed probes of each scheduled node.
+        positions (dict[str, tuple[float, float]] | None): Map layout positions by node address and cluster key.
+    """
+    nodes = np.zeros(len(ips), dtype=NODE)
+    nodes['status'] = status
+    nodes['checked'] = checked
+    plan = [schedule.get(ip, (math.nan, math.nan, 0)) for ip in ips]
+    nodes['due'] = [due for due, _, _ in plan]
+    nodes['interval'] = [interval for _, interval, _ in plan]
+    nodes['failures'] = [min(failures, 0xFFFF) for _, _, failures in plan]
+    nodes['sent'] = [s.sent for s in stats]
+    nodes['lost'] = [s.lost for s in stats]
+    nodes['total'] = [s.total for s in stats]
+    nodes['mean'] = [_optional(s.mean) for s in stats]
+    nodes['jitter'] = [s.jitter for s in stats]
+    nodes['last'] = [_optional(s.last) for s in stats]
+
+    # One matrix of every histogram in use, its non-zero cells become the bucket records
+    used = [row for row, s in enumerate(stats) if s.counts is not None]
+    counts = np.frombuffer(b''.join(stats[row].counts for row in used), dtype=np.uint32).reshape(len(used), NUM_BUCKETS)
+    index, bucket_ids = np.nonzero(counts)
+    buckets = np.zeros(len(index), dtype=BUCKET)
+    buckets['row'] = np.asarray(used, dtype=np.uint32)[index]
+    buckets['bucket'] = bucket_ids
+    buckets['count'] = counts[index, bucket_ids]
+
+    positions = positions or {}
+    names = '\n'.join(ips).encode()
+    keys = '\n'.join(positions).encode()
+    xy = np.array(list(positions.values()), dtype=np.float32).reshape(-1, 2)
+    header = HEADER.pack(MAGIC, VERSION, time.time(), len(ips), len(buckets), len(names), len(positions), len(keys))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        for section in (header, nodes.tobytes(), buckets.tobytes(), names, xy.tobytes(), keys):
+            f.write(section)
+            f.write(bytes(_aligned(len(section)) - len(section)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
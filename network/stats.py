@@ -0,0 +1,194 @@
+import math
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+MIN_RTT = 10e-6  # Smallest distinguishable RTT, 10 microseconds
+MAX_RTT = 10.0  # Largest tracked RTT, everything above lands in the last bucket
+PRECISION = 1.04  # Bucket width as a ratio, i.e. quantiles are within ~2%
+LOG_PRECISION = math.log(PRECISION)
+NUM_BUCKETS = int(math.log(MAX_RTT / MIN_RTT) / LOG_PRECISION) + 1
+
+DEFAULT_WINDOW = 720  # Samples before old ones start to decay, one hour at 5 seconds
+DEGRADED_LOSS = 5.0  # Loss percentage above which an up node counts as degraded
+DEGRADED_RTT = 0.2  # p95 RTT in seconds above which an up node counts as degraded
+
+
+def bucket_index(rtt: float) -> int:
+    """Return the histogram bucket for an RTT.
+
+    Args:
+        rtt (float): The round-trip time in seconds.
+
+    Returns:
+        int: The bucket index.
+    """
+    if rtt <= MIN_RTT:
+        return 0
+    return min(int(math.log(rtt / MIN_RTT) / LOG_PRECISION), NUM_BUCKETS - 1)
+
+
+def bucket_value(index: int) -> float:
+    """Return the representative RTT of a bucket, its geometric midpoint."""
+    return MIN_RTT * PRECISION ** (index + 0.5)
+
+
+class LatencyStats:
+    """Constant-memory rolling latency and loss statistics for one node.
+
+    RTTs go into a log-linear histogram (HDR style) with a fixed number of
+    buckets. Once a window's worth of samples has been recorded, every count
+    is halved, so old samples decay away and memory never grows. Mean and
+    jitter are exponentially smoothed. The cumulative counts quantiles are
+    read from are kept until the next reply changes the histogram.
+    """
+
+    __slots__ = ('window', 'counts', 'total', 'sent', 'lost', 'mean', 'jitter', 'last', '_cumulative')
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        """Initialize empty statistics.
+
+        Args:
+            window (int): Number of samples after which older samples decay.
+        """
+        self.window = window
+        self.counts = None  # Allocated on the first reply
+        self.total = 0
+        self.sent = 0
+        self.lost = 0
+        self.mean = None
+        self.jitter = 0.0
+        self.last = None
+        self._cumulative = None
+
+    def record(self, rtt: float | None):
+        """Record one probe result.
+
+        Args:
+            rtt (float | None): The round-trip time in seconds, or None if the probe was lost.
+        """
+        self.sent += 1
+        if rtt is None:
+            self.lost += 1
+        else:
+            if self.counts is None:
+                self.counts = array('I', bytes(4 * NUM_BUCKETS))
+            self.counts[bucket_index(rtt)] += 1
+            self.total += 1
+            self._cumulative = None
+            if self.mean is None:
+                self.mean = rtt
+            else:
+                self.mean += (rtt - self.mean) / 16
+            if self.last is not None:
+                # RFC 3550 interarrival jitter estimator
+                self.jitter += (abs(rtt - self.last) - self.jitter) / 16
+            self.last = rtt
+
+        if self.sent >= self.window:
+            self._decay()
+
+    def _decay(self):
+        """Halve every count so older samples lose weight."""
+        self.sent //= 2
+        self.lost //= 2
+        if self.counts is not None:
+            for index, count in enumerate(self.counts):
+                if count:
+                    self.counts[index] = count // 2
+            self.total = sum(self.counts)
+            self._cumulative = None
+
+    @property
+    def loss(self) -> float | None:
+        """Return the loss percentage, or None before the first probe."""
+        if not self.sent:
+            return None
+        return 100.0 * self.lost / self.sent
+
+    def quantile(self, q: float) -> float | None:
+        """Return an RTT quantile.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float | None: The RTT in seconds, or None before the first reply.
+        """
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs: tuple[float, ...] = (0.5, 0.95, 0.99)) -> list[float | None]:
+        """Return several RTT quantiles from one cumulative pass over the histogram.
+
+        Args:
+            qs (tuple[float, ...]): Quantiles, between 0 and 1.
+
+        Returns:
+            list[float | None]: The RTTs in seconds, None before the first reply.
+        """
+        if not self.total:
+            return [None] * len(qs)
+        if self._cumulative is None:
+            self._cumulative = list(accumulate(self.counts))
+        cumulative = self._cumulative
+        last = NUM_BUCKETS - 1
+        return [bucket_value(min(bisect_right(cumulative, q * (self.total - 1)), last)) for q in qs]
+
+    def is_degraded(self, loss: float = DEGRADED_LOSS, rtt: float = DEGRADED_RTT) -> bool:
+        """Return whether the node shows noticeable loss or high latency.
+
+        Args:
+            loss (float): Loss percentage threshold.
+            rtt (float): p95 RTT threshold in seconds.
+
+        Returns:
+            bool: True if either threshold is exceeded.
+        """
+        if (self.loss or 0.0) > loss:
+            return True
+        p95 = self.quantile(0.95)
+        return p95 is not None and p95 > rtt
+
+
+class StatsSummary:
+    """Read-only stand-in for LatencyStats built from published figures.
+
+    Viewers of another monitor's status feed get each node's loss, mean,
+    jitter and quantiles rather than its histogram. This answers the same
+    questions the views ask a LatencyStats, for the published quantiles.
+    """
+
+    __slots__ = ('loss', 'mean', 'jitter', 'total', '_quantiles')
+
+    def __init__(
+        self,
+        loss: float | None = None,
+        mean: float | None = None,
+        jitter: float = 0.0,
+        total: int = 0,
+        quantiles: dict[float, float | None] | None = None,
+    ):
+        """Initialize the summary.
+
+        Args:
+            loss (float | None): Loss percentage, None before the first probe.
+            mean (float | None): Smoothed mean RTT in seconds, None before the first reply.
+            jitter (float): Smoothed jitter in seconds.
+            total (int): Replies in the histogram.
+            quantiles (dict[float, float | None] | None): RTT in seconds by quantile.
+        """
+        self.loss = loss
+        self.mean = mean
+        self.jitter = jitter
+        self.total = total
+        self._quantiles = quantiles or {}
+
+    def quantile(self, q: float) -> float | None:
+        """Return a published RTT quantile, None if it was not published."""
+        return self._quantiles.get(q)
+
+    def quantiles(self, qs: tuple[float, ...] = (0.5, 0.95, 0.99)) -> list[float | None]:
+        """Return several published RTT quantiles."""
+        return [self._quantiles.get(q) for q in qs]
+
+    is_degraded = LatencyStats.is_degraded
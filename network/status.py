@@ -0,0 +1,215 @@
+import time
+from array import array
+from typing import Iterable
+from network.stats import LatencyStats
+
+CHECKING = 0
+ONLINE = 1
+OFFLINE = 2
+UNREACHABLE = 3  # Cut off behind a down parent, not probed at the normal rate
+UNRESOLVED = 4  # The hostname did not resolve, so the node was not probed
+STATUS_TEXT = ("Checking...", "Online", "Offline", "Unreachable (parent down)", "Unresolved (DNS failure)")
+
+
+def dirty_ranges(rows: list[int]) -> list[tuple[int, int]]:
+    """Collapse sorted row numbers into inclusive contiguous ranges.
+
+    Args:
+        rows (list[int]): Sorted row numbers.
+
+    Returns:
+        list[tuple[int, int]]: ``(first, last)`` pairs covering every row.
+    """
+    ranges = []
+    for row in rows:
+        if ranges and row == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
+
+class StatusStore:
+    """Compact per-node status table.
+
+    Statuses are kept as one byte per node and check times as one double per
+    node, indexed by a dense row number. Updates only mark rows dirty; views
+    collect the dirty rows once per frame with ``take_dirty``. Other readers,
+    such as the status feed, ``subscribe`` to a change set of their own. Rows
+    restored from a state snapshot are stale until their node is probed again.
+    """
+
+    def __init__(self, ips: list[str]):
+        """Initialize the store.
+
+        Args:
+            ips (list[str]): The IP addresses of the nodes, in row order.
+        """
+        self.subscribers: list[set[int]] = []
+        self.reset(ips)
+
+    def reset(self, ips: list[str]):
+        """Replace every node in the store, resetting them to "Checking...".
+
+        Args:
+            ips (list[str]): The IP addresses of the nodes, in row order.
+        """
+        self.ips = list(ips)
+        self.rows = {ip: row for row, ip in enumerate(self.ips)}
+        self.status = array('b', bytes(len(self.ips)))
+        self.checked = array('d', bytes(8 * len(self.ips)))
+        self.stats = [LatencyStats() for _ in self.ips]
+        self.dirty: set[int] = set()
+        self.stale: set[int] = set()
+        for changed in self.subscribers:
+            changed.clear()  # Rows are renumbered, subscribers notice ``ips`` being replaced
+
+    def subscribe(self) -> set[int]:
+        """Return a set the store adds every changed row to, for the caller to drain.
+
+        The rows are renumbered whenever ``ips`` is replaced, the set is
+        then cleared and the subscriber has to reread every row.
+        """
+        changed: set[int] = set()
+        self.subscribers.append(changed)
+        return changed
+
+    def unsubscribe(self, changed: set[int]):
+        """Stop filling a set returned by ``subscribe``."""
+        self.subscribers = [s for s in self.subscribers if s is not changed]
+
+    def _touch(self, row: int):
+        """Mark a row dirty for the views and changed for the subscribers."""
+        self.dirty.add(row)
+        for changed in self.subscribers:
+            changed.add(row)
+
+    def __len__(self) -> int:
+        """Return the number of nodes in the store."""
+        return len(self.ips)
+
+    def apply(self, removed: Iterable[str], added: list[str]) -> list[int]:
+        """Remove and add nodes, keeping the state of every other node.
+
+        Surviving rows are compacted in their current order and the added
+        nodes are appended after them as "Checking...".
+
+        Args:
+            removed (Iterable[str]): The IP addresses of the nodes to drop.
+            added (list[str]): The IP addresses of the new nodes.
+
+        Returns:
+            list[int]: The previous row of each surviving row, in new row order.
+        """
+        removed = set(removed)
+        keep = [row for row, ip in enumerate(self.ips) if ip not in removed]
+        position = {old: new for new, old in enumerate(keep)}
+        self.ips = [self.ips[row] for row in keep] + list(added)
+        self.rows = {ip: row for row, ip in enumerate(self.ips)}
+        self.status = array('b', [self.status[row] for row in keep] + [CHECKING] * len(added))
+        self.checked = array('d', [self.checked[row] for row in keep] + [0.0] * len(added))
+        self.stats = [self.stats[row] for row in keep] + [LatencyStats() for _ in added]
+        self.dirty = {position[row] for row in self.dirty if row in position}
+        self.stale = {position[row] for row in self.stale if row in position}
+        for changed in self.subscribers:
+            changed.clear()
+        return keep
+
+    def update(
+        self, ip: str, is_online: bool, checked: float | None = None, rtt: float | None = None, sample: bool = True
+    ) -> int | None:
+        """Record a probe result for a node and mark its row dirty.
+
+        Args:
+            ip (str): The IP address of the node.
+            is_online (bool): Whether the probe succeeded.
+            checked (float | None): Epoch time of the check, defaults to now.
+            rtt (float | None): The round-trip time in seconds, if the probe succeeded.
+            sample (bool): False if nothing was probed, so the latency statistics are left alone.
+
+        Returns:
+            int | None: The previous status code, or None if the node is unknown.
+        """
+        row = self.rows.get(ip)
+        if row is None:
+            return None
+        previous = self.status[row]
+        self.status[row] = ONLINE if is_online else OFFLINE
+        self.checked[row] = time.time() if checked is None else checked
+        if sample:
+            self.stats[row].record(rtt if is_online else None)
+        self._touch(row)
+        self.stale.discard(row)
+        return previous
+
+    def mark(self, ip: str, status: int, checked: float | None = None, stats=None) -> int | None:
+        """Set a node's status code without recording a probe result.
+
+        Args:
+            ip (str): The IP address of the node.
+            status (int): The new status code.
+            checked (float | None): Epoch time of the check that found it, if any.
+            stats (LatencyStats | StatsSummary | None): Statistics replacing the node's own, if any.
+
+        Returns:
+            int | None: The previous status code, or None if the node is unknown.
+        """
+        row = self.rows.get(ip)
+        if row is None:
+            return None
+        previous = self.status[row]
+        self.status[row] = status
+        if checked is not None:
+            self.checked[row] = checked
+        if stats is not None:
+            self.stats[row] = stats
+        self._touch(row)
+        self.stale.discard(row)
+        return previous
+
+    def restore(self, ip: str, status: int, checked: float = 0.0, stats: LatencyStats | None = None):
+        """Show a node's last-known state, marked stale until its next result.
+
+        Args:
+            ip (str): The IP address of the node.
+            status (int): The last-known status code.
+            checked (float): Epoch time of the last check, 0 for never.
+            stats (LatencyStats | None): The last-known latency statistics, kept if None.
+        """
+        row = self.rows.get(ip)
+        if row is None:
+            return
+        self.status[row] = status
+        if checked:
+            self.checked[row] = checked
+        if stats is not None:
+            self.stats[row] = stats
+        self._touch(row)
+        self.stale.add(row)
+
+    def status_text(self, row: int) -> str:
+        """Return the display text of a row's status."""
+        if row in self.stale:
+            return f"{STATUS_TEXT[self.status[row]]} (last known)"
+        return STATUS_TEXT[self.status[row]]
+
+    def checked_text(self, row: int) -> str:
+        """Return the display text of a row's last check time."""
+        checked = self.checked[row]
+        return time.strftime("%H:%M:%S", time.localtime(checked)) if checked else "-"
+
+    def is_online(self, ip: str) -> bool:
+        """Return whether the last probe of a node succeeded."""
+        row = self.rows.get(ip)
+        return row is not None and self.status[row] == ONLINE
+
+    def is_degraded(self, ip: str) -> bool:
+        """Return whether a node is up but showing loss or high latency."""
+        row = self.rows.get(ip)
+        return row is not None and self.status[row] == ONLINE and self.stats[row].is_degraded()
+
+    def take_dirty(self) -> list[int]:
+        """Return the sorted dirty rows and clear the dirty set."""
+        rows = sorted(self.dirty)
+        self.dirty.clear()
+        return rows
@@ -0,0 +1,145 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+from typing import Callable
+
+# Initialize a logger for this module
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2.0  # Seconds between mtime checks when inotify is unavailable
+DEBOUNCE = 0.3  # Seconds to wait for a burst of writes to settle
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def file_signature(path: str) -> tuple[int, int] | None:
+    """Return the modification time and size of a file, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _open_inotify(directory: str) -> int | None:
+    """Return an inotify descriptor watching a directory, or None if inotify is unavailable."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    # Watch the directory, editors often save by renaming a new file over the old one
+    mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher:
+    """Calls back when a file changes on disk.
+
+    Uses inotify where available and falls back to polling the file's mtime
+    and size. Bursts of writes are debounced into a single callback, and the
+    callback only fires if the file's signature actually changed.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], None], interval: float = POLL_INTERVAL, debounce: float = DEBOUNCE):
+        """Initialize the watcher.
+
+        Args:
+            path (str): The file to watch.
+            on_change (Callable[[], None]): Called on the event loop after the file changed.
+            interval (float): Polling interval in seconds when inotify is unavailable.
+            debounce (float): Quiet time in seconds before a change is reported.
+        """
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.backend = None
+        self.signature = file_signature(self.path)
+        self._loop = None
+        self._fd = None
+        self._task = None
+        self._pending = None
+
+    def start(self):
+        """Start watching on the running loop."""
+        loop = self._loop = asyncio.get_running_loop()
+        self._fd = _open_inotify(os.path.dirname(self.path))
+        if self._fd is not None:
+            try:
+                loop.add_reader(self._fd, self._read_events)
+                self.backend = "inotify"
+            except NotImplementedError:
+                os.close(self._fd)
+                self._fd = None
+        if self._fd is None:
+            self._task = loop.create_task(self._poll())
+            self.backend = "poll"
+        logger.info(f"Watching {self.path} for changes ({self.backend})")
+
+    def stop(self):
+        """Stop watching."""
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+    def _read_events(self):
+        """Drain the inotify descriptor and debounce events about the watched file."""
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        name = os.path.basename(self.path)
+        offset = 0
+        touched = False
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            touched |= data[offset:offset + length].rstrip(b"\0") == os.fsencode(name)
+            offset += length
+        if touched:
+            if self._pending is not None:
+                self._pending.cancel()
+            self._pending = self._loop.call_later(self.debounce, self._check)
+
+    async def _poll(self):
+        """Periodically compare the file's signature."""
+        while True:
+            await asyncio.sleep(self.interval)
+            if file_signature(self.path) != self.signature:
+                await asyncio.sleep(self.debounce)  # Let the writer finish
+                self._check()
+
+    def _check(self):
+        """Report a change if the file's signature differs from the last one seen."""
+        self._pending = None
+        signature = file_signature(self.path)
+        if signature is None or signature == self.signature:
+            return  # Missing mid-save, or touched without changes
+        self.signature = signature
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Error reloading {self.path}: {e}")
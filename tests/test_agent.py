@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+import pytest
+
+import network.agent
+from network.agent import ProbeAgent
+from network.collector import Collector
+from network.monitor import Monitor
+from network.node import NodeData
+from network.protocol import HEADER, UPDATE, decode_update, encode_update
+from network.simulate import SimulatedProber
+from network.status import CHECKING, ONLINE
+
+FAST = {"batch_interval": 0.02, "interval": 0.05, "jitter": 0.0}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def nodes(first: int, count: int) -> list[NodeData]:
+    return [NodeData(f"192.0.2.{index}", "PC") for index in range(first, first + count)]
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+async def listening(collector: Collector) -> int:
+    """Wait for a collector started on port 0 and return the port it got."""
+    await wait_until(lambda: collector._server is not None)
+    return collector._server.sockets[0].getsockname()[1]
+
+
+def decode(data: bytes) -> list:
+    kind, length = HEADER.unpack_from(data)
+    assert kind == UPDATE and length == len(data) - HEADER.size
+    return decode_update(data[HEADER.size:])
+
+
+@pytest.mark.parametrize("results", [
+    [],
+    [(0, 0.0123, 1000.0)],
+    [(5, None, 1000.25), (2, 0.5, 1000.0), (3, None, 1001.5)],  # Unsorted, with failed probes
+    [(0, 1e-6, 1000.0), (200, 0.002, 1000.0), (2**21, 30.0, 1000.0)],  # Multi-byte index deltas
+])
+def test_update_round_trip(results):
+    decoded = decode(encode_update(results))
+    assert [index for index, _, _ in decoded] == sorted(index for index, _, _ in results)
+    for (index, rtt, checked), expected in zip(decoded, sorted(results)):
+        assert (rtt is None) == (expected[1] is None)
+        if rtt is not None:
+            assert rtt == pytest.approx(expected[1], abs=1e-6)
+        assert checked == pytest.approx(expected[2], abs=1e-3)
+
+
+def test_several_agents_report_to_one_collector():
+    groups = [nodes(1, 5), nodes(6, 5), nodes(11, 5)]
+    recorded = {}
+
+    async def scenario():
+        collector = Collector(lambda node, rtt, checked: recorded.__setitem__(node.ip, rtt), "127.0.0.1", 0)
+        for group in groups:
+            for node in group:
+                collector.add(node)
+        collector.start()
+        port = await listening(collector)
+        agents = [
+            ProbeAgent(group, "127.0.0.1", port, f"agent-{number}", SimulatedProber(latency=0.001, seed=number), **FAST)
+            for number, group in enumerate(groups)
+        ]
+        tasks = [asyncio.create_task(agent.run()) for agent in agents]
+        try:
+            await wait_until(lambda: len(recorded) == 15)
+            return sorted(session.name for session in collector.sessions)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            collector.stop()
+
+    assert run(scenario()) == ["agent-0", "agent-1", "agent-2"]
+    assert all(rtt is not None for rtt in recorded.values())
+
+
+def test_agent_reconnects_after_collector_restart(monkeypatch):
+    monkeypatch.setattr(network.agent, "RECONNECT_DELAY", 0.05)
+    group = nodes(1, 3)
+
+    async def scenario():
+        first_results, second_results = [], []
+        first = Collector(lambda *result: first_results.append(result), "127.0.0.1", 0)
+        for node in group:
+            first.add(node)
+        first.start()
+        port = await listening(first)
+        agent = ProbeAgent(group, "127.0.0.1", port, "agent", SimulatedProber(latency=0.001, seed=1), **FAST)
+        task = asyncio.create_task(agent.run())
+        try:
+            await wait_until(lambda: first_results)
+            first.stop()
+            await wait_until(lambda: not agent.connected)
+
+            second = Collector(lambda *result: second_results.append(result), "127.0.0.1", port)
+            for node in group:
+                second.add(node)
+            second.start()
+            try:
+                await wait_until(lambda: second_results)
+                return agent.connected, len(second.sessions)
+            finally:
+                second.stop()
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    assert run(scenario()) == (True, 1)
+
+
+def test_disconnect_marks_nodes_checking(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The node log writer creates its directory here
+    group = nodes(1, 3)
+
+    def statuses(monitor: Monitor) -> set[int]:
+        store = monitor.status_store
+        return {store.status[store.rows[node.ip]] for node in group}
+
+    async def scenario():
+        monitor = Monitor(group, listen=("127.0.0.1", 0))
+        monitor.start()
+        port = await listening(monitor.scheduler)
+        agent = ProbeAgent(group, "127.0.0.1", port, "agent", SimulatedProber(latency=0.001, seed=1), **FAST)
+        task = asyncio.create_task(agent.run())
+        try:
+            await wait_until(lambda: statuses(monitor) == {ONLINE})
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            started = time.monotonic()
+            await wait_until(lambda: statuses(monitor) == {CHECKING})
+            return time.monotonic() - started
+        finally:
+            task.cancel()
+            monitor.stop()
+
+    assert run(scenario()) < 1  # On the closed connection, not the idle timeout
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+
+import pytest
+
+from network.monitor import Monitor
+from network.neighbours import (
+    NUD_FAILED, NUD_NOARP, NUD_REACHABLE, NUD_STALE, NeighbourWatcher, iter_messages, parse_neighbours,
+)
+from network.node import NodeData
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def test_parse_captured_dump():
+    # Captured with ``benchmarks/passive_liveness.py --capture`` after adding entries with ``ip neigh``
+    table = parse_neighbours(fixture("neighbours.bin"))
+    assert table["192.0.2.10"] == NUD_REACHABLE
+    assert table["192.0.2.11"] == NUD_STALE
+    assert table["192.0.2.12"] == NUD_FAILED
+    assert table["2001:db8::10"] == NUD_REACHABLE
+    assert table["2001:db8::11"] == NUD_STALE
+    assert table["ff02::16"] == NUD_NOARP
+    assert len(table) == 10
+
+
+def test_parse_truncated_dump_keeps_complete_messages():
+    data = fixture("neighbours.bin")
+    table = parse_neighbours(data[:len(data) // 2])
+    assert 0 < len(table) < 10
+    assert table.items() <= parse_neighbours(data).items()
+
+
+def test_error_dump_raises():
+    # The kernel's answer to a non-dump RTM_GETNEIGH without a destination
+    with pytest.raises(OSError) as error:
+        parse_neighbours(fixture("neighbours_error.bin"))
+    assert error.value.errno == 22
+
+
+def test_iter_messages_stops_at_done():
+    kinds = [kind for kind, _ in iter_messages(fixture("neighbours.bin"))]
+    assert kinds[-1] == 3  # NLMSG_DONE
+    assert set(kinds[:-1]) == {28}  # RTM_NEWNEIGH
+
+
+def test_watcher_retries_after_timeout():
+    tables = []
+    timeouts = [TimeoutError()]
+
+    def read():
+        if timeouts:
+            raise timeouts.pop()
+        return {"192.0.2.10": NUD_REACHABLE}
+
+    async def run():
+        watcher = NeighbourWatcher(tables.append, interval=0.01, read=read)
+        watcher.start()
+        await asyncio.sleep(0.1)
+        watcher.stop()
+
+    asyncio.run(run())
+    assert tables and tables[0] == {"192.0.2.10": NUD_REACHABLE}
+
+
+def test_watcher_stops_when_table_unreadable():
+    calls = []
+
+    def read():
+        calls.append(None)
+        raise PermissionError("netlink refused")
+
+    async def run():
+        watcher = NeighbourWatcher(lambda table: None, interval=0.01, read=read)
+        watcher.start()
+        await asyncio.sleep(0.1)
+        watcher.stop()
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_passive_confirmations_log_only_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The node log writer creates its directory here
+    handler = Collect()
+    node_logger = logging.getLogger("nodes.192.0.2.10")
+    node_logger.addHandler(handler)
+
+    async def probe(host):
+        return None
+
+    async def run():
+        monitor = Monitor([NodeData("192.0.2.10", "PC")], probe=probe, scheduler_options={"interval": 60})
+        monitor.start()
+        try:
+            for _ in range(5):
+                monitor.record_neighbours({"192.0.2.10": NUD_REACHABLE})
+            return monitor.node_map["192.0.2.10"].is_online
+        finally:
+            monitor.stop()
+
+    try:
+        assert asyncio.run(run())
+    finally:
+        node_logger.removeHandler(handler)
+    assert handler.messages == ["Node 192.0.2.10 is Online"]
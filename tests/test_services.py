@@ -0,0 +1,241 @@
+import asyncio
+
+import pytest
+
+from network.services import ServiceProber, parse_check
+
+OK = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+
+
+class StandIn:
+    """Scripted HTTP server: one list of replies per connection, in connection order.
+
+    A reply is the raw response bytes, "close" to drop the connection after
+    reading the request, or "hang" to never answer.
+    """
+
+    def __init__(self, *connections: list):
+        self.scripts = list(connections)
+        self.connections = 0
+        self.requests = []
+        self.server = None
+
+    async def __aenter__(self) -> int:
+        self.server = await asyncio.start_server(self.serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        script = self.scripts[self.connections] if self.connections < len(self.scripts) else [OK]
+        self.connections += 1
+        try:
+            for reply in script:
+                request = await reader.readuntil(b"\r\n\r\n")
+                self.requests.append(request)
+                if reply == "close":
+                    break
+                if reply == "hang":
+                    await asyncio.sleep(60)
+                writer.write(reply)
+                await writer.drain()
+            else:
+                await reader.read()  # Keep the connection open until the client closes it
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def probe_twice(prober: ServiceProber, check: str) -> list:
+    results = [await prober.probe("127.0.0.1", check)]
+    await asyncio.sleep(0.05)  # Let a closing server's EOF arrive
+    results.append(await prober.probe("127.0.0.1", check))
+    return results
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_keep_alive_connection_is_reused():
+    async def scenario():
+        stand_in = StandIn([OK, OK])
+        prober = ServiceProber()
+        async with stand_in as port:
+            results = await probe_twice(prober, f"http:{port}/health")
+        prober.close()
+        return stand_in, results
+
+    stand_in, results = run(scenario())
+    assert all(result is not None for result in results)
+    assert stand_in.connections == 1
+    assert stand_in.requests[0].startswith(b"GET /health HTTP/1.1\r\n")
+    assert b"Host: 127.0.0.1:" in stand_in.requests[0]
+
+
+def test_chunked_body_with_trailers_keeps_connection():
+    chunked = (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+        b"5;name=value\r\nhello\r\n6\r\n world\r\n0\r\nX-Checksum: abc\r\n\r\n"
+    )
+
+    async def scenario():
+        stand_in = StandIn([chunked, chunked])
+        prober = ServiceProber()
+        async with stand_in as port:
+            results = await probe_twice(prober, f"http:{port}")
+        prober.close()
+        return stand_in, results
+
+    stand_in, results = run(scenario())
+    assert all(result is not None for result in results)
+    assert stand_in.connections == 1
+
+
+def test_close_delimited_body_opens_new_connection():
+    until_close = b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n\r\nbody until close"
+
+    async def scenario():
+        stand_in = StandIn([until_close, "close"], [until_close, "close"])
+        prober = ServiceProber()
+        async with stand_in as port:
+            results = await probe_twice(prober, f"http:{port}")
+        prober.close()
+        return stand_in, results
+
+    stand_in, results = run(scenario())
+    assert all(result is not None for result in results)
+    assert stand_in.connections == 2
+
+
+def test_http_1_0_response_is_not_reused():
+    async def scenario():
+        stand_in = StandIn([b"HTTP/1.0 200 OK\r\nContent-Length: 0\r\n\r\n", "close"])
+        prober = ServiceProber()
+        async with stand_in as port:
+            results = await probe_twice(prober, f"http:{port}")
+        prober.close()
+        return stand_in, results
+
+    stand_in, results = run(scenario())
+    assert all(result is not None for result in results)
+    assert stand_in.connections == 2
+
+
+@pytest.mark.parametrize("check, expected", [("http:{port}", False), ("http:{port}/=503", True)])
+def test_status_mismatch(check, expected):
+    unavailable = b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n"
+
+    async def scenario():
+        prober = ServiceProber()
+        async with StandIn([unavailable]) as port:
+            result = await prober.probe("127.0.0.1", check.format(port=port))
+        prober.close()
+        return result
+
+    assert (run(scenario()) is not None) == expected
+
+
+def test_timeout():
+    async def scenario():
+        prober = ServiceProber(timeout=0.2)
+        async with StandIn(["hang"]) as port:
+            started = asyncio.get_running_loop().time()
+            result = await prober.probe("127.0.0.1", f"http:{port}")
+            elapsed = asyncio.get_running_loop().time() - started
+        prober.close()
+        return result, elapsed
+
+    result, elapsed = run(scenario())
+    assert result is None
+    assert elapsed < 1
+
+
+def test_retry_after_stale_pooled_connection():
+    # The server keeps the first connection open but drops it on the next request
+    async def scenario():
+        stand_in = StandIn([OK, "close"], [OK])
+        prober = ServiceProber()
+        async with stand_in as port:
+            results = await probe_twice(prober, f"http:{port}")
+        prober.close()
+        return stand_in, results
+
+    stand_in, results = run(scenario())
+    assert all(result is not None for result in results)
+    assert stand_in.connections == 2
+    assert len(stand_in.requests) == 3
+
+
+def test_idle_connection_is_closed():
+    async def scenario():
+        stand_in = StandIn([OK])
+        prober = ServiceProber(max_idle=0.1)
+        async with stand_in as port:
+            result = await prober.probe("127.0.0.1", f"http:{port}")
+            pooled = len(prober.pool)
+            await asyncio.sleep(0.3)
+        return result, pooled, prober.pool
+
+    result, pooled, pool = run(scenario())
+    assert result is not None
+    assert pooled == 1
+    assert pool == {}
+
+
+@pytest.mark.parametrize("status_line", [b"garbage\r\n", b"HTTP/1.1\r\n", b"HTTP/1.1 OK 200\r\n", b"ICY 200 OK\r\n"])
+def test_malformed_status_line_fails(status_line):
+    async def scenario():
+        prober = ServiceProber()
+        async with StandIn([status_line + b"Content-Length: 0\r\n\r\n"]) as port:
+            result = await prober.probe("127.0.0.1", f"http:{port}")
+        prober.close()
+        return result
+
+    assert run(scenario()) is None
+
+
+def test_malformed_chunk_size_fails():
+    async def scenario():
+        prober = ServiceProber()
+        async with StandIn([b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n"]) as port:
+            result = await prober.probe("127.0.0.1", f"http:{port}")
+        prober.close()
+        return result
+
+    assert run(scenario()) is None
+
+
+def test_tcp_check():
+    async def scenario():
+        prober = ServiceProber()
+        async with StandIn([]) as port:
+            open_port = await prober.probe("127.0.0.1", f"tcp:{port}")
+        closed_port = await prober.probe("127.0.0.1", f"tcp:{port}")
+        return open_port, closed_port
+
+    open_port, closed_port = run(scenario())
+    assert open_port is not None
+    assert closed_port is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("icmp", None),
+    ("tcp:22", ("tcp", 22, "/", 200)),
+    ("https", ("https", 443, "/", 200)),
+    ("http:8080/health=204", ("http", 8080, "/health", 204)),
+    ("http/health?a=1", ("http", 80, "/health?a=1", 200)),
+    ("https/health?a=1=503", ("https", 443, "/health?a=1", 503)),
+    ("http:80/=503", ("http", 80, "/", 503)),
+])
+def test_parse_check(text, expected):
+    check = parse_check(text)
+    assert (check.kind, check.port, check.path, check.status) == expected if expected else check is None
+
+
+@pytest.mark.parametrize("text", ["tcp", "udp:53", "tcp:70000", "tls:443/path", "http:80=abc", "http=99"])
+def test_parse_check_rejects(text):
+    with pytest.raises(ValueError):
+        parse_check(text)